@@ -1,7 +1,6 @@
 # Adapted from https://huggingface.co/spaces/ysharma/ChatGPT4
 
 from collections import OrderedDict
-import os
 from signal import SIGTERM
 from time import sleep
 
@@ -16,6 +15,7 @@ from chat_with_nerf.chat.system_prompt import (
 )
 from chat_with_nerf.settings import Settings
 from chat_with_nerf.util import list_dirs
+from chat_with_nerf.visual_grounder.mesh_lod import served_mesh_path
 
 scene_name = "home_1"
 agent = Agent(scene_name="home_1")
@@ -54,14 +54,9 @@ def change_scene_or_system_prompt(
     new_session = Session.create_for_scene(dropdown_scene_selection)
     new_session.working_scene_name = dropdown_scene_selection
     agent.scene_name = dropdown_scene_selection
-    file_name = (
-        "scene_for_gradio_v7.obj"
-        if dropdown_scene_selection.startswith("s")
-        else "poly.glb"
-    )
 
     return (
-        os.path.join(Settings.data_path, dropdown_scene_selection, file_name),
+        served_mesh_path(dropdown_scene_selection),
         None,
         new_session.chat_history_for_display,
         new_session.chat_counter,
@@ -120,13 +115,7 @@ with gr.Blocks() as demo:
                     label="Select a scene",
                 )
                 model_3d = gr.Model3D(
-                    value=Settings.data_path
-                    + f"/{scene_name}"
-                    + (
-                        "/scene_for_gradio_v7.obj"
-                        if scene_name.startswith("s")
-                        else "/poly.glb"
-                    ),
+                    value=served_mesh_path(scene_name),
                     # value=Settings.data_path + f"/{scene_name}" + "/poly.glb",
                     clear_color=[0.0, 0.0, 0.0, 0.0],
                     label="3D Model",
@@ -4,6 +4,7 @@ import time
 import attr
 from collections import defaultdict
 from collections.abc import Generator
+from concurrent.futures import Future
 import numpy as np
 import requests
 import json5
@@ -15,12 +16,17 @@ from chat_with_nerf.chat.grounder import (
     ground_with_callback,
     ground_no_gpt_with_callback,
     ground_with_callback_with_gpt,
-    highlight_clusters_in_mesh,
+    submit_mesh_export,
 )
+from chat_with_nerf.chat.janitor import OutputJanitor, live_sessions
 from chat_with_nerf.chat.session import Session
 from chat_with_nerf.model.model_context import ModelContext, ModelContextManager
 from chat_with_nerf.settings import Settings
 from chat_with_nerf.util import get_status_code_and_reason
+from chat_with_nerf.visual_grounder.camera_pose import CameraPose
+from chat_with_nerf.visual_grounder.grounding_cache import GroundingPrecomputeWorker
+from chat_with_nerf.visual_grounder.image_ref import ImageRef
+from chat_with_nerf.visual_grounder.render_scheduler import PRIORITY_BACKGROUND
 
 
 @attr.define
@@ -43,6 +49,10 @@ class Agent:
                 )
             else:
                 self.model_context = ModelContextManager.get_model_context_with_gpt()
+            if Settings.ENABLE_GROUNDING_PRECOMPUTE:
+                GroundingPrecomputeWorker(self.model_context.picture_takers).start()
+            if Settings.ENABLE_OUTPUT_JANITOR:
+                OutputJanitor().start()
         else:
             self.model_context = ModelContext(
                 scene_configs=None,
@@ -67,6 +77,23 @@ class Agent:
         chatbot_msg_for_user = [(None, None)]
         return chatbot_msg_for_user, pure_text_for_gpt
 
+    @staticmethod
+    def candidate_views_markdown(path2images: list[ImageRef]) -> str:
+        """Display rendered candidate views in markdown format."""
+        markdown_to_display = ""
+        markdown_to_display += " **Top Candidates with corresponding novel view: **  \n"
+        for path2image in path2images:
+            markdown_to_display += f" ![caption](file={path2image.wait()}) \n\n"
+        return markdown_to_display
+
+    @staticmethod
+    def orbit_views_markdown(path2images: list[ImageRef]) -> str:
+        """Display rendered views around the grounded object in markdown format."""
+        markdown_to_display = " **Views around the grounded object: **  \n"
+        for path2image in path2images:
+            markdown_to_display += f" ![caption](file={path2image.wait()}) \n\n"
+        return markdown_to_display
+
     def ask_gpt(
         self,
         system_msg: str,
@@ -264,6 +291,8 @@ class Agent:
     ) -> Generator[
         tuple[list[tuple], int, str | None, Session, str | None], None, None
     ]:
+        # the janitor keeps the files of live sessions
+        live_sessions.touch(session)
         session.base_mesh_path = self.model_context.scene_configs[
             dropdown_scene
         ].load_mesh
@@ -280,6 +309,7 @@ class Agent:
         session.working_scene_name = dropdown_scene
         retry_sleep_time = 0.1
         give_control_to_user = False
+        mesh_export: Future | None = None
         for _ in range(
             self.MAX_ITERATION
         ):  # iterate until GPT decides to give control to user
@@ -413,6 +443,13 @@ class Agent:
                     ground_json = gpt_response_json["command"]["args"]["ground_json"]
                     print("ground text: ", ground_json)
                     session.grounding_query = ground_json["target"]["phrase"]
+                    session.landmark_queries = [
+                        value["phrase"]
+                        for key, value in ground_json.items()
+                        if key != "target"
+                        and isinstance(value, dict)
+                        and value.get("phrase")
+                    ]
                     # use a separate thread to do grounding since it takes a while
                     grounder_returned_chatbot_msg = None
 
@@ -506,31 +543,85 @@ class Agent:
                     assert len(img_id_list) == 1
                     session.chosen_candidate_id = img_id_list[0]
                     session.top_5_objects2scores = top_5_object2scores
+                    # saved sessions form the query log of the grounding precompute,
+                    # a failed save must not send the grounding back to GPT
+                    try:
+                        session.save(Settings.output_path)
+                    except Exception as exp:
+                        logger.error(
+                            f"Saving session {session.session_id} failed: {exp}"
+                        )
 
-                    mesh_file_path = highlight_clusters_in_mesh(
-                        session, self.model_context.picture_takers[dropdown_scene].mesh
+                    # the reply does not wait for the mesh, it follows once exported
+                    mesh_export = submit_mesh_export(
+                        session,
+                        self.model_context.picture_takers[dropdown_scene].display_asset,
                     )
-                    session.grounding_result_mesh_path = mesh_file_path
 
                     if not session.working_scene_name.startswith("s"):
-                        path2images = self.model_context.picture_takers[
+                        picture_taker = self.model_context.picture_takers[
                             dropdown_scene
-                        ].take_picture_for_the_ground_result(session, img_id_list[0])
-                        markdown_to_display = ""
-                        markdown_to_display += (
-                            " **Top Candidates with corresponding novel view: **  \n"
-                        )
-
-                        for i, path2image in enumerate(path2images):
-                            markdown_to_display += (
-                                f" ![caption](file={path2image.rgb_address}) \n\n"
-                            )
-
+                        ]
                         last_message = f"**SYSTEM: Grounding finished. Ground Object id: {img_id_list[0]}**\n"
                         session.chat_history_for_display.append((None, last_message))
-                        session.chat_history_for_display.append(
-                            (None, markdown_to_display)
-                        )
+                        if Settings.ENABLE_PROGRESSIVE_RENDERING:
+                            # stream a quick preview, then swap in full resolution
+                            camera_pose = CameraPose()
+                            preview_scale = Settings.PREVIEW_RESOLUTION / max(
+                                camera_pose.render_height, camera_pose.render_width
+                            )
+                            path2images = (
+                                picture_taker.take_preview_for_the_ground_result(
+                                    session, img_id_list[0], preview_scale
+                                )
+                            )
+                            full_resolution = (
+                                picture_taker.submit_picture_for_the_ground_result(
+                                    session,
+                                    img_id_list[0],
+                                    priority=PRIORITY_BACKGROUND,
+                                )
+                            )
+                            session.chat_history_for_display.append(
+                                (None, self.candidate_views_markdown(path2images))
+                            )
+                            yield (
+                                session.chat_history_for_display,
+                                session.chat_counter,
+                                get_status_code_and_reason(response),
+                                session,
+                                session.grounding_result_mesh_path,
+                            )
+                            try:
+                                path2images = full_resolution.result()
+                            except Exception as exp:
+                                # the preview stays, no reason to ask GPT again
+                                logger.error(
+                                    f"Full resolution render failed, keeping the preview: {exp}"
+                                )
+                            else:
+                                session.chat_history_for_display[-1] = (
+                                    None,
+                                    self.candidate_views_markdown(path2images),
+                                )
+                        else:
+                            path2images = (
+                                picture_taker.take_picture_for_the_ground_result(
+                                    session, img_id_list[0]
+                                )
+                            )
+                            session.chat_history_for_display.append(
+                                (None, self.candidate_views_markdown(path2images))
+                            )
+                        if Settings.ENABLE_ORBIT_INSPECTION:
+                            orbit_images = (
+                                picture_taker.take_orbit_pictures_for_the_ground_result(
+                                    session, img_id_list[0]
+                                )
+                            )
+                            session.chat_history_for_display.append(
+                                (None, self.orbit_views_markdown(orbit_images))
+                            )
                         give_control_to_user = True
                     else:
                         last_message = f"**SYSTEM: Grounding finished. Ground Object id: {img_id_list[0]}**\n"
@@ -568,6 +659,13 @@ class Agent:
                 )
                 continue
 
+        if mesh_export is not None:
+            try:
+                session.grounding_result_mesh_path = mesh_export.result()
+            except Exception as exp:
+                logger.error(f"Exporting the grounding result mesh failed: {exp}")
+        live_sessions.touch(session)
+
         yield (
             session.chat_history_for_display,
             session.chat_counter,
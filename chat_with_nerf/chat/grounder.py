@@ -1,15 +1,20 @@
+from concurrent.futures import Future, ThreadPoolExecutor
 from typing import Callable
 import math
 import ast
 import numpy as np
-import open3d as o3d
-import os
-from copy import deepcopy
 from chat_with_nerf import logger
 from chat_with_nerf.chat.session import Session
 from chat_with_nerf.settings import Settings
 
 from chat_with_nerf.visual_grounder.captioner import BaseCaptioner
+from chat_with_nerf.visual_grounder.display_mesh import (
+    DisplayAsset,
+    MeshArrays,
+    cached_result_mesh,
+)
+from chat_with_nerf.visual_grounder.grounding_cache import live_traffic
+from chat_with_nerf.visual_grounder.overlay import boxes
 from chat_with_nerf.visual_grounder.picture_taker import PictureTaker
 from chat_with_nerf.visual_grounder.visual_grounder import VisualGrounder
 
@@ -71,133 +76,63 @@ def ground(
     return result
 
 
-def prettify_mesh_for_gradio(mesh):
-    # Define the transformation matrix
-    T = np.array([[0, -1, 0, 0], [0, 0, 1, 0], [-1, 0, 0, 0], [0, 0, 0, 1]])
-
-    # Apply the transformation
-    mesh.transform(T)
-
-    mesh.scale(10.0, center=mesh.get_center())
-
-    bright_factor = 1  # Adjust this factor to get the desired brightness
-    mesh.vertex_colors = o3d.utility.Vector3dVector(
-        np.clip(np.asarray(mesh.vertex_colors) * bright_factor, 0, 1)
-    )
-
-    return mesh
-
-
-def create_cylinder_mesh(p0, p1, color, radius=0.02, resolution=20, split=1):
-    """Create a colored cylinder mesh between two points p0 and p1."""
-    cylinder = o3d.geometry.TriangleMesh.create_cylinder(
-        radius=radius, height=1, resolution=resolution, split=split
-    )
-    transformation = cylinder_frame(p0, p1)
-    cylinder.transform(transformation)
-    # Apply color
-    cylinder.paint_uniform_color(color)
-    return cylinder
-
-
-def cylinder_frame(p0, p1):
-    """Calculate the transformation matrix to position a unit cylinder between two points."""
-    direction = np.asarray(p1) - np.asarray(p0)
-    length = np.linalg.norm(direction)
-    direction /= length
-    # Computing rotation matrix using Rodrigues' formula
-    rot_axis = np.cross([0, 0, 1], direction)
-    rot_angle = np.arccos(np.dot([0, 0, 1], direction))
-    rot_matrix = o3d.geometry.get_rotation_matrix_from_axis_angle(rot_axis * rot_angle)
-
-    # Translation
-    translation = (np.asarray(p0) + np.asarray(p1)) / 2
-
-    transformation = np.eye(4)
-    transformation[:3, :3] = rot_matrix
-    transformation[:3, 3] = translation
-    scaling = np.eye(4)
-    scaling[2, 2] = length
-    transformation = np.matmul(transformation, scaling)
-    return transformation
-
-
-def create_bbox(center, extents, color=[1, 0, 0], radius=0.02):
-    """Create a colored bounding box with given center, extents, and line thickness."""
-    # ... [The same code as before to define corners and lines] ...
-    sx, sy, sz = extents
-    x_corners = [sx / 2, sx / 2, -sx / 2, -sx / 2, sx / 2, sx / 2, -sx / 2, -sx / 2]
-    y_corners = [sy / 2, -sy / 2, -sy / 2, sy / 2, sy / 2, -sy / 2, -sy / 2, sy / 2]
-    z_corners = [sz / 2, sz / 2, sz / 2, sz / 2, -sz / 2, -sz / 2, -sz / 2, -sz / 2]
-    corners_3d = np.vstack([x_corners, y_corners, z_corners])
-    corners_3d[0, :] = corners_3d[0, :] + center[0]
-    corners_3d[1, :] = corners_3d[1, :] + center[1]
-    corners_3d[2, :] = corners_3d[2, :] + center[2]
-    corners_3d = np.transpose(corners_3d)
-
-    lines = [
-        [0, 1],
-        [1, 2],
-        [2, 3],
-        [3, 0],
-        [4, 5],
-        [5, 6],
-        [6, 7],
-        [7, 4],
-        [0, 4],
-        [1, 5],
-        [2, 6],
-        [3, 7],
-    ]
-    cylinders = []
-    for line in lines:
-        p0, p1 = corners_3d[line[0]], corners_3d[line[1]]
-        cylinders.append(create_cylinder_mesh(p0, p1, color, radius))
-    return cylinders
-
-
-def highlight_clusters_in_mesh(session, mesh) -> str:
-    # Visualize the highlighted points by drawing 3D bounding boxes overlay on a mesh
-    mesh = deepcopy(mesh)
-    output_path = os.path.join(Settings.output_path, "mesh_vis")
-    if not os.path.exists(output_path):
-        os.makedirs(output_path)
-    if Settings.IS_SCANNET:
-        mesh_file_path = os.path.join(output_path, f"{session.session_id}.obj")
-    else:
-        mesh_file_path = os.path.join(output_path, f"{session.session_id}.glb")
-
+def result_overlay(session) -> MeshArrays:
+    """The 3D bounding boxes of the chosen candidate (green), the other top
+    candidates (red) and the landmark (blue)."""
+    centers, extents, colors = [], [], []
     candidates = session.candidate_visualization
     landmark = session.landmark_visualization
     top_5_objects2scores = session.top_5_objects2scores
     top_5_objects = list(top_5_objects2scores.keys())
     for candidate_id, candidate in enumerate(candidates):
-        center = candidate["centroid"]
-        extent = candidate["extent"]
         if candidate_id == session.chosen_candidate_id:
-            bbox = create_bbox(center, extent, color=[0, 1, 0])
-            for b in bbox:
-                mesh += b
+            colors.append([0, 1, 0])
+        elif str(candidate_id) in top_5_objects:
+            colors.append([1, 0, 0])
         else:
-            if str(candidate_id) in top_5_objects:
-                bbox = create_bbox(center, extent, color=[1, 0, 0])
-                for b in bbox:
-                    mesh += b
+            continue
+        centers.append(np.asarray(candidate["centroid"]).reshape(3))
+        extents.append(np.asarray(candidate["extent"]).reshape(3))
 
     if len(landmark) == 1:
         landmark_info = landmark[0]
-        if not isinstance(landmark_info[0], list):
-            centeroid = landmark_info[0].tolist()
-        else:
-            centeroid = landmark_info[0]
-        bbox = create_bbox(centeroid, landmark_info[1], color=[0, 0, 1])
-        for b in bbox:
-            mesh += b
+        centers.append(np.asarray(landmark_info[0]).reshape(3))
+        extents.append(np.asarray(landmark_info[1]).reshape(3))
+        colors.append([0, 0, 1])
+
+    # all box edges are instanced from one cylinder template in a single step
+    return boxes(
+        np.asarray(centers).reshape(-1, 3),
+        np.asarray(extents).reshape(-1, 3),
+        np.asarray(colors).reshape(-1, 3),
+    )
 
-    mesh = prettify_mesh_for_gradio(mesh)
-    o3d.io.write_triangle_mesh(mesh_file_path, mesh, write_vertex_colors=True)
 
-    return mesh_file_path
+mesh_export_executor = ThreadPoolExecutor(
+    max_workers=Settings.MESH_EXPORT_WORKERS, thread_name_prefix="mesh_export"
+)
+
+
+def submit_mesh_export(session, display_asset: DisplayAsset) -> Future:
+    """Export the result mesh of a session in the background. Identical
+    results of different sessions share one file.
+
+    The overlay is built right away from the session's current result, so
+    later turns of the session do not change the exported mesh.
+
+    :return: a future resolving to the result mesh path
+    """
+    return mesh_export_executor.submit(
+        cached_result_mesh,
+        display_asset,
+        result_overlay(session),
+        ".obj" if Settings.IS_SCANNET else ".glb",
+    )
+
+
+def highlight_clusters_in_mesh(session, display_asset: DisplayAsset) -> str:
+    # Visualize the highlighted points by drawing 3D bounding boxes overlay on a mesh
+    return submit_mesh_export(session, display_asset).result()
 
 
 def ground_with_gpt(
@@ -205,6 +140,17 @@ def ground_with_gpt(
     dropdown_scene: str,
     ground_json: str | dict,
     picture_taker: PictureTaker,
+):
+    # background precompute waits while live grounding requests are running
+    with live_traffic.live_request():
+        return _ground_with_gpt(session, dropdown_scene, ground_json, picture_taker)
+
+
+def _ground_with_gpt(
+    session: Session,
+    dropdown_scene: str,
+    ground_json: str | dict,
+    picture_taker: PictureTaker,
 ):
     print(f"{'*' * 100}\n{ground_json}\n{'*' * 100}")
     if isinstance(ground_json, str):
@@ -0,0 +1,231 @@
+import os
+import re
+import threading
+import time
+from collections import defaultdict
+from typing import Iterable, Optional
+
+from attrs import define, field
+
+from chat_with_nerf import logger
+from chat_with_nerf.chat.session import Session
+from chat_with_nerf.settings import Settings
+
+SESSION_ID_PATTERN = re.compile(
+    r"^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$"
+)
+# chat messages show images as markdown with file= links
+FILE_LINK_PATTERN = re.compile(r"file=([^)\s]+)")
+
+
+def session_references(session: Session) -> set[str]:
+    """Absolute paths of the output files a session shows or refers to."""
+    paths = set(session.image_id_to_path.values())
+    if session.grounding_result_mesh_path is not None:
+        paths.add(session.grounding_result_mesh_path)
+    for message in session.chat_history_for_display:
+        for text in message:
+            if isinstance(text, str):
+                paths.update(FILE_LINK_PATTERN.findall(text))
+    return {os.path.abspath(str(path)) for path in paths}
+
+
+@define
+class LiveSessionRegistry:
+    """Sessions active within the idle timeout. Their referenced files are
+    never removed by the janitor."""
+
+    idle_timeout: float = Settings.JANITOR_SESSION_IDLE_TIMEOUT
+    sessions: dict[str, tuple[float, Session]] = field(init=False, factory=dict)
+    lock: threading.Lock = field(init=False, factory=threading.Lock)
+
+    def touch(self, session: Session) -> None:
+        with self.lock:
+            self.sessions[session.session_id] = (time.time(), session)
+
+    def live_sessions(self, now: Optional[float] = None) -> list[Session]:
+        now = time.time() if now is None else now
+        with self.lock:
+            for session_id, (last_seen, _) in list(self.sessions.items()):
+                if now - last_seen > self.idle_timeout:
+                    del self.sessions[session_id]
+            return [session for _, session in self.sessions.values()]
+
+    def referenced_paths(self, now: Optional[float] = None) -> set[str]:
+        paths = set()
+        for session in self.live_sessions(now):
+            paths |= session_references(session)
+        return paths
+
+
+live_sessions = LiveSessionRegistry()
+
+
+@define
+class Artifact:
+    path: str
+    size: int
+    mtime: float
+    session_id: Optional[str]
+    """The session that produced the file, None for shared files."""
+
+
+def scan_artifacts(root: str) -> list[Artifact]:
+    """The files under the output directory the janitor may remove:
+
+    - `<session_id>/**`, the rendered images of a session
+    - `mesh_vis/results/*`, the result meshes shared between sessions
+
+    The saved sessions in `<scene>/<session_id>.json` are kept, they are the
+    query log the grounding precompute reads, as are the scene display meshes
+    in `mesh_vis` and the grounding caches.
+    """
+    artifacts = []
+
+    def add(path: str, session_id: Optional[str]) -> None:
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return
+        artifacts.append(Artifact(path, stat.st_size, stat.st_mtime, session_id))
+
+    if not os.path.isdir(root):
+        return artifacts
+    for name in os.listdir(root):
+        directory = os.path.join(root, name)
+        if not os.path.isdir(directory):
+            continue
+        if SESSION_ID_PATTERN.match(name):
+            for dir_path, _, file_names in os.walk(directory):
+                for file_name in file_names:
+                    add(os.path.join(dir_path, file_name), name)
+        elif name == "mesh_vis":
+            results = os.path.join(directory, "results")
+            if os.path.isdir(results):
+                for file_name in os.listdir(results):
+                    add(os.path.join(results, file_name), None)
+    return artifacts
+
+
+def select_removals(
+    artifacts: Iterable[Artifact],
+    protected: set[str],
+    now: float,
+    ttl: float,
+    session_quota: int,
+    total_quota: int,
+) -> list[Artifact]:
+    """The artifacts to remove: those older than the TTL, then the oldest of
+    every session above its quota, then the oldest overall until the total
+    fits the global quota. Protected paths are never selected."""
+    kept = sorted(artifacts, key=lambda artifact: artifact.mtime)
+    removals = []
+
+    def remove(artifact: Artifact) -> None:
+        removals.append(artifact)
+        kept.remove(artifact)
+
+    for artifact in list(kept):
+        if now - artifact.mtime > ttl and artifact.path not in protected:
+            remove(artifact)
+
+    by_session = defaultdict(list)
+    for artifact in kept:
+        if artifact.session_id is not None:
+            by_session[artifact.session_id].append(artifact)
+    for session_artifacts in by_session.values():
+        session_bytes = sum(artifact.size for artifact in session_artifacts)
+        for artifact in session_artifacts:
+            if session_bytes <= session_quota:
+                break
+            if artifact.path not in protected:
+                remove(artifact)
+                session_bytes -= artifact.size
+
+    total_bytes = sum(artifact.size for artifact in kept)
+    for artifact in list(kept):
+        if total_bytes <= total_quota:
+            break
+        if artifact.path not in protected:
+            remove(artifact)
+            total_bytes -= artifact.size
+    return removals
+
+
+@define
+class OutputJanitor:
+    """Background worker that keeps the session outputs within byte quotas
+    and TTLs, removing the oldest artifacts first."""
+
+    root: str = Settings.output_path
+    ttl: float = Settings.JANITOR_TTL
+    session_quota: int = Settings.JANITOR_SESSION_QUOTA_BYTES
+    total_quota: int = Settings.JANITOR_TOTAL_QUOTA_BYTES
+    interval: float = Settings.JANITOR_INTERVAL
+    registry: LiveSessionRegistry = live_sessions
+    stop_event: threading.Event = field(init=False, factory=threading.Event)
+    thread: Optional[threading.Thread] = field(init=False, default=None)
+
+    def start(self) -> None:
+        if self.thread is not None and self.thread.is_alive():
+            return
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def stop(self) -> None:
+        self.stop_event.set()
+
+    def run(self) -> None:
+        while not self.stop_event.is_set():
+            try:
+                self.run_once()
+            except Exception as exp:
+                logger.error(f"Output cleanup failed: {exp}")
+            self.stop_event.wait(self.interval)
+
+    def run_once(self, now: Optional[float] = None) -> int:
+        """Remove the selected artifacts and the emptied session directories.
+
+        :return: the number of bytes removed
+        """
+        now = time.time() if now is None else now
+        protected = self.registry.referenced_paths(now)
+        removals = select_removals(
+            scan_artifacts(self.root),
+            protected,
+            now,
+            self.ttl,
+            self.session_quota,
+            self.total_quota,
+        )
+        removed_bytes = 0
+        for artifact in removals:
+            try:
+                os.remove(artifact.path)
+            except FileNotFoundError:
+                continue
+            removed_bytes += artifact.size
+        self.remove_empty_session_directories()
+        if removals:
+            logger.info(
+                f"Removed {len(removals)} output files, "
+                f"{removed_bytes / 1024**2:.1f} MiB."
+            )
+        return removed_bytes
+
+    def remove_empty_session_directories(self) -> None:
+        if not os.path.isdir(self.root):
+            return
+        live = {session.session_id for session in self.registry.live_sessions()}
+        for name in os.listdir(self.root):
+            if not SESSION_ID_PATTERN.match(name) or name in live:
+                continue
+            # deepest directories first, so emptied parents are removed as well
+            for dir_path, _, _ in sorted(
+                os.walk(os.path.join(self.root, name)), reverse=True
+            ):
+                try:
+                    os.rmdir(dir_path)
+                except OSError:
+                    pass
@@ -29,6 +29,7 @@ class Session:
     chosen_candidate_id: int | None = None
     working_scene_name: str | None = None
     grounding_query: str | None = None
+    landmark_queries: list[str] | None = None
     ground_truth: list | None = None
     top_5_objects2scores: dict | None = None
     center_list: list | None = None
@@ -60,10 +61,17 @@ class Session:
         return session
 
     def convert_float32(self, obj):
-        """Convert all np.float32 values in the given object to Python float."""
+        """Convert all np.float32 values and numpy arrays in the given object to
+        Python floats and lists."""
         if isinstance(obj, np.float32):
             return float(obj)
 
+        if isinstance(obj, np.ndarray):
+            return obj.tolist()
+
+        if isinstance(obj, np.generic):
+            return obj.item()
+
         if isinstance(obj, list):
             return [self.convert_float32(item) for item in obj]
 
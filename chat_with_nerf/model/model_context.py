@@ -154,6 +154,7 @@ class ModelContextManager:
                     data["load_openscene"],
                     data["load_mesh"],
                     data["load_metadata"],
+                    data.get("max_cluster_points"),
                 )
                 scenes[subdir] = scene
             except FileNotFoundError:
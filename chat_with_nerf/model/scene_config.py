@@ -7,7 +7,9 @@ class SceneConfig:
     load_lerf_config: str
     load_h5_config: str
     camera_path: str
-    nerf_exported_mesh_path: str
+    nerf_exported_mesh_path: str | None
     load_openscene: str
     load_mesh: str
     load_metadata: str
+    # overrides Settings.MAX_CLUSTER_POINTS for this scene
+    max_cluster_points: int | None = None
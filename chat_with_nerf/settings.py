@@ -10,7 +10,8 @@ class Chat_With_NeRF_Settings:
     DEFAULT_IMAGE_PATCH_TOKEN = "<im_patch>"
     DEFAULT_IM_START_TOKEN = "<im_start>"
     DEFAULT_IM_END_TOKEN = "<im_end>"
-    MAX_WORKERS = 5
+    MAX_CAMERAS_PER_RENDER_BATCH = 8  # cameras whose rays share one ray bundle
+    RENDER_METRICS_LOG_INTERVAL = 300  # seconds between render queue metric logs
     IMAGES_PATH = "/workspace/chat-with-nerf-dev/chat-with-nerf/scene_images"
     NERF_DATA_PATH = "/workspace/chat-with-nerf-dev/chat-with-nerf/data"
     NO_GPT: bool = False
@@ -20,6 +21,89 @@ class Chat_With_NeRF_Settings:
     IS_SCANNET: bool = False
     # this flag is only used for evaluation
     IS_EVALUATION: bool = False
+    # grounding results cached per scene, frequent phrases precomputed in background
+    GROUNDING_CACHE_MAX_ENTRIES = 256
+    ENABLE_GROUNDING_PRECOMPUTE: bool = False
+    PRECOMPUTE_TOP_PHRASES = 20
+    PRECOMPUTE_INTERVAL = 300  # seconds between two scans of the query log
+    PRECOMPUTE_IDLE_SECONDS = 5  # quiet period required before background work
+    # background cleanup of the rendered session images and result meshes, the
+    # render cache has its own cap and saved sessions are never removed
+    ENABLE_OUTPUT_JANITOR: bool = False
+    JANITOR_INTERVAL = 600  # seconds between two cleanups
+    JANITOR_TTL = 7 * 24 * 3600  # seconds before an output file is removed
+    JANITOR_SESSION_QUOTA_BYTES = 256 * 1024**2
+    JANITOR_TOTAL_QUOTA_BYTES = 10 * 1024**3
+    JANITOR_SESSION_IDLE_TIMEOUT = 3600  # seconds until a session is not live
+    # offline relevancy tables of a fixed vocabulary, one file per scene
+    VOCABULARY_TABLE_PATH = "/workspace/chat-with-nerf-dev/chat-with-nerf/vocabulary"
+    VOCABULARY_PATH: str | None = None  # one label per line, ScanNet-20 if None
+    VOCABULARY_TOP_K = 2048
+    # cap on the points fed to DBSCAN, overridable per scene, None for no cap
+    MAX_CLUSTER_POINTS: int | None = None
+    CLUSTER_VOXEL_SIZE = 0.01  # voxel size of the deduplication above the cap
+    # non-maximum suppression of overlapping candidate boxes
+    NMS_IOU_THRESHOLD = 0.5
+    NMS_SCORE_THRESHOLD: float | None = None
+    NMS_MERGE: bool = False  # grow kept boxes to the union of the suppressed ones
+    # rendered candidate views keyed by scene, quantized pose, resolution and FOV
+    ENABLE_RENDER_CACHE: bool = True
+    RENDER_CACHE_PATH = "/workspace/chat-with-nerf-dev/chat-with-nerf/render_cache"
+    RENDER_CACHE_MAX_BYTES = 2 * 1024**3
+    RENDER_CACHE_MEMORY_ENTRIES = 64
+    RENDER_CACHE_POSE_QUANTIZATION = 1e-3  # scene units
+    # rendered images are encoded and written on background threads
+    RENDER_IMAGE_FORMAT = "png"  # or "webp"
+    IMAGE_COMPRESS_LEVEL = 1  # zlib level for PNG, effort (0-6) for WebP
+    IMAGE_WRITER_WORKERS = 2
+    IMAGE_WRITER_MAX_PENDING = 32
+    # show low resolution candidate views first, swap in full resolution later;
+    # costs an extra render or splat per grounding, so it is opt-in
+    ENABLE_PROGRESSIVE_RENDERING: bool = False
+    PREVIEW_RESOLUTION = 128  # pixels along the longer image side
+    PREVIEW_RENDERER = "nerf"  # or "splat" to always splat the H5 point colors
+    SPLAT_PREVIEW_QUEUED_CAMERAS = 16  # splat previews when this many are queued
+    SPLAT_RADIUS = 1  # pixels around each splatted point
+    # render candidate views only inside a margin around the cluster's box, this
+    # hides the landmarks around the candidate, so it is opt-in
+    ENABLE_CROP_RENDERING: bool = False
+    CROP_MARGIN = 1.5  # crop size relative to the cluster extent
+    CROP_MIN_SIZE = 0.2  # scene units, keeps thin clusters visible
+    CROP_BACKGROUND_COLOR = (255, 255, 255)
+    # raycast candidate viewpoints against the scene mesh before rendering, needs
+    # a scene mesh in nerfstudio coordinates, so it is opt-in
+    ENABLE_VISIBILITY_CHECK: bool = False
+    # up axis of the nerfstudio scenes, candidate cameras are constructed with it
+    # and alternative viewpoints are rotated about it
+    CAMERA_UP = (0, 1, 0)
+    VISIBILITY_AZIMUTHS = (0, -45, 45, -90, 90)  # degrees around the training ray
+    VISIBILITY_TOLERANCE = 0.05  # scene units before a target counts as hidden
+    VISIBILITY_MAX_TARGETS = 32  # cluster points raycast per viewpoint
+    MAX_OCCLUSION = 0.8  # candidates more occluded than this are not rendered
+    # multi-view inspection of the grounded object, extra views shown to the user
+    ENABLE_ORBIT_INSPECTION: bool = False
+    ORBIT_VIEWS = 4
+    ORBIT_ELEVATION = 30  # degrees above the candidate
+    ORBIT_DISTANCE_SCALE = 2.0  # orbit radius relative to the largest extent
+    ORBIT_MIN_DISTANCE = 0.5  # scene units
+    # "copy_base" copies the scene mesh buffer, encoded once per scene, next to
+    # the result boxes of a GLB; "full" re-encodes the scene with every result.
+    # Both hold the whole scene: gradio copies result files before serving them,
+    # so a result cannot reference a separately served scene mesh
+    MESH_EXPORT_MODE = "copy_base"
+    # result meshes are named by content and capped in total size
+    RESULT_MESH_CACHE_MAX_BYTES = 512 * 1024**2
+    MESH_EXPORT_WORKERS = 1  # background threads exporting result meshes
+    # preprocessed scene meshes are cached as arrays next to the source mesh
+    ENABLE_MESH_CACHE: bool = True
+    # level-of-detail scene meshes for the 3D viewer, built by mesh_lod.py
+    LOD_TRIANGLE_TARGETS = (1_000_000, 300_000, 100_000, 30_000)
+    LOD_TRIANGLE_BUDGET = 300_000  # most detailed level served to the browser
+    # calibrated eval_num_rays_per_chunk of every scene's LERF pipeline
+    CHUNK_TUNING_PATH = "/workspace/chat-with-nerf-dev/chat-with-nerf/chunk_tuning.json"
+    CHUNK_TUNING_SIZES = (4096, 8192, 16384, 32768, 65536, 131072)
+    CHUNK_TUNING_MEMORY_LIMIT = 8 * 1024**3  # bytes of GPU memory while rendering
+    CALIBRATE_CHUNK_SIZE_ON_LOAD: bool = False  # calibrate uncalibrated scenes
 
 
 Settings = Chat_With_NeRF_Settings()
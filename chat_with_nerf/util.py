@@ -1,4 +1,6 @@
 import os
+from contextlib import contextmanager
+from uuid import uuid4
 
 import numpy as np
 from requests import Response
@@ -13,6 +15,20 @@ def list_dirs(root_dir):
     return dirs_to_return
 
 
+@contextmanager
+def atomic_write_path(path: str):
+    """Yield a temporary path next to `path` that replaces `path` once the
+    block succeeds. Readers never see a partial file, and the name is unique so
+    that concurrent writers of the same path do not share it."""
+    tmp_path = f"{path}.{uuid4().hex}.tmp"
+    try:
+        yield tmp_path
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
 def rotate_x(angle_degrees: int, c2w: np.ndarray) -> np.ndarray:
     angle_radians = np.radians(angle_degrees)
     rotation_matrix = np.array(
@@ -52,6 +68,78 @@ def rotate_z(angle_degrees: int, c2w: np.ndarray) -> np.ndarray:
     return c2w @ rotation_matrix
 
 
+def look_at_camera_to_world(
+    camera_positions: np.ndarray,
+    targets: np.ndarray,
+    up: tuple = (0, 1, 0),
+    epsilon: float = 1e-6,
+) -> np.ndarray:
+    """Camera-to-world matrices of cameras at `camera_positions` looking at
+    `targets`, looking down their -z axis like nerfstudio cameras.
+
+    Both inputs are (..., 3) and broadcast against each other.
+
+    :return: a (..., 4, 4) array
+    """
+    camera_positions, targets = np.broadcast_arrays(
+        np.asarray(camera_positions, dtype=np.float64),
+        np.asarray(targets, dtype=np.float64),
+    )
+    direction = targets - camera_positions
+    direction = direction / np.linalg.norm(direction, axis=-1, keepdims=True)
+    right = np.cross(direction, np.asarray(up, dtype=np.float64))
+    right /= np.linalg.norm(right, axis=-1, keepdims=True) + epsilon
+    new_up = np.cross(right, direction)
+    new_up /= np.linalg.norm(new_up, axis=-1, keepdims=True) + epsilon
+
+    camera_to_world = np.zeros(camera_positions.shape[:-1] + (4, 4))
+    camera_to_world[..., :3, 0] = right
+    camera_to_world[..., :3, 1] = new_up
+    camera_to_world[..., :3, 2] = -direction
+    camera_to_world[..., :3, 3] = camera_positions
+    camera_to_world[..., 3, 3] = 1
+    return camera_to_world
+
+
+def orbit_camera_to_world(
+    centers: np.ndarray,
+    radii: np.ndarray | float,
+    num_views: int,
+    elevation_degrees: float = 30,
+    up: tuple = (0, 1, 0),
+) -> np.ndarray:
+    """Camera-to-world matrices of `num_views` cameras evenly spaced on a
+    circle around each center, raised by `elevation_degrees` towards `up`
+    and looking at the center.
+
+    :param centers: (M, 3) orbit centers
+    :param radii: distance of the cameras to their center, scalar or (M,)
+    :return: a (M, num_views, 4, 4) array
+    """
+    centers = np.asarray(centers, dtype=np.float64).reshape(-1, 3)
+    radii = np.broadcast_to(np.asarray(radii, dtype=np.float64), centers.shape[:1])
+    up_axis = np.asarray(up, dtype=np.float64)
+    up_axis = up_axis / np.linalg.norm(up_axis)
+    # any horizontal axis, and the one orthogonal to it
+    helper = np.eye(3)[np.argmin(np.abs(up_axis))]
+    first_axis = np.cross(up_axis, helper)
+    first_axis /= np.linalg.norm(first_axis)
+    second_axis = np.cross(up_axis, first_axis)
+
+    azimuths = np.linspace(0, 2 * np.pi, num_views, endpoint=False)
+    elevation = np.radians(elevation_degrees)
+    offsets = (
+        np.cos(elevation)
+        * (
+            np.cos(azimuths)[:, None] * first_axis
+            + np.sin(azimuths)[:, None] * second_axis
+        )
+        + np.sin(elevation) * up_axis
+    )
+    camera_positions = centers[:, None, :] + radii[:, None, None] * offsets[None]
+    return look_at_camera_to_world(camera_positions, centers[:, None, :], up)
+
+
 def get_status_code_and_reason(response: Response | None) -> str:
     if response is None:
         return ""
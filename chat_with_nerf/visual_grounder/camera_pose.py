@@ -1,3 +1,5 @@
+from typing import Optional
+
 import numpy as np
 from attrs import define
 
@@ -8,8 +10,17 @@ class CameraPose:
     render_height: int = 512
     render_width: int = 512
 
-    def construct_camera_pose(self, c2w: np.ndarray) -> dict:
-        camera_pose: dict[str, int | str | list[dict] | None] = {}
+    def construct_camera_pose(
+        self,
+        c2w: np.ndarray,
+        crop_center: Optional[np.ndarray] = None,
+        crop_scale: Optional[np.ndarray] = None,
+        crop_bg_color: tuple[int, int, int] = (0, 0, 0),
+    ) -> dict:
+        """Build a single-camera camera path. With `crop_center` and
+        `crop_scale`, only the inside of that box is rendered and everything
+        else is filled with `crop_bg_color`."""
+        camera_pose: dict[str, int | str | list[dict] | dict | None] = {}
         camera_pose["camera_type"] = self.camera_type
         camera_pose["render_height"] = self.render_height
         camera_pose["render_width"] = self.render_width
@@ -22,6 +33,34 @@ class CameraPose:
         c2w_dict["aspect"] = 1
         camera_pose["camera_path"].append(c2w_dict)  # type: ignore
 
-        camera_pose["crop"] = None
+        if crop_center is None or crop_scale is None:
+            camera_pose["crop"] = None
+        else:
+            camera_pose["crop"] = {
+                "crop_bg_color": dict(zip("rgb", crop_bg_color)),
+                "crop_center": [float(x) for x in crop_center],
+                "crop_scale": [float(x) for x in crop_scale],
+            }
 
         return camera_pose
+
+    def construct_camera_path(self, c2ws: np.ndarray) -> dict:
+        """Build one camera path holding a camera per camera-to-world matrix,
+        as accepted by nerfstudio's get_path_from_json."""
+        camera_path = self.construct_camera_pose(np.eye(4).flatten())
+        camera_path["camera_path"] = [
+            {"camera_to_world": c2w.flatten().tolist(), "fov": 60, "aspect": 1}
+            for c2w in np.asarray(c2ws).reshape(-1, 4, 4)
+        ]
+        return camera_path
+
+
+def rescale_camera_pose(camera_pose: dict, scale: float) -> dict:
+    """Return a copy of `camera_pose` rendering at `scale` times its resolution.
+
+    The field of view is kept, so the image shows the same view in fewer pixels.
+    """
+    rescaled = dict(camera_pose)
+    rescaled["render_height"] = max(1, round(camera_pose["render_height"] * scale))
+    rescaled["render_width"] = max(1, round(camera_pose["render_width"] * scale))
+    return rescaled
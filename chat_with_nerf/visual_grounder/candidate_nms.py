@@ -0,0 +1,75 @@
+from typing import Optional
+
+import numpy as np
+
+
+def box_iou_3d(centroids: np.ndarray, extents: np.ndarray) -> np.ndarray:
+    """Pairwise IoU of axis-aligned 3D boxes given by centroid and extent.
+
+    :return: a (M, M) matrix of IoUs
+    """
+    mins = centroids - extents / 2
+    maxs = centroids + extents / 2
+    overlap = np.clip(
+        np.minimum(maxs[:, None, :], maxs[None, :, :])
+        - np.maximum(mins[:, None, :], mins[None, :, :]),
+        0,
+        None,
+    )
+    intersection = np.prod(overlap, axis=-1)
+    volumes = np.prod(extents, axis=-1)
+    union = volumes[:, None] + volumes[None, :] - intersection
+    return np.divide(
+        intersection, union, out=np.zeros_like(intersection), where=union > 0
+    )
+
+
+def suppress_candidates(
+    centroids: list,
+    extents: list,
+    scores: list,
+    iou_threshold: float,
+    score_threshold: Optional[float] = None,
+    merge: bool = False,
+) -> tuple[list[int], list[np.ndarray], list[tuple]]:
+    """Greedy non-maximum suppression of overlapping candidate boxes.
+
+    Candidates scoring below `score_threshold` are dropped, except for the
+    best one so that there is always a candidate left. With `merge`, a kept
+    box grows to the union of the boxes it suppressed.
+
+    :return: the indices of the kept candidates in their original order and
+        their (possibly merged) centroids and extents
+    """
+    if len(centroids) == 0:
+        return [], [], []
+    centroid_array = np.asarray(centroids, dtype=np.float64).reshape(-1, 3)
+    extent_array = np.asarray(extents, dtype=np.float64).reshape(-1, 3)
+    score_array = np.asarray(scores, dtype=np.float64)
+    ious = box_iou_3d(centroid_array, extent_array)
+
+    order = np.argsort(-score_array, kind="stable")
+    suppressed = np.zeros(len(order), dtype=bool)
+    mins = centroid_array - extent_array / 2
+    maxs = centroid_array + extent_array / 2
+    keep = []
+    for rank, index in enumerate(order):
+        if suppressed[index]:
+            continue
+        if rank > 0 and score_threshold is not None:
+            if score_array[index] < score_threshold:
+                suppressed[index] = True
+                continue
+        keep.append(index)
+        overlapping = (ious[index] > iou_threshold) & ~suppressed
+        overlapping[index] = False
+        overlapping[keep] = False
+        if merge and overlapping.any():
+            mins[index] = np.minimum(mins[index], mins[overlapping].min(axis=0))
+            maxs[index] = np.maximum(maxs[index], maxs[overlapping].max(axis=0))
+        suppressed |= overlapping
+
+    keep = sorted(int(i) for i in keep)
+    kept_centroids = [(mins[i] + maxs[i]) / 2 if merge else centroids[i] for i in keep]
+    kept_extents = [tuple(maxs[i] - mins[i]) if merge else extents[i] for i in keep]
+    return keep, kept_centroids, kept_extents
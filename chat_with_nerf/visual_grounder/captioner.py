@@ -9,6 +9,7 @@ from PIL import Image
 
 from chat_with_nerf import logger
 from chat_with_nerf.settings import Settings
+from chat_with_nerf.visual_grounder.image_batch import preprocess_batch
 from chat_with_nerf.visual_grounder.image_ref import ImageRef
 
 
@@ -19,12 +20,32 @@ class BaseCaptioner:
     vis_processors: dict
     """Preprocessors for visual inputs."""
 
-    def process_image(self, image_path: str) -> torch.Tensor:
-        """Processes an image and returns it as a tensor."""
-        raw_image = Image.open(image_path).convert("RGB")
+    def process_image(self, image: ImageRef | str) -> torch.Tensor:
+        """Processes an image and returns it as a tensor. Rendered images are
+        taken from memory, paths are read from disk."""
+        if isinstance(image, ImageRef):
+            return self.process_images([image])
+        raw_image = Image.open(image).convert("RGB")
         return self.vis_processors["eval"](raw_image).unsqueeze(0).to(self.model.device)
 
-    @abstractmethod
+    def process_images(self, imagerefs: list[ImageRef]) -> torch.Tensor:
+        """Processes the rendered images of all candidates as one batch."""
+        return preprocess_batch(
+            imagerefs, self.vis_processors["eval"], self.model.device
+        )
+
     def caption(self, positive_words: str, imagerefs: list[ImageRef]) -> dict[str, str]:
-        """Generates captions for the images."""
+        """Generates captions for the images of all candidates, preprocessed
+        from memory as one batch.
+
+        :return: the caption of every image, by image path
+        """
+        captions = self.caption_batch(positive_words, self.process_images(imagerefs))
+        return {
+            imageref.wait(): caption for imageref, caption in zip(imagerefs, captions)
+        }
+
+    @abstractmethod
+    def caption_batch(self, positive_words: str, images: torch.Tensor) -> list[str]:
+        """Generates one caption per image of a preprocessed batch."""
         pass
@@ -0,0 +1,166 @@
+import argparse
+import json
+import os
+import time
+from typing import Optional
+
+import torch
+from nerfstudio.pipelines.base_pipeline import Pipeline
+
+from chat_with_nerf import logger
+from chat_with_nerf.settings import Settings
+
+
+def load_tuning() -> dict:
+    if not os.path.exists(Settings.CHUNK_TUNING_PATH):
+        return {}
+    with open(Settings.CHUNK_TUNING_PATH, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def load_tuned_chunk_size(scene_name: str) -> Optional[int]:
+    """The calibrated eval_num_rays_per_chunk of a scene, None if the scene was
+    never calibrated."""
+    tuning = load_tuning().get(scene_name)
+    return None if tuning is None else tuning["eval_num_rays_per_chunk"]
+
+
+def save_tuning(scene_name: str, results: list[dict], best: int) -> None:
+    tuning = load_tuning()
+    tuning[scene_name] = {
+        "eval_num_rays_per_chunk": best,
+        "device": torch.cuda.get_device_name() if torch.cuda.is_available() else "cpu",
+        "results": results,
+    }
+    os.makedirs(os.path.dirname(Settings.CHUNK_TUNING_PATH), exist_ok=True)
+    tmp_path = Settings.CHUNK_TUNING_PATH + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(tuning, f, indent=2)
+    os.replace(tmp_path, Settings.CHUNK_TUNING_PATH)
+
+
+def best_chunk_size(results: list[dict], memory_limit_bytes: int) -> Optional[int]:
+    """The chunk size with the highest throughput that stayed below the memory
+    limit, None if none did."""
+    feasible = [
+        result
+        for result in results
+        if result["rays_per_second"] is not None
+        and result["peak_memory_bytes"] <= memory_limit_bytes
+    ]
+    if not feasible:
+        return None
+    return max(feasible, key=lambda result: result["rays_per_second"])[
+        "eval_num_rays_per_chunk"
+    ]
+
+
+def benchmark_chunk_sizes(
+    lerf_pipeline: Pipeline,
+    chunk_sizes: tuple = Settings.CHUNK_TUNING_SIZES,
+    memory_limit_bytes: int = Settings.CHUNK_TUNING_MEMORY_LIMIT,
+    resolution: int = 512,
+    repeats: int = 3,
+) -> list[dict]:
+    """Time full-image renders of an evaluation camera at each chunk size.
+
+    Chunk sizes are tried in increasing order and the benchmark stops at the
+    first one running out of memory or exceeding `memory_limit_bytes`, as
+    larger chunks only need more.
+
+    :return: per chunk size the render throughput, None if it did not fit,
+        and the peak memory
+    """
+    model = lerf_pipeline.model
+    original_chunk_size = model.config.eval_num_rays_per_chunk
+    camera = lerf_pipeline.datamanager.eval_dataset.cameras[0:1]
+    camera.rescale_output_resolution(
+        resolution / max(int(camera.height), int(camera.width))
+    )
+    ray_bundle = camera.to(lerf_pipeline.device).generate_rays(
+        camera_indices=0, keep_shape=True
+    )
+    num_rays = ray_bundle.origins.shape[0] * ray_bundle.origins.shape[1]
+
+    results = []
+    try:
+        for chunk_size in sorted(chunk_sizes):
+            model.config.eval_num_rays_per_chunk = chunk_size
+            torch.cuda.empty_cache()
+            torch.cuda.reset_peak_memory_stats(lerf_pipeline.device)
+            try:
+                with torch.no_grad():
+                    # warm up, then time
+                    model.get_outputs_for_camera_ray_bundle(ray_bundle)
+                    torch.cuda.synchronize(lerf_pipeline.device)
+                    started_at = time.perf_counter()
+                    for _ in range(repeats):
+                        model.get_outputs_for_camera_ray_bundle(ray_bundle)
+                    torch.cuda.synchronize(lerf_pipeline.device)
+                seconds = (time.perf_counter() - started_at) / repeats
+                rays_per_second = num_rays / seconds
+            except torch.cuda.OutOfMemoryError:
+                rays_per_second = None
+            peak_memory = torch.cuda.max_memory_allocated(lerf_pipeline.device)
+            results.append(
+                {
+                    "eval_num_rays_per_chunk": chunk_size,
+                    "rays_per_second": rays_per_second,
+                    "peak_memory_bytes": peak_memory,
+                }
+            )
+            logger.info(
+                f"eval_num_rays_per_chunk={chunk_size}: "
+                f"{rays_per_second or 0:.0f} rays/s, "
+                f"peak memory {peak_memory / 1024**3:.2f} GiB"
+            )
+            if rays_per_second is None or peak_memory > memory_limit_bytes:
+                break
+    finally:
+        model.config.eval_num_rays_per_chunk = original_chunk_size
+        torch.cuda.empty_cache()
+    return results
+
+
+def calibrate_chunk_size(
+    lerf_pipeline: Pipeline, scene_name: str, save: bool = True
+) -> Optional[int]:
+    """Benchmark the chunk sizes of a scene, apply the best one to the pipeline
+    and persist it for later loads."""
+    results = benchmark_chunk_sizes(lerf_pipeline)
+    best = best_chunk_size(results, Settings.CHUNK_TUNING_MEMORY_LIMIT)
+    if best is None:
+        logger.info(f"No chunk size of {scene_name} fits the memory limit.")
+        return None
+    lerf_pipeline.model.config.eval_num_rays_per_chunk = best
+    if save:
+        save_tuning(scene_name, results, best)
+    logger.info(f"Using eval_num_rays_per_chunk={best} for {scene_name}.")
+    return best
+
+
+if __name__ == "__main__":
+    # imported here to keep the model loading out of the online import path
+    from chat_with_nerf.model.model_context import ModelContextManager
+    from chat_with_nerf.visual_grounder.picture_taker import PictureTakerFactory
+
+    parser = argparse.ArgumentParser(
+        description="Benchmark LERF rendering at several ray chunk sizes and "
+        "store the fastest one per scene."
+    )
+    parser.add_argument("--scenes", nargs="*", help="all scenes if omitted")
+    parser.add_argument(
+        "--benchmark-only", action="store_true", help="do not store the results"
+    )
+    args = parser.parse_args()
+
+    scene_configs = ModelContextManager.search_scenes(Settings.data_path)
+    for scene_name, scene_config in scene_configs.items():
+        if args.scenes and scene_name not in args.scenes:
+            continue
+        lerf_pipeline = PictureTakerFactory.initialize_lerf_pipeline(
+            scene_config.load_lerf_config, scene_name
+        )
+        calibrate_chunk_size(lerf_pipeline, scene_name, save=not args.benchmark_only)
+        del lerf_pipeline
+        torch.cuda.empty_cache()
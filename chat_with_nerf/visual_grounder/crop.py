@@ -41,3 +41,37 @@ def get_crop_from_json(camera_json: dict[str, Any]) -> CropData | None:
         center=torch.Tensor(camera_json["crop"]["crop_center"]),
         scale=torch.Tensor(camera_json["crop"]["crop_scale"]),
     )
+
+
+def crop_ray_bounds(
+    origins: torch.Tensor,
+    directions: torch.Tensor,
+    box_min: torch.Tensor,
+    box_max: torch.Tensor,
+    near_plane: float = 0.0,
+) -> tuple[torch.Tensor, torch.Tensor]:
+    """Intersect rays with axis-aligned boxes (slab method).
+
+    The boxes broadcast against the rays, so every camera of a batch can have
+    its own crop. Rays missing their box get an empty interval (near == far)
+    and render as background.
+
+    args:
+        origins: ray origins [..., 3]
+        directions: ray directions [..., 3]
+        box_min: lower box corners, broadcastable to origins
+        box_max: upper box corners, broadcastable to origins
+        near_plane: smallest allowed near distance
+    returns:
+        nears and fars [..., 1]
+    """
+    safe_directions = torch.where(
+        directions.abs() < 1e-10, torch.full_like(directions, 1e-10), directions
+    )
+    t_box_min = (box_min - origins) / safe_directions
+    t_box_max = (box_max - origins) / safe_directions
+    nears = torch.minimum(t_box_min, t_box_max).amax(dim=-1, keepdim=True)
+    fars = torch.maximum(t_box_min, t_box_max).amin(dim=-1, keepdim=True)
+    nears = nears.clamp(min=near_plane)
+    fars = torch.maximum(fars, nears)
+    return nears, fars
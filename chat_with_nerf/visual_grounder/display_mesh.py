@@ -0,0 +1,375 @@
+import hashlib
+import json
+import os
+import struct
+import threading
+from typing import Optional
+
+import numpy as np
+from attrs import define
+
+from chat_with_nerf.settings import Settings
+from chat_with_nerf.util import atomic_write_path
+from chat_with_nerf.visual_grounder.render_cache import DiskLRUCache
+
+# axis swap of the scene meshes for the gradio viewer
+DISPLAY_AXIS_SWAP = np.array(
+    [[0, -1, 0, 0], [0, 0, 1, 0], [-1, 0, 0, 0], [0, 0, 0, 1]], dtype=np.float64
+)
+DISPLAY_SCALE = 10.0
+
+GLTF_FLOAT = 5126
+GLTF_UNSIGNED_INT = 5125
+GLTF_ARRAY_BUFFER = 34962
+GLTF_ELEMENT_ARRAY_BUFFER = 34963
+
+
+def display_transform(vertices: np.ndarray, scale: float = DISPLAY_SCALE) -> np.ndarray:
+    """The display transform of the gradio viewer as one matrix: the axis swap
+    followed by a scaling about the center of the swapped vertices.
+
+    Computing it once from the base scene lets overlays be placed in the same
+    display frame without the scene mesh.
+    """
+    center = DISPLAY_AXIS_SWAP[:3, :3] @ np.asarray(vertices).mean(axis=0)
+    scaling = np.eye(4)
+    scaling[:3, :3] *= scale
+    scaling[:3, 3] = center - scale * center
+    return scaling @ DISPLAY_AXIS_SWAP
+
+
+def transform_points(points: np.ndarray, transform: np.ndarray) -> np.ndarray:
+    return points @ transform[:3, :3].T + transform[:3, 3]
+
+
+@define
+class MeshArrays:
+    """Triangle mesh geometry as flat arrays, ready for a glTF buffer."""
+
+    vertices: np.ndarray  # (N, 3) float32
+    triangles: np.ndarray  # (M, 3) uint32
+    colors: np.ndarray  # (N, 3) float32 in [0, 1]
+
+    @classmethod
+    def from_o3d(cls, mesh) -> "MeshArrays":
+        vertices = np.asarray(mesh.vertices, dtype=np.float32)
+        colors = np.asarray(mesh.vertex_colors, dtype=np.float32)
+        if colors.shape[0] != vertices.shape[0]:
+            colors = np.full_like(vertices, 0.5)
+        return cls(vertices, np.asarray(mesh.triangles, dtype=np.uint32), colors)
+
+    @classmethod
+    def concatenate(cls, meshes: list["MeshArrays"]) -> "MeshArrays":
+        offsets = np.cumsum([0] + [mesh.vertices.shape[0] for mesh in meshes[:-1]])
+        return cls(
+            np.concatenate([mesh.vertices for mesh in meshes]).reshape(-1, 3),
+            np.concatenate(
+                [mesh.triangles + offset for mesh, offset in zip(meshes, offsets)]
+            )
+            .reshape(-1, 3)
+            .astype(np.uint32),
+            np.concatenate([mesh.colors for mesh in meshes]).reshape(-1, 3),
+        )
+
+    def transformed(self, transform: np.ndarray) -> "MeshArrays":
+        vertices = transform_points(self.vertices.astype(np.float64), transform)
+        return MeshArrays(vertices.astype(np.float32), self.triangles, self.colors)
+
+    def brightened(self, factor: float) -> "MeshArrays":
+        colors = np.clip(self.colors * factor, 0, 1).astype(np.float32)
+        return MeshArrays(self.vertices, self.triangles, colors)
+
+
+def buffer_layout(vertex_count: int, triangle_count: int) -> list[tuple[int, int]]:
+    """Byte (offset, length) of the indices, positions and colors of a mesh in
+    its glTF buffer. All parts are 4-byte sized, so no padding is needed."""
+    index_bytes = triangle_count * 3 * 4
+    vertex_bytes = vertex_count * 3 * 4
+    return [
+        (0, index_bytes),
+        (index_bytes, vertex_bytes),
+        (index_bytes + vertex_bytes, vertex_bytes),
+    ]
+
+
+def mesh_buffer(mesh: MeshArrays) -> bytes:
+    return (
+        mesh.triangles.astype("<u4").tobytes()
+        + mesh.vertices.astype("<f4").tobytes()
+        + mesh.colors.astype("<f4").tobytes()
+    )
+
+
+@define
+class DisplayAsset:
+    """A base scene mesh with the display transform and brightening baked in,
+    kept in memory and stored once as a raw glTF buffer that result files
+    copy."""
+
+    bin_path: str
+    transform: np.ndarray
+    mesh: MeshArrays
+    bounds_min: list
+    bounds_max: list
+
+    @property
+    def vertex_count(self) -> int:
+        return self.mesh.vertices.shape[0]
+
+    @property
+    def triangle_count(self) -> int:
+        return self.mesh.triangles.shape[0]
+
+    @classmethod
+    def write(
+        cls, bin_path: str, mesh: MeshArrays, transform: np.ndarray
+    ) -> "DisplayAsset":
+        display = mesh.transformed(transform)
+        os.makedirs(os.path.dirname(bin_path), exist_ok=True)
+        with atomic_write_path(bin_path) as tmp_path, open(tmp_path, "wb") as f:
+            f.write(mesh_buffer(display))
+        return cls(
+            bin_path,
+            transform,
+            display,
+            display.vertices.min(axis=0).tolist(),
+            display.vertices.max(axis=0).tolist(),
+        )
+
+
+def add_mesh(
+    gltf: dict,
+    buffer_index: int,
+    vertex_count: int,
+    triangle_count: int,
+    bounds: tuple[list, list],
+    byte_offset: int = 0,
+) -> None:
+    """Add a vertex-colored mesh stored in `buffer_index` from `byte_offset`
+    on with the buffer_layout of its counts, and a node showing it."""
+    first_view = len(gltf["bufferViews"])
+    targets = [GLTF_ELEMENT_ARRAY_BUFFER, GLTF_ARRAY_BUFFER, GLTF_ARRAY_BUFFER]
+    for (offset, length), target in zip(
+        buffer_layout(vertex_count, triangle_count), targets
+    ):
+        gltf["bufferViews"].append(
+            {
+                "buffer": buffer_index,
+                "byteOffset": byte_offset + offset,
+                "byteLength": length,
+                "target": target,
+            }
+        )
+    first_accessor = len(gltf["accessors"])
+    gltf["accessors"].extend(
+        [
+            {
+                "bufferView": first_view,
+                "componentType": GLTF_UNSIGNED_INT,
+                "count": triangle_count * 3,
+                "type": "SCALAR",
+            },
+            {
+                "bufferView": first_view + 1,
+                "componentType": GLTF_FLOAT,
+                "count": vertex_count,
+                "type": "VEC3",
+                "min": [float(x) for x in bounds[0]],
+                "max": [float(x) for x in bounds[1]],
+            },
+            {
+                "bufferView": first_view + 2,
+                "componentType": GLTF_FLOAT,
+                "count": vertex_count,
+                "type": "VEC3",
+            },
+        ]
+    )
+    gltf["meshes"].append(
+        {
+            "primitives": [
+                {
+                    "attributes": {
+                        "POSITION": first_accessor + 1,
+                        "COLOR_0": first_accessor + 2,
+                    },
+                    "indices": first_accessor,
+                    "material": 0,
+                }
+            ]
+        }
+    )
+    gltf["nodes"].append({"mesh": len(gltf["meshes"]) - 1})
+    gltf["scenes"][0]["nodes"].append(len(gltf["nodes"]) - 1)
+
+
+def glb_bytes(gltf: dict, binary: bytes) -> bytes:
+    json_chunk = json.dumps(gltf, separators=(",", ":")).encode("utf-8")
+    json_chunk += b" " * (-len(json_chunk) % 4)
+    chunks = struct.pack("<I4s", len(json_chunk), b"JSON") + json_chunk
+    if binary:
+        binary += b"\0" * (-len(binary) % 4)
+        chunks += struct.pack("<I4s", len(binary), b"BIN\0") + binary
+    return struct.pack("<4sII", b"glTF", 2, 12 + len(chunks)) + chunks
+
+
+def write_overlay_glb(
+    path: str, overlay: MeshArrays, base: Optional[DisplayAsset] = None
+) -> str:
+    """Write the overlay geometry, already in the display frame, as a GLB.
+
+    With `base`, the GLB also shows the base scene. Its stored buffer is
+    copied into the binary chunk as is, so the base is neither transformed
+    nor re-encoded, and the file stays self-contained: gradio copies result
+    files to its own cache, where relative buffer uris would not resolve.
+    """
+    gltf: dict = {
+        "asset": {"version": "2.0"},
+        "scene": 0,
+        "scenes": [{"nodes": []}],
+        "nodes": [],
+        "meshes": [],
+        "materials": [
+            {
+                "pbrMetallicRoughness": {
+                    "baseColorFactor": [1.0, 1.0, 1.0, 1.0],
+                    "metallicFactor": 0.0,
+                    "roughnessFactor": 1.0,
+                }
+            }
+        ],
+        "buffers": [],
+        "bufferViews": [],
+        "accessors": [],
+    }
+    binary = b""
+    if overlay.triangles.shape[0] > 0:
+        binary = mesh_buffer(overlay)
+        add_mesh(
+            gltf,
+            0,
+            overlay.vertices.shape[0],
+            overlay.triangles.shape[0],
+            (overlay.vertices.min(axis=0), overlay.vertices.max(axis=0)),
+        )
+    if base is not None:
+        with open(base.bin_path, "rb") as f:
+            base_binary = f.read()
+        add_mesh(
+            gltf,
+            0,
+            base.vertex_count,
+            base.triangle_count,
+            (base.bounds_min, base.bounds_max),
+            byte_offset=len(binary),
+        )
+        binary += base_binary
+    if binary:
+        gltf["buffers"].append({"byteLength": len(binary)})
+
+    with atomic_write_path(path) as tmp_path, open(tmp_path, "wb") as f:
+        f.write(glb_bytes(gltf, binary))
+    return path
+
+
+def write_mesh_obj(path: str, mesh: MeshArrays) -> str:
+    """Write a mesh as OBJ with the common `v x y z r g b` vertex colors."""
+    with atomic_write_path(path) as tmp_path:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            np.savetxt(
+                f,
+                np.hstack([mesh.vertices, mesh.colors]),
+                fmt="v %.6f %.6f %.6f %.6f %.6f %.6f",
+            )
+            np.savetxt(f, mesh.triangles.astype(np.int64) + 1, fmt="f %d %d %d")
+    return path
+
+
+def export_result_mesh(path: str, base: DisplayAsset, overlay: MeshArrays) -> str:
+    """Export a grounding result: the overlay, given in the scene frame, on top
+    of the base scene.
+
+    GLB results in the "copy_base" MESH_EXPORT_MODE copy the stored base
+    buffer next to the overlay; otherwise the baked base mesh is combined with
+    the overlay into one mesh. Either way the result holds the whole scene.
+    """
+    overlay = overlay.transformed(base.transform)
+    if path.endswith(".obj"):
+        return write_mesh_obj(path, MeshArrays.concatenate([base.mesh, overlay]))
+    if Settings.MESH_EXPORT_MODE == "copy_base":
+        return write_overlay_glb(path, overlay, base)
+    return write_overlay_glb(path, MeshArrays.concatenate([base.mesh, overlay]))
+
+
+def result_mesh_key(base: DisplayAsset, overlay: MeshArrays, suffix: str) -> str:
+    """Content address of a result mesh: the base scene, the overlay and how
+    they are exported."""
+    digest = hashlib.sha1()
+    digest.update(
+        json.dumps(
+            [
+                os.path.basename(base.bin_path),
+                base.vertex_count,
+                base.triangle_count,
+                np.asarray(base.transform).tolist(),
+                Settings.MESH_EXPORT_MODE,
+                suffix,
+            ]
+        ).encode("utf-8")
+    )
+    digest.update(mesh_buffer(overlay))
+    return digest.hexdigest()
+
+
+_result_caches: dict[str, DiskLRUCache] = {}
+_result_caches_lock = threading.Lock()
+
+
+def result_cache_for(suffix: str) -> DiskLRUCache:
+    with _result_caches_lock:
+        if suffix not in _result_caches:
+            _result_caches[suffix] = DiskLRUCache(
+                os.path.join(Settings.output_path, "mesh_vis", "results"),
+                Settings.RESULT_MESH_CACHE_MAX_BYTES,
+                suffix,
+            )
+        return _result_caches[suffix]
+
+
+def cached_result_mesh(
+    base: DisplayAsset, overlay: MeshArrays, suffix: str = ".glb"
+) -> str:
+    """The result mesh of an overlay on a base scene, exported only when no
+    earlier result had the same contents.
+
+    :param suffix: ".glb", or ".obj" for the ScanNet viewer
+    """
+    cache = result_cache_for(suffix)
+    key = result_mesh_key(base, overlay, suffix)
+    path = cache.get(key)
+    if path is not None:
+        return path
+    export_result_mesh(cache.path_for(key), base, overlay)
+    return cache.commit(key)
+
+
+_display_assets: dict[str, DisplayAsset] = {}
+_display_assets_lock = threading.Lock()
+
+
+def display_asset_for(name: str, mesh, bright_factor: float = 1.0) -> DisplayAsset:
+    """The display asset of a base scene mesh, built on first use. Scenes
+    build theirs when they load, so requests only compose overlays.
+
+    :param name: unique name of the base mesh, e.g. the scene name
+    :param mesh: the open3d base scene mesh
+    """
+    with _display_assets_lock:
+        if name not in _display_assets:
+            arrays = MeshArrays.from_o3d(mesh).brightened(bright_factor)
+            _display_assets[name] = DisplayAsset.write(
+                os.path.join(Settings.output_path, "mesh_vis", f"{name}_display.bin"),
+                arrays,
+                display_transform(arrays.vertices),
+            )
+        return _display_assets[name]
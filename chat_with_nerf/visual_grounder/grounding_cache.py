@@ -0,0 +1,277 @@
+import glob
+import json
+import os
+import pickle
+import threading
+import time
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+from typing import Any, Optional
+
+from attrs import define, field
+
+from chat_with_nerf import logger
+from chat_with_nerf.settings import Settings
+
+TARGET = "target"
+LANDMARK = "landmark"
+
+
+def normalize_phrase(phrase: str) -> str:
+    """Normalize a grounding phrase so that trivially different spellings share
+    one cache entry."""
+    return " ".join(phrase.lower().strip().split())
+
+
+@define
+class LiveTrafficMonitor:
+    """Tracks in-flight live grounding requests so that background work can
+    yield to them."""
+
+    active_requests: int = field(init=False, default=0)
+    last_activity: float = field(init=False, factory=time.monotonic)
+    condition: threading.Condition = field(init=False, factory=threading.Condition)
+    background: threading.local = field(init=False, factory=threading.local)
+
+    @contextmanager
+    def live_request(self):
+        with self.condition:
+            self.active_requests += 1
+        try:
+            yield
+        finally:
+            with self.condition:
+                self.active_requests -= 1
+                self.last_activity = time.monotonic()
+                self.condition.notify_all()
+
+    def wait_until_idle(self, idle_seconds: float) -> None:
+        """Block until no live request has been running for `idle_seconds`."""
+        with self.condition:
+            while True:
+                if self.active_requests == 0:
+                    quiet_for = time.monotonic() - self.last_activity
+                    if quiet_for >= idle_seconds:
+                        return
+                    self.condition.wait(idle_seconds - quiet_for)
+                else:
+                    self.condition.wait()
+
+    @contextmanager
+    def background_work(self, idle_seconds: float):
+        """Mark the calling thread as background work, whose checkpoints wait
+        for `idle_seconds` without live requests."""
+        self.background.idle_seconds = idle_seconds
+        try:
+            yield
+        finally:
+            self.background.idle_seconds = None
+
+    def checkpoint(self) -> None:
+        """Pause background work between the stages of a grounding computation
+        while live requests run. Does nothing on other threads."""
+        idle_seconds = getattr(self.background, "idle_seconds", None)
+        if idle_seconds is not None:
+            self.wait_until_idle(idle_seconds)
+
+
+live_traffic = LiveTrafficMonitor()
+
+
+def settings_fingerprint(max_cluster_points: Optional[int] = None) -> str:
+    """The settings that change grounding results. A stored cache computed
+    under other settings is not loaded.
+
+    :param max_cluster_points: the scene's override of MAX_CLUSTER_POINTS
+    """
+    return json.dumps(
+        [
+            max_cluster_points or Settings.MAX_CLUSTER_POINTS,
+            Settings.CLUSTER_VOXEL_SIZE,
+            Settings.NMS_IOU_THRESHOLD,
+            Settings.NMS_SCORE_THRESHOLD,
+            Settings.NMS_MERGE,
+            Settings.ENABLE_CROP_RENDERING,
+            Settings.CROP_MARGIN,
+            Settings.CROP_MIN_SIZE,
+            list(Settings.CROP_BACKGROUND_COLOR),
+            Settings.ENABLE_VISIBILITY_CHECK,
+            list(Settings.VISIBILITY_AZIMUTHS),
+            Settings.VISIBILITY_TOLERANCE,
+            Settings.VISIBILITY_MAX_TARGETS,
+            Settings.MAX_OCCLUSION,
+        ]
+    )
+
+
+@define
+class GroundingCache:
+    """An LRU cache of grounding results for one scene, keyed by the role of
+    the phrase (target or landmark) and the normalized phrase."""
+
+    cache_path: Optional[str] = None
+    max_entries: int = Settings.GROUNDING_CACHE_MAX_ENTRIES
+    fingerprint: str = field(factory=settings_fingerprint)
+    entries: OrderedDict = field(init=False, factory=OrderedDict)
+    hits: int = field(init=False, default=0)
+    misses: int = field(init=False, default=0)
+    lock: threading.Lock = field(init=False, factory=threading.Lock)
+
+    @classmethod
+    def for_scene(
+        cls, scene: str, max_cluster_points: Optional[int] = None
+    ) -> "GroundingCache":
+        cache_path = os.path.join(
+            Settings.output_path, "grounding_cache", f"{scene}.pkl"
+        )
+        cache = cls(
+            cache_path=cache_path,
+            fingerprint=settings_fingerprint(max_cluster_points),
+        )
+        cache.load()
+        return cache
+
+    def get(self, role: str, phrase: str) -> Any | None:
+        key = (role, normalize_phrase(phrase))
+        with self.lock:
+            if key not in self.entries:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return self.entries[key]
+
+    def put(self, role: str, phrase: str, result: Any) -> None:
+        key = (role, normalize_phrase(phrase))
+        with self.lock:
+            self.entries[key] = result
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def __contains__(self, role_and_phrase: tuple[str, str]) -> bool:
+        role, phrase = role_and_phrase
+        with self.lock:
+            return (role, normalize_phrase(phrase)) in self.entries
+
+    def load(self) -> None:
+        if self.cache_path is None or not os.path.exists(self.cache_path):
+            return
+        try:
+            with open(self.cache_path, "rb") as file:
+                stored = pickle.load(file)
+        except (OSError, pickle.UnpicklingError, EOFError) as exp:
+            logger.warning(
+                f"Ignoring unreadable grounding cache {self.cache_path}: {exp}"
+            )
+            return
+        if (
+            not isinstance(stored, dict)
+            or stored.get("fingerprint") != self.fingerprint
+        ):
+            logger.info(
+                f"Ignoring grounding cache {self.cache_path} computed with other "
+                "settings."
+            )
+            return
+        with self.lock:
+            self.entries = OrderedDict(stored["entries"])
+
+    def save(self) -> None:
+        if self.cache_path is None:
+            return
+        os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+        with self.lock:
+            entries = list(self.entries.items())
+        tmp_path = self.cache_path + ".tmp"
+        with open(tmp_path, "wb") as file:
+            pickle.dump({"fingerprint": self.fingerprint, "entries": entries}, file)
+        os.replace(tmp_path, self.cache_path)
+
+
+def read_query_log(output_path: str) -> dict[str, Counter]:
+    """Count the target and landmark phrases of all saved sessions, per
+    scene.
+
+    :return: a mapping from scene name to a Counter of (role, phrase)
+    """
+    counters: dict[str, Counter] = {}
+    for session_file in glob.glob(os.path.join(output_path, "*", "*.json")):
+        try:
+            with open(session_file, encoding="utf-8") as file:
+                data = json.load(file)
+        except (OSError, json.JSONDecodeError):
+            continue
+        if not isinstance(data, dict) or data.get("working_scene_name") is None:
+            continue
+
+        counter = counters.setdefault(data["working_scene_name"], Counter())
+        if data.get("grounding_query"):
+            counter[(TARGET, normalize_phrase(data["grounding_query"]))] += 1
+        for phrase in data.get("landmark_queries") or []:
+            if phrase:
+                counter[(LANDMARK, normalize_phrase(phrase))] += 1
+
+    return counters
+
+
+@define
+class GroundingPrecomputeWorker:
+    """Background worker that precomputes grounding results for the most
+    frequent phrases of each scene while no live request is running."""
+
+    picture_takers: dict
+    top_phrases: int = Settings.PRECOMPUTE_TOP_PHRASES
+    interval: float = Settings.PRECOMPUTE_INTERVAL
+    idle_seconds: float = Settings.PRECOMPUTE_IDLE_SECONDS
+    monitor: LiveTrafficMonitor = live_traffic
+    stop_event: threading.Event = field(init=False, factory=threading.Event)
+    thread: Optional[threading.Thread] = field(init=False, default=None)
+
+    def start(self) -> None:
+        if self.thread is not None and self.thread.is_alive():
+            return
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def stop(self) -> None:
+        self.stop_event.set()
+
+    def run(self) -> None:
+        while not self.stop_event.is_set():
+            try:
+                self.run_once()
+            except Exception as exp:
+                logger.error(f"Grounding precompute failed: {exp}")
+            self.stop_event.wait(self.interval)
+
+    def run_once(self) -> int:
+        """Precompute the missing frequent phrases once.
+
+        :return: the number of phrases that were precomputed
+        """
+        # imported here to avoid a circular import with visual_grounder
+        from chat_with_nerf.visual_grounder.visual_grounder import VisualGrounder
+
+        computed = 0
+        for scene, counter in read_query_log(Settings.output_path).items():
+            picture_taker = self.picture_takers.get(scene)
+            if picture_taker is None:
+                continue
+            cache = picture_taker.grounding_cache
+            for (role, phrase), _ in counter.most_common(self.top_phrases):
+                if (role, phrase) in cache:
+                    continue
+                # only start a computation when the device is free of live requests
+                self.monitor.wait_until_idle(self.idle_seconds)
+                if self.stop_event.is_set():
+                    return computed
+                logger.info(f"Precomputing {role} phrase '{phrase}' for {scene}.")
+                # the pipeline pauses at its checkpoints while live requests run
+                with self.monitor.background_work(self.idle_seconds):
+                    VisualGrounder.precompute(scene, role, phrase, picture_taker)
+                computed += 1
+            cache.save()
+
+        return computed
@@ -0,0 +1,34 @@
+from typing import Callable, Optional
+
+import numpy as np
+import torch
+from PIL import Image
+
+from chat_with_nerf.visual_grounder.image_ref import ImageRef
+
+
+def pil_images(image_refs: list[ImageRef]) -> list[Image.Image]:
+    """PIL views of the in-memory uint8 pixels of rendered images. Only refs
+    that hold nothing but a path read their file."""
+    return [Image.fromarray(image_ref.pixels) for image_ref in image_refs]
+
+
+def preprocess_batch(
+    image_refs: list[ImageRef],
+    preprocess: Optional[Callable[[Image.Image], torch.Tensor]],
+    device: str | torch.device,
+) -> torch.Tensor:
+    """Preprocess the images of all candidates once for one model and move
+    them to `device` as one batch.
+
+    :param preprocess: the model's transform of a PIL image, None for the
+        plain float pixels
+    :return: a (B, ...) tensor on `device`
+    """
+    if preprocess is None:
+        batch = torch.from_numpy(
+            np.stack([image_ref.raw_image for image_ref in image_refs])
+        )
+    else:
+        batch = torch.stack([preprocess(image) for image in pil_images(image_refs)])
+    return batch.to(device, non_blocking=True)
@@ -1,8 +1,39 @@
-from attrs import define
-from PIL.Image import Image
+from concurrent.futures import Future
+from typing import Optional
+
+import numpy as np
+from attrs import converters, define, field
+from PIL import Image
+
+from chat_with_nerf.visual_grounder.image_writer import to_uint8
 
 
 @define
 class ImageRef:
     rgb_address: str
-    raw_image: Image
+    image_pixels: Optional[np.ndarray] = field(
+        default=None, converter=converters.optional(to_uint8)
+    )
+    """uint8 pixels, converted once on creation. None keeps only the path and
+    decodes the file on first use."""
+    written: Optional[Future] = None
+    """Background write of `rgb_address`, None if it was written synchronously."""
+
+    def wait(self) -> str:
+        """Block until the image file exists and return its path."""
+        if self.written is not None:
+            self.written.result()
+        return self.rgb_address
+
+    @property
+    def pixels(self) -> np.ndarray:
+        """The (H, W, 3) uint8 pixels."""
+        if self.image_pixels is None:
+            with Image.open(self.wait()) as image:
+                self.image_pixels = np.asarray(image.convert("RGB"))
+        return self.image_pixels
+
+    @property
+    def raw_image(self) -> np.ndarray:
+        """The pixels as floats in [0, 1], converted on every access."""
+        return self.pixels.astype(np.float32) / 255.0
@@ -0,0 +1,83 @@
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from uuid import uuid4
+
+import numpy as np
+from attrs import define, field
+from PIL import Image
+
+from chat_with_nerf.settings import Settings
+
+
+def to_uint8(image: np.ndarray) -> np.ndarray:
+    """Convert a float image in [0, 1] to uint8, passing uint8 through."""
+    if image.dtype == np.uint8:
+        return image
+    return (np.clip(image, 0.0, 1.0) * 255.0 + 0.5).astype(np.uint8)
+
+
+def write_image_atomic(path: str, pixels: np.ndarray, compress_level: int) -> str:
+    """Encode `pixels` to `path` through a temporary file in the same directory
+    so that readers never see a partially written image."""
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".webp":
+        image_format, options = "WEBP", {
+            "lossless": True,
+            "method": min(compress_level, 6),
+        }
+    else:
+        image_format, options = "PNG", {"compress_level": compress_level}
+    tmp_path = f"{path}.{uuid4().hex}.tmp"
+    try:
+        Image.fromarray(pixels).save(tmp_path, format=image_format, **options)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return path
+
+
+@define
+class AsyncImageWriter:
+    """Encodes and writes rendered images on background threads. At most
+    `max_pending` images are queued; further submissions wait for a slot."""
+
+    max_workers: int = Settings.IMAGE_WRITER_WORKERS
+    max_pending: int = Settings.IMAGE_WRITER_MAX_PENDING
+    compress_level: int = Settings.IMAGE_COMPRESS_LEVEL
+    executor: ThreadPoolExecutor = field(init=False)
+    slots: threading.BoundedSemaphore = field(init=False)
+
+    @executor.default
+    def _default_executor(self) -> ThreadPoolExecutor:
+        return ThreadPoolExecutor(
+            max_workers=self.max_workers, thread_name_prefix="image_writer"
+        )
+
+    @slots.default
+    def _default_slots(self) -> threading.BoundedSemaphore:
+        return threading.BoundedSemaphore(self.max_pending)
+
+    def submit(self, path: str, image: np.ndarray) -> Future:
+        """Queue `image` for writing to `path`.
+
+        :return: a future resolving to `path` once the file is in place
+        """
+        pixels = to_uint8(image)
+        self.slots.acquire()
+        try:
+            future = self.executor.submit(
+                write_image_atomic, path, pixels, self.compress_level
+            )
+        except BaseException:
+            self.slots.release()
+            raise
+        future.add_done_callback(lambda _: self.slots.release())
+        return future
+
+    def shutdown(self) -> None:
+        self.executor.shutdown(wait=True)
+
+
+image_writer = AsyncImageWriter()
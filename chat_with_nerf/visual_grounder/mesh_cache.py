@@ -0,0 +1,88 @@
+import json
+import os
+from typing import Optional
+
+import numpy as np
+
+from chat_with_nerf import logger
+
+MESH_CACHE_VERSION = 1
+MESH_ARRAY_NAMES = (
+    "vertices",
+    "triangles",
+    "vertex_colors",
+    "vertex_normals",
+    "triangle_normals",
+)
+
+
+def mesh_cache_path(source_path: str) -> str:
+    return source_path + ".cache.npz"
+
+
+def mesh_cache_key(*paths: Optional[str]) -> str:
+    """Fingerprint of the files a preprocessed mesh derives from: their size
+    and modification time, so replacing any of them invalidates the cache."""
+    fingerprint = [MESH_CACHE_VERSION]
+    for path in paths:
+        if path is None:
+            fingerprint.append(None)
+            continue
+        stat = os.stat(path)
+        fingerprint.append([os.path.basename(path), stat.st_size, stat.st_mtime_ns])
+    return json.dumps(fingerprint)
+
+
+def mesh_arrays(mesh) -> dict[str, np.ndarray]:
+    """The geometry of an open3d triangle mesh as contiguous arrays."""
+    return {
+        name: np.ascontiguousarray(np.asarray(getattr(mesh, name)))
+        for name in MESH_ARRAY_NAMES
+    }
+
+
+def load_mesh_arrays(
+    source_path: str, key: str
+) -> Optional[tuple[dict[str, np.ndarray], Optional[np.ndarray]]]:
+    """The cached arrays and axis alignment of a preprocessed mesh, None if
+    there is no cache for `key`."""
+    cache_path = mesh_cache_path(source_path)
+    if not os.path.exists(cache_path):
+        return None
+    try:
+        with np.load(cache_path, allow_pickle=False) as data:
+            if str(data["key"]) != key:
+                return None
+            arrays = {name: data[name] for name in MESH_ARRAY_NAMES}
+            axis_align_matrix = data["axis_align_matrix"]
+    except (OSError, KeyError, ValueError) as exp:
+        logger.info(f"Ignoring unreadable mesh cache {cache_path}: {exp}")
+        return None
+    if axis_align_matrix.size == 0:
+        axis_align_matrix = None
+    return arrays, axis_align_matrix
+
+
+def save_mesh_arrays(
+    source_path: str,
+    key: str,
+    arrays: dict[str, np.ndarray],
+    axis_align_matrix: Optional[np.ndarray] = None,
+) -> None:
+    """Store the preprocessed mesh arrays next to the source mesh. An
+    uncompressed archive keeps loading a plain read."""
+    cache_path = mesh_cache_path(source_path)
+    tmp_path = cache_path + ".tmp"
+    try:
+        with open(tmp_path, "wb") as f:
+            np.savez(
+                f,
+                key=np.array(key),
+                axis_align_matrix=(
+                    np.zeros(0) if axis_align_matrix is None else axis_align_matrix
+                ),
+                **arrays,
+            )
+        os.replace(tmp_path, cache_path)
+    except OSError as exp:
+        logger.info(f"Could not write the mesh cache {cache_path}: {exp}")
@@ -0,0 +1,262 @@
+import argparse
+import json
+import os
+from typing import Optional
+
+import numpy as np
+
+from chat_with_nerf import logger
+from chat_with_nerf.settings import Settings
+from chat_with_nerf.visual_grounder.display_mesh import (
+    GLTF_ARRAY_BUFFER,
+    GLTF_ELEMENT_ARRAY_BUFFER,
+    GLTF_UNSIGNED_INT,
+    MeshArrays,
+    glb_bytes,
+)
+
+LOD_DIRECTORY = "lod"
+LOD_MANIFEST = "manifest.json"
+
+GLTF_UNSIGNED_BYTE = 5121
+GLTF_UNSIGNED_SHORT = 5123
+
+
+def source_mesh_name(scene_name: str) -> str:
+    """The display mesh the viewer loads for a scene without LOD levels."""
+    return "scene_for_gradio_v7.obj" if scene_name.startswith("s") else "poly.glb"
+
+
+def quantized_glb_bytes(mesh: MeshArrays) -> bytes:
+    """Encode a vertex-colored mesh as a compact GLB with KHR_mesh_quantization.
+
+    Positions are stored as uint16 on the mesh bounds and dequantized by the
+    node transform, colors as normalized uint8 and indices as uint16 when the
+    mesh has few enough vertices.
+    """
+    vertices = mesh.vertices.astype(np.float64)
+    bounds_min = vertices.min(axis=0)
+    step = (vertices.max(axis=0) - bounds_min) / 65535
+    step[step == 0] = 1.0
+    quantized = np.zeros((vertices.shape[0], 4), dtype="<u2")  # padded to 8 bytes
+    quantized[:, :3] = np.round((vertices - bounds_min) / step)
+    colors = np.full((vertices.shape[0], 4), 255, dtype=np.uint8)
+    colors[:, :3] = np.round(np.clip(mesh.colors, 0, 1) * 255)
+    small = vertices.shape[0] <= 65535
+    indices = mesh.triangles.astype("<u2" if small else "<u4").reshape(-1)
+
+    views, binary = [], b""
+    for data, target, stride in (
+        (indices.tobytes(), GLTF_ELEMENT_ARRAY_BUFFER, None),
+        (quantized.tobytes(), GLTF_ARRAY_BUFFER, 8),
+        (colors.tobytes(), GLTF_ARRAY_BUFFER, None),
+    ):
+        view = {
+            "buffer": 0,
+            "byteOffset": len(binary),
+            "byteLength": len(data),
+            "target": target,
+        }
+        if stride is not None:
+            view["byteStride"] = stride
+        views.append(view)
+        binary += data + b"\0" * (-len(data) % 4)
+
+    gltf = {
+        "asset": {"version": "2.0"},
+        "extensionsUsed": ["KHR_mesh_quantization"],
+        "extensionsRequired": ["KHR_mesh_quantization"],
+        "scene": 0,
+        "scenes": [{"nodes": [0]}],
+        "nodes": [
+            {"mesh": 0, "translation": bounds_min.tolist(), "scale": step.tolist()}
+        ],
+        "meshes": [
+            {
+                "primitives": [
+                    {
+                        "attributes": {"POSITION": 1, "COLOR_0": 2},
+                        "indices": 0,
+                        "material": 0,
+                    }
+                ]
+            }
+        ],
+        "materials": [
+            {"pbrMetallicRoughness": {"metallicFactor": 0.0, "roughnessFactor": 1.0}}
+        ],
+        "buffers": [{"byteLength": len(binary)}],
+        "bufferViews": views,
+        "accessors": [
+            {
+                "bufferView": 0,
+                "componentType": GLTF_UNSIGNED_SHORT if small else GLTF_UNSIGNED_INT,
+                "count": indices.shape[0],
+                "type": "SCALAR",
+            },
+            {
+                "bufferView": 1,
+                "componentType": GLTF_UNSIGNED_SHORT,
+                "count": vertices.shape[0],
+                "type": "VEC3",
+                "min": quantized[:, :3].min(axis=0).tolist(),
+                "max": quantized[:, :3].max(axis=0).tolist(),
+            },
+            {
+                "bufferView": 2,
+                "componentType": GLTF_UNSIGNED_BYTE,
+                "normalized": True,
+                "count": vertices.shape[0],
+                "type": "VEC4",
+            },
+        ],
+    }
+    return glb_bytes(gltf, binary)
+
+
+def load_manifest(scene_dir: str) -> Optional[dict]:
+    """The LOD manifest of a scene, None if the levels were not built or are
+    older than the source mesh."""
+    manifest_path = os.path.join(scene_dir, LOD_DIRECTORY, LOD_MANIFEST)
+    if not os.path.exists(manifest_path):
+        return None
+    with open(manifest_path, encoding="utf-8") as f:
+        manifest = json.load(f)
+    source_path = os.path.join(scene_dir, manifest["source"])
+    if (
+        os.path.exists(source_path)
+        and os.path.getmtime(source_path) > manifest["source_mtime"]
+    ):
+        return None
+    return manifest
+
+
+def choose_level(levels: list[dict], triangle_budget: int) -> dict:
+    """The most detailed level within the triangle budget, or the coarsest
+    level if none is."""
+    within_budget = [level for level in levels if level["triangles"] <= triangle_budget]
+    if not within_budget:
+        return min(levels, key=lambda level: level["triangles"])
+    return max(within_budget, key=lambda level: level["triangles"])
+
+
+def served_mesh_path(
+    scene_name: str, triangle_budget: int = Settings.LOD_TRIANGLE_BUDGET
+) -> str:
+    """The scene mesh file for the 3D viewer: the LOD level for the triangle
+    budget when the levels were built, else the full-resolution mesh."""
+    scene_dir = os.path.join(Settings.data_path, scene_name)
+    manifest = load_manifest(scene_dir)
+    if manifest is None or not manifest["levels"]:
+        return os.path.join(scene_dir, source_mesh_name(scene_name))
+    return os.path.join(
+        scene_dir, choose_level(manifest["levels"], triangle_budget)["file"]
+    )
+
+
+def texture_vertex_colors(
+    texture: np.ndarray, triangle_uvs: np.ndarray, triangles: np.ndarray
+) -> np.ndarray:
+    """Vertex colors sampled from a texture at the UVs of the triangle
+    corners, as decimation keeps vertex colors but not textures. A vertex
+    shared by several triangles averages its corner samples.
+
+    :param texture: (H, W, 3+) uint8 texture
+    :param triangle_uvs: (3 * T, 2) UVs of the triangle corners
+    :param triangles: (T, 3) vertex indices
+    :return: (V, 3) colors in [0, 1], V = max index + 1
+    """
+    texture = np.asarray(texture)[..., :3].astype(np.float64) / 255
+    height, width = texture.shape[:2]
+    corners = np.asarray(triangles).reshape(-1)
+    columns = np.clip(np.round(triangle_uvs[:, 0] * (width - 1)), 0, width - 1)
+    rows = np.clip(np.round(triangle_uvs[:, 1] * (height - 1)), 0, height - 1)
+    vertex_count = corners.max() + 1
+    colors = np.zeros((vertex_count, 3))
+    np.add.at(colors, corners, texture[rows.astype(int), columns.astype(int)])
+    counts = np.bincount(corners, minlength=vertex_count)[:, None]
+    return colors / np.maximum(counts, 1)
+
+
+def build_scene_lods(
+    scene_name: str, triangle_targets: tuple = Settings.LOD_TRIANGLE_TARGETS
+) -> dict:
+    """Decimate the display mesh of a scene to each triangle target below its
+    own count, write every level as a quantized GLB and the manifest."""
+    # imported here, the app itself only reads the manifest
+    import open3d as o3d
+
+    scene_dir = os.path.join(Settings.data_path, scene_name)
+    source = source_mesh_name(scene_name)
+    source_path = os.path.join(scene_dir, source)
+    mesh = o3d.io.read_triangle_mesh(source_path)
+    if not mesh.has_vertex_colors() and mesh.has_textures():
+        colors = np.zeros((len(mesh.vertices), 3))
+        baked = texture_vertex_colors(
+            np.asarray(mesh.textures[0]),
+            np.asarray(mesh.triangle_uvs),
+            np.asarray(mesh.triangles),
+        )
+        colors[: baked.shape[0]] = baked
+        mesh.vertex_colors = o3d.utility.Vector3dVector(colors)
+
+    lod_dir = os.path.join(scene_dir, LOD_DIRECTORY)
+    os.makedirs(lod_dir, exist_ok=True)
+    triangle_count = len(mesh.triangles)
+    targets = [triangle_count] + sorted(
+        (target for target in triangle_targets if target < triangle_count),
+        reverse=True,
+    )
+    levels = []
+    for level, target in enumerate(targets):
+        decimated = (
+            mesh
+            if target == triangle_count
+            else mesh.simplify_quadric_decimation(target_number_of_triangles=target)
+        )
+        decimated.remove_unreferenced_vertices()
+        file_name = os.path.join(LOD_DIRECTORY, f"lod{level}.glb")
+        data = quantized_glb_bytes(MeshArrays.from_o3d(decimated))
+        with open(os.path.join(scene_dir, file_name), "wb") as f:
+            f.write(data)
+        levels.append(
+            {
+                "file": file_name,
+                "triangles": len(decimated.triangles),
+                "bytes": len(data),
+            }
+        )
+        logger.info(
+            f"{scene_name} LOD {level}: {len(decimated.triangles)} triangles, "
+            f"{len(data) / 1024**2:.1f} MiB"
+        )
+
+    manifest = {
+        "source": source,
+        "source_mtime": os.path.getmtime(source_path),
+        "levels": levels,
+    }
+    manifest_path = os.path.join(lod_dir, LOD_MANIFEST)
+    with open(manifest_path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(manifest_path + ".tmp", manifest_path)
+    return manifest
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Build level-of-detail display meshes for the 3D viewer."
+    )
+    parser.add_argument("--scenes", nargs="*", help="all scenes if omitted")
+    args = parser.parse_args()
+
+    for scene_name in sorted(os.listdir(Settings.data_path)):
+        scene_dir = os.path.join(Settings.data_path, scene_name)
+        if not os.path.isdir(scene_dir) or (
+            args.scenes and scene_name not in args.scenes
+        ):
+            continue
+        if not os.path.exists(os.path.join(scene_dir, source_mesh_name(scene_name))):
+            logger.info(f"Skipping {scene_name}, it has no display mesh.")
+            continue
+        build_scene_lods(scene_name)
@@ -0,0 +1,79 @@
+import argparse
+
+import h5py
+import numpy as np
+
+from chat_with_nerf import logger
+
+
+def compact_origins(origins: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Split per-point ray origins into a table of the distinct origins (one
+    per training camera) and a per-point index into that table."""
+    origin_table, camera_indices = np.unique(origins, axis=0, return_inverse=True)
+    camera_indices = camera_indices.reshape(-1)
+    index_dtype = np.min_scalar_type(max(origin_table.shape[0] - 1, 0))
+    logger.info(
+        f"Compacted {origins.shape[0]} origins into {origin_table.shape[0]} cameras."
+    )
+    return origin_table, camera_indices.astype(index_dtype)
+
+
+def lookup_origins(
+    origin_table: np.ndarray, camera_indices: np.ndarray, point_indices: np.ndarray
+) -> np.ndarray:
+    """Reconstruct the ray origins of the given points from the per-point
+    camera index and the origin table."""
+    return origin_table[camera_indices[point_indices]]
+
+
+def read_origins(hdf5_file: h5py.File) -> tuple[np.ndarray, np.ndarray]:
+    """The origin table and camera indices of an H5 feature file, compacted
+    from the per-point origins if the file does not store them."""
+    if "camera_indices" in hdf5_file:
+        return (
+            hdf5_file["origin_table"]["origin_table"][:],
+            hdf5_file["camera_indices"]["camera_indices"][:],
+        )
+    logger.info(
+        f"{hdf5_file.filename} stores per-point origins, compacting them on every "
+        "load. Run `python -m chat_with_nerf.visual_grounder.origin_table "
+        f"{hdf5_file.filename}` once to store the compacted layout."
+    )
+    return compact_origins(hdf5_file["origins"]["origins"][:])
+
+
+def compact_h5_origins(load_config: str, remove_origins: bool = False) -> None:
+    """Store the origin table and camera indices in the H5 feature file so
+    they no longer need to be derived at load time.
+
+    The space of removed origins is only reclaimed after running h5repack.
+    """
+    with h5py.File(load_config, "a") as hdf5_file:
+        origin_table, camera_indices = compact_origins(
+            hdf5_file["origins"]["origins"][:]
+        )
+        for name, data in (
+            ("origin_table", origin_table),
+            ("camera_indices", camera_indices),
+        ):
+            if name in hdf5_file:
+                del hdf5_file[name]
+            hdf5_file.create_group(name).create_dataset(name, data=data)
+        if remove_origins:
+            del hdf5_file["origins"]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Store compacted ray origins in H5 feature files."
+    )
+    parser.add_argument("h5_files", nargs="+")
+    parser.add_argument(
+        "--remove-origins",
+        action="store_true",
+        help="delete the per-point origins, reclaim the space with h5repack",
+    )
+    args = parser.parse_args()
+
+    for h5_file in args.h5_files:
+        compact_h5_origins(h5_file, args.remove_origins)
@@ -0,0 +1,234 @@
+from functools import lru_cache
+
+import numpy as np
+
+from chat_with_nerf.visual_grounder.display_mesh import MeshArrays
+
+# corner pairs of the 12 edges of the corners returned by box_corners
+BOX_EDGES = np.array(
+    [
+        [0, 1],
+        [1, 2],
+        [2, 3],
+        [3, 0],
+        [4, 5],
+        [5, 6],
+        [6, 7],
+        [7, 4],
+        [0, 4],
+        [1, 5],
+        [2, 6],
+        [3, 7],
+    ]
+)
+BOX_CORNER_SIGNS = np.array(
+    [
+        [1, 1, 1],
+        [1, -1, 1],
+        [-1, -1, 1],
+        [-1, 1, 1],
+        [1, 1, -1],
+        [1, -1, -1],
+        [-1, -1, -1],
+        [-1, 1, -1],
+    ],
+    dtype=np.float64,
+)
+
+
+@lru_cache(maxsize=None)
+def cylinder_template(resolution: int = 20) -> tuple[np.ndarray, np.ndarray]:
+    """A closed cylinder of radius 1 along the z axis from z=-0.5 to z=0.5.
+
+    :return: (V, 3) vertices and (T, 3) triangles
+    """
+    angles = 2 * np.pi * np.arange(resolution) / resolution
+    ring = np.stack([np.cos(angles), np.sin(angles)], axis=1)
+    vertices = np.concatenate(
+        [
+            np.hstack([ring, np.full((resolution, 1), -0.5)]),
+            np.hstack([ring, np.full((resolution, 1), 0.5)]),
+            [[0.0, 0.0, -0.5], [0.0, 0.0, 0.5]],
+        ]
+    )
+    current = np.arange(resolution)
+    following = (current + 1) % resolution
+    bottom_center, top_center = 2 * resolution, 2 * resolution + 1
+    triangles = np.concatenate(
+        [
+            np.stack([current, following, following + resolution], axis=1),
+            np.stack([current, following + resolution, current + resolution], axis=1),
+            np.stack([np.full(resolution, bottom_center), following, current], axis=1),
+            np.stack(
+                [
+                    np.full(resolution, top_center),
+                    current + resolution,
+                    following + resolution,
+                ],
+                axis=1,
+            ),
+        ]
+    )
+    return vertices, triangles.astype(np.uint32)
+
+
+@lru_cache(maxsize=None)
+def sphere_template(resolution: int = 30) -> tuple[np.ndarray, np.ndarray]:
+    """A UV sphere of radius 1 with `resolution` rings and twice as many
+    segments, like open3d's create_sphere.
+
+    :return: (V, 3) vertices and (T, 3) triangles
+    """
+    segments = 2 * resolution
+    polar = np.pi * np.arange(1, resolution) / resolution
+    azimuth = 2 * np.pi * np.arange(segments) / segments
+    polar, azimuth = np.meshgrid(polar, azimuth, indexing="ij")
+    rings = np.stack(
+        [
+            np.sin(polar) * np.cos(azimuth),
+            np.sin(polar) * np.sin(azimuth),
+            np.cos(polar),
+        ],
+        axis=-1,
+    ).reshape(-1, 3)
+    vertices = np.concatenate([[[0.0, 0.0, 1.0], [0.0, 0.0, -1.0]], rings])
+
+    # ring vertex (r, s) is at 2 + r * segments + s
+    current = np.arange(segments)
+    following = (current + 1) % segments
+    north = np.stack([np.zeros(segments), 2 + current, 2 + following], axis=1)
+    last_ring = 2 + (resolution - 2) * segments
+    south = np.stack(
+        [np.ones(segments), last_ring + following, last_ring + current], axis=1
+    )
+    upper = 2 + np.arange(resolution - 2)[:, None] * segments
+    lower = upper + segments
+    bands = np.concatenate(
+        [
+            np.stack(
+                np.broadcast_arrays(
+                    upper + current, lower + current, lower + following
+                ),
+                axis=-1,
+            ).reshape(-1, 3),
+            np.stack(
+                np.broadcast_arrays(
+                    upper + current, lower + following, upper + following
+                ),
+                axis=-1,
+            ).reshape(-1, 3),
+        ]
+    )
+    triangles = np.concatenate([north, bands, south]).astype(np.uint32)
+    return vertices, triangles
+
+
+def instance_meshes(
+    template_triangles: np.ndarray, vertices: np.ndarray, colors: np.ndarray
+) -> MeshArrays:
+    """Concatenate K instances of a template into one mesh.
+
+    :param vertices: (K, V, 3) transformed template vertices
+    :param colors: (K, 3) colors, one per instance
+    """
+    count, vertex_count = vertices.shape[:2]
+    offsets = (np.arange(count) * vertex_count).astype(np.uint32)
+    triangles = template_triangles[None, :, :] + offsets[:, None, None]
+    return MeshArrays(
+        vertices.reshape(-1, 3).astype(np.float32),
+        triangles.reshape(-1, 3),
+        np.repeat(np.asarray(colors, dtype=np.float32), vertex_count, axis=0),
+    )
+
+
+def perpendicular_frames(directions: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Two unit vectors perpendicular to each of the unit `directions`."""
+    helpers = np.zeros_like(directions)
+    # the helper axis is the one least aligned with the direction
+    helpers[np.arange(directions.shape[0]), np.argmin(np.abs(directions), axis=1)] = 1
+    first = np.cross(helpers, directions)
+    first /= np.linalg.norm(first, axis=1, keepdims=True)
+    return first, np.cross(directions, first)
+
+
+def cylinders(
+    starts: np.ndarray,
+    ends: np.ndarray,
+    colors: np.ndarray,
+    radius: float = 0.02,
+    resolution: int = 20,
+) -> MeshArrays:
+    """Cylinders between each pair of points as one mesh.
+
+    :param starts: (K, 3) first end points
+    :param ends: (K, 3) second end points
+    :param colors: (K, 3) colors in [0, 1]
+    """
+    template_vertices, template_triangles = cylinder_template(resolution)
+    starts = np.asarray(starts, dtype=np.float64).reshape(-1, 3)
+    ends = np.asarray(ends, dtype=np.float64).reshape(-1, 3)
+    axes = ends - starts
+    lengths = np.linalg.norm(axes, axis=1, keepdims=True)
+    directions = axes / np.maximum(lengths, 1e-12)
+    first, second = perpendicular_frames(directions)
+    vertices = (
+        (starts + ends)[:, None, :] / 2
+        + radius * template_vertices[None, :, 0:1] * first[:, None, :]
+        + radius * template_vertices[None, :, 1:2] * second[:, None, :]
+        + template_vertices[None, :, 2:3] * axes[:, None, :]
+    )
+    return instance_meshes(template_triangles, vertices, colors)
+
+
+def box_corners(centers: np.ndarray, extents: np.ndarray) -> np.ndarray:
+    """(B, 8, 3) corners of axis-aligned boxes, in the order of BOX_EDGES."""
+    centers = np.asarray(centers, dtype=np.float64).reshape(-1, 3)
+    extents = np.asarray(extents, dtype=np.float64).reshape(-1, 3)
+    return centers[:, None, :] + BOX_CORNER_SIGNS[None] * extents[:, None, :] / 2
+
+
+def boxes(
+    centers: np.ndarray,
+    extents: np.ndarray,
+    colors: np.ndarray,
+    radius: float = 0.02,
+    resolution: int = 20,
+) -> MeshArrays:
+    """The edges of axis-aligned boxes as cylinders, all in one mesh.
+
+    :param centers: (B, 3) box centers
+    :param extents: (B, 3) box sizes
+    :param colors: (B, 3) box colors in [0, 1]
+    """
+    corners = box_corners(centers, extents)
+    edge_colors = np.repeat(
+        np.asarray(colors, dtype=np.float64).reshape(-1, 3), len(BOX_EDGES), axis=0
+    )
+    return cylinders(
+        corners[:, BOX_EDGES[:, 0]].reshape(-1, 3),
+        corners[:, BOX_EDGES[:, 1]].reshape(-1, 3),
+        edge_colors,
+        radius,
+        resolution,
+    )
+
+
+def spheres(
+    centers: np.ndarray,
+    radii: np.ndarray,
+    colors: np.ndarray,
+    resolution: int = 30,
+) -> MeshArrays:
+    """Spheres as one mesh.
+
+    :param centers: (K, 3) sphere centers
+    :param radii: (K,) sphere radii
+    :param colors: (K, 3) colors in [0, 1]
+    """
+    template_vertices, template_triangles = sphere_template(resolution)
+    centers = np.asarray(centers, dtype=np.float64).reshape(-1, 3)
+    radii = np.asarray(radii, dtype=np.float64).reshape(-1)
+    vertices = (
+        centers[:, None, :] + radii[:, None, None] * template_vertices[None, :, :]
+    )
+    return instance_meshes(template_triangles, vertices, colors)
@@ -1,18 +1,20 @@
+import contextlib
+import functools
 import os
-from collections.abc import Iterator
-from concurrent.futures import ThreadPoolExecutor
+import threading
+from concurrent.futures import Future
 from pathlib import Path
 from typing import Optional
 from uuid import uuid4
 import clip
 import h5py
-import mediapy as media
 import numpy as np
 import open3d as o3d
 import torch
 import open_clip
-from attrs import define
+from attrs import define, field
 from nerfstudio.cameras.camera_paths import get_path_from_json
+from nerfstudio.model_components import renderers
 from nerfstudio.pipelines.base_pipeline import Pipeline
 from nerfstudio.utils import install_checks
 
@@ -27,8 +29,42 @@ from chat_with_nerf import logger
 from chat_with_nerf.chat.session import Session
 from chat_with_nerf.model.scene_config import SceneConfig
 from chat_with_nerf.settings import Settings
-from chat_with_nerf.visual_grounder.camera_pose import CameraPose
+from chat_with_nerf.util import look_at_camera_to_world, orbit_camera_to_world
+from chat_with_nerf.visual_grounder.camera_pose import CameraPose, rescale_camera_pose
+from chat_with_nerf.visual_grounder.candidate_nms import suppress_candidates
+from chat_with_nerf.visual_grounder.chunk_tuning import (
+    calibrate_chunk_size,
+    load_tuned_chunk_size,
+)
+from chat_with_nerf.visual_grounder.crop import crop_ray_bounds, get_crop_from_json
+from chat_with_nerf.visual_grounder.display_mesh import (
+    DisplayAsset,
+    cached_result_mesh,
+    display_asset_for,
+)
+from chat_with_nerf.visual_grounder.grounding_cache import GroundingCache, live_traffic
 from chat_with_nerf.visual_grounder.image_ref import ImageRef
+from chat_with_nerf.visual_grounder.image_writer import image_writer, to_uint8
+from chat_with_nerf.visual_grounder.mesh_cache import (
+    load_mesh_arrays,
+    mesh_arrays,
+    mesh_cache_key,
+    save_mesh_arrays,
+)
+from chat_with_nerf.visual_grounder.origin_table import lookup_origins, read_origins
+from chat_with_nerf.visual_grounder.overlay import spheres
+from chat_with_nerf.visual_grounder.point_selection import (
+    scaled_min_samples,
+    select_top_points,
+)
+from chat_with_nerf.visual_grounder.point_splat import splat_camera_pose
+from chat_with_nerf.visual_grounder.render_cache import RenderCache
+from chat_with_nerf.visual_grounder.render_scheduler import (
+    PRIORITY_INTERACTIVE,
+    scheduler_for_device,
+)
+from chat_with_nerf.visual_grounder.visibility import VisibilityChecker
+from chat_with_nerf.visual_grounder.vocabulary import VocabularyTable
 from typing import Callable, Optional
 
 
@@ -42,54 +78,284 @@ class PictureTaker:
     tokenizer: Optional[None]
     neg_embeds: Tensor
     negative_words_length: int
-    thread_pool_executor: ThreadPoolExecutor
     openscene_embedding: Optional[np.ndarray]
     clip_preprocess: Optional[Callable]
     device: Optional[str]
     mesh: Optional[o3d.geometry.TriangleMesh]
     axis_align_matrix: Optional[np.ndarray]
+    grounding_cache: GroundingCache = field()
+    vocabulary_table: Optional[VocabularyTable] = field()
+    render_cache: Optional[RenderCache] = field()
+    nerf_mesh: Optional[o3d.geometry.TriangleMesh] = field()
+    visibility_checker: Optional[VisibilityChecker] = field()
+    display_asset: Optional[DisplayAsset] = field()
+    nerf_display_asset: Optional[DisplayAsset] = field()
+
+    @grounding_cache.default
+    def _default_grounding_cache(self) -> GroundingCache:
+        return GroundingCache.for_scene(
+            self.scene, self.scene_config.max_cluster_points
+        )
+
+    @vocabulary_table.default
+    def _default_vocabulary_table(self) -> Optional[VocabularyTable]:
+        return VocabularyTable.load_for_scene(self.scene)
+
+    @render_cache.default
+    def _default_render_cache(self) -> Optional[RenderCache]:
+        return RenderCache.for_scene(self.scene)
+
+    @nerf_mesh.default
+    def _default_nerf_mesh(self) -> Optional[o3d.geometry.TriangleMesh]:
+        """The mesh exported from the NeRF, read once for the visibility
+        checks and the NeRF display asset."""
+        mesh_path = self.scene_config.nerf_exported_mesh_path
+        if mesh_path is None or not os.path.exists(mesh_path):
+            return None
+        mesh = o3d.io.read_triangle_mesh(mesh_path)
+        if not mesh.has_triangles():
+            logger.info(f"No NeRF exported mesh at {mesh_path}.")
+            return None
+        return mesh
+
+    @visibility_checker.default
+    def _default_visibility_checker(self) -> Optional[VisibilityChecker]:
+        if not Settings.ENABLE_VISIBILITY_CHECK or self.nerf_mesh is None:
+            return None
+        return VisibilityChecker.from_mesh(self.nerf_mesh)
+
+    @display_asset.default
+    def _default_display_asset(self) -> Optional[DisplayAsset]:
+        if self.mesh is None:
+            return None
+        return display_asset_for(self.scene, self.mesh)
+
+    @nerf_display_asset.default
+    def _default_nerf_display_asset(self) -> Optional[DisplayAsset]:
+        if self.nerf_mesh is None:
+            return None
+        return display_asset_for(
+            f"{self.scene}_nerf", self.nerf_mesh, bright_factor=1.5
+        )
 
     @staticmethod
     def render_picture(
         lerf_pipeline: Pipeline, camera_pose: dict, session_id: str
     ) -> ImageRef:
-        logger.info("Picture Taking...")
+        return PictureTaker.render_pictures(lerf_pipeline, [camera_pose], session_id)[0]
+
+    @staticmethod
+    def render_pictures(
+        lerf_pipeline: Pipeline,
+        camera_poses: list[dict],
+        session_id: str,
+        render_cache: Optional[RenderCache] = None,
+        resolution_scale: float = 1.0,
+        priority: int = PRIORITY_INTERACTIVE,
+    ) -> list[ImageRef]:
+        return PictureTaker.submit_pictures(
+            lerf_pipeline,
+            camera_poses,
+            session_id,
+            render_cache,
+            resolution_scale,
+            priority,
+        ).result()
+
+    @staticmethod
+    def submit_pictures(
+        lerf_pipeline: Pipeline,
+        camera_poses: list[dict],
+        session_id: str,
+        render_cache: Optional[RenderCache] = None,
+        resolution_scale: float = 1.0,
+        priority: int = PRIORITY_INTERACTIVE,
+    ) -> Future:
+        """Queue camera poses on the render scheduler of the pipeline's device,
+        which concatenates the rays of several cameras, possibly of other
+        sessions, into large ray bundles.
+
+        Poses found in `render_cache` are not rendered again. A
+        `resolution_scale` below 1 renders quick low resolution previews.
+
+        :return: a future resolving to one ImageRef per camera pose
+        """
+        if resolution_scale != 1.0:
+            camera_poses = [
+                rescale_camera_pose(camera_pose, resolution_scale)
+                for camera_pose in camera_poses
+            ]
+        image_refs: list[Optional[ImageRef]] = [None] * len(camera_poses)
+        if render_cache is not None:
+            image_refs = [render_cache.get(pose) for pose in camera_poses]
+        missing = [i for i, image_ref in enumerate(image_refs) if image_ref is None]
+        # cropped and uncropped cameras, crops of different background colors
+        # and different resolutions cannot share a ray bundle
+        groups: dict[tuple, list[int]] = {}
+        for i in missing:
+            crop = camera_poses[i].get("crop")
+            key = (
+                id(lerf_pipeline),
+                None if crop is None else tuple(crop["crop_bg_color"].values()),
+                camera_poses[i]["render_height"],
+                camera_poses[i]["render_width"],
+            )
+            groups.setdefault(key, []).append(i)
+
+        batch_size = Settings.MAX_CAMERAS_PER_RENDER_BATCH
+        batches = [
+            (key, group[start : start + batch_size])
+            for key, group in groups.items()
+            for start in range(0, len(group), batch_size)
+        ]
+        result: Future = Future()
+        if not batches:
+            result.set_result(image_refs)
+            return result
+
+        pending = len(batches)
+        lock = threading.Lock()
+
+        def on_rendered(batch: list[int], rendered: Future) -> None:
+            nonlocal pending
+            if rendered.exception() is not None:
+                if not result.done():
+                    result.set_exception(rendered.exception())
+                return
+            try:
+                for i, image_ref in zip(batch, rendered.result()):
+                    if render_cache is not None:
+                        image_ref = render_cache.put(camera_poses[i], image_ref)
+                    image_refs[i] = image_ref
+            except Exception as exp:
+                if not result.done():
+                    result.set_exception(exp)
+                return
+            with lock:
+                pending -= 1
+                finished = pending == 0
+            if finished and not result.done():
+                if render_cache is not None:
+                    render_cache.log_stats()
+                result.set_result(image_refs)
+
+        scheduler = scheduler_for_device(lerf_pipeline.device)
+        render = functools.partial(PictureTaker.render_camera_batch, lerf_pipeline)
+        for key, batch in batches:
+            rendered = scheduler.submit(
+                session_id,
+                key,
+                [camera_poses[i] for i in batch],
+                render,
+                priority,
+            )
+            rendered.add_done_callback(functools.partial(on_rendered, batch))
+        return result
+
+    @staticmethod
+    def render_camera_batch(
+        lerf_pipeline: Pipeline, camera_poses: list[dict], session_ids: list[str]
+    ) -> list[ImageRef]:
+        logger.info(f"Picture Taking for {len(camera_poses)} cameras...")
         install_checks.check_ffmpeg_installed()
-        camera = get_path_from_json(camera_pose)
+        # all poses share the camera type and resolution, merge their camera paths
+        camera_path = dict(camera_poses[0])
+        camera_path["camera_path"] = [
+            entry
+            for camera_pose in camera_poses
+            for entry in camera_pose["camera_path"]
+        ]
+        cameras = get_path_from_json(camera_path)
         # camera_type = CameraType.PESPECTIVE
-        camera.rescale_output_resolution(1.0)
-        camera = camera.to(lerf_pipeline.device)
-        output_filepath_path = Path(Settings.output_path) / session_id / "images"
-        rgb_image_dir = output_filepath_path / "rgb"
-        rgb_image_dir.mkdir(parents=True, exist_ok=True)
-
-        result = {}
-        camera_idx = 0
-        aabb_box = None
-        camera_ray_bundle = camera.generate_rays(
-            camera_indices=camera_idx, aabb_box=aabb_box
+        cameras.rescale_output_resolution(1.0)
+        cameras = cameras.to(lerf_pipeline.device)
+
+        num_cameras = cameras.shape[0]
+        image_coords = cameras.get_image_coords().to(cameras.device)
+        height, width = image_coords.shape[:2]
+        camera_indices = torch.arange(num_cameras, device=cameras.device).view(
+            -1, 1, 1, 1
         )
-        with torch.no_grad():
+        camera_ray_bundle = cameras.generate_rays(
+            camera_indices=camera_indices.expand(num_cameras, height, width, 1),
+            coords=image_coords.expand(num_cameras, height, width, 2),
+            aabb_box=None,
+        )
+        crops = [get_crop_from_json(camera_pose) for camera_pose in camera_poses]
+        background_override = contextlib.nullcontext()
+        if crops[0] is not None:
+            # only sample inside each camera's own crop box
+            box_min = torch.stack([crop.center - crop.scale / 2 for crop in crops])
+            box_max = torch.stack([crop.center + crop.scale / 2 for crop in crops])
+            nears, fars = crop_ray_bounds(
+                camera_ray_bundle.origins,
+                camera_ray_bundle.directions,
+                box_min.to(cameras.device).view(-1, 1, 1, 3),
+                box_max.to(cameras.device).view(-1, 1, 1, 3),
+            )
+            camera_ray_bundle.nears = nears
+            camera_ray_bundle.fars = fars
+            background_override = renderers.background_color_override_context(
+                crops[0].background_color.to(lerf_pipeline.device)
+            )
+        # stack the cameras vertically so the model sees one tall image
+        camera_ray_bundle = camera_ray_bundle.reshape((num_cameras * height, width))
+        with background_override, torch.no_grad():
             outputs = lerf_pipeline.model.get_outputs_for_camera_ray_bundle(
                 camera_ray_bundle.to(lerf_pipeline.device)
             )
 
-        output_image = outputs["rgb"].cpu().numpy()
-        print(output_image.shape)
+        output_images = (
+            outputs["rgb"].cpu().numpy().reshape(num_cameras, height, width, -1)
+        )
+        if output_images.shape[-1] == 1:
+            output_images = np.concatenate((output_images,) * 3, axis=-1)
+        # the only float to uint8 conversion, shared by the file and the ImageRef
+        output_images = to_uint8(output_images)
+
+        image_refs = []
+        for camera_idx, (output_image, session_id) in enumerate(
+            zip(output_images, session_ids)
+        ):
+            image_refs.append(
+                PictureTaker.write_picture(output_image, session_id, f"rgb{camera_idx}")
+            )
 
-        if output_image.shape[-1] == 1:
-            output_image = np.concatenate((output_image,) * 3, axis=-1)
+        return image_refs
 
-        # saving rgb
-        rgb = "rgb" + str(camera_idx)
+    @staticmethod
+    def write_picture(image: np.ndarray, session_id: str, name: str) -> ImageRef:
+        """Queue an image for writing to the session's image folder."""
+        output_filepath_path = Path(Settings.output_path) / session_id / "images"
+        rgb_image_dir = output_filepath_path / "rgb"
+        rgb_image_dir.mkdir(parents=True, exist_ok=True)
         # create file name
-        rgb_filename = rgb + "_" + str(uuid4()) + ".png"
-        result[rgb] = str(rgb_image_dir) + "/" + rgb_filename
-        media.write_image(result[rgb], output_image)
+        rgb_filename = name + "_" + str(uuid4()) + "." + Settings.RENDER_IMAGE_FORMAT
+        rgb_path = str(rgb_image_dir) + "/" + rgb_filename
+        pixels = to_uint8(image)
+        written = image_writer.submit(rgb_path, pixels)
+        return ImageRef(rgb_path, pixels, written)
 
-        imageRef = ImageRef(result[rgb], output_image)
-
-        return imageRef
+    def splat_pictures(
+        self,
+        camera_poses: list[dict],
+        session_id: str,
+        resolution_scale: float = 1.0,
+    ) -> list[ImageRef]:
+        """Render quick previews on the CPU by splatting the colored points of
+        the H5 file, without the NeRF."""
+        image_refs = []
+        for camera_idx, camera_pose in enumerate(camera_poses):
+            image = splat_camera_pose(
+                self.h5_dict["points"],
+                self.h5_dict["rgb"],
+                rescale_camera_pose(camera_pose, resolution_scale),
+                Settings.SPLAT_RADIUS,
+            )
+            image_refs.append(
+                PictureTaker.write_picture(image, session_id, f"splat{camera_idx}")
+            )
+        return image_refs
 
     def visual_ground_pipeline_no_gpt(self, query: str, session_id: str):
         prob_per_scale = self.compute_probability_query_property(query, session_id)
@@ -108,6 +374,7 @@ class PictureTaker:
         possibility_array = probability_per_scale_per_phrase.detach().cpu().numpy().squeeze()  # type: ignore # noqa: E501
         # if Settings.TOP_THREE_NO_GPT:'
 
+        live_traffic.checkpoint()
         centroids_list, extends_list, values_list = self.find_clusters(
             possibility_array
         )
@@ -133,6 +400,7 @@ class PictureTaker:
         possibility_array = probability_per_scale_per_phrase.detach().cpu().numpy().squeeze()  # type: ignore # noqa: E501
         # if Settings.TOP_THREE_NO_GPT:'
 
+        live_traffic.checkpoint()
         centroids_list, extends_list, values_list = self.find_clusters(
             possibility_array
         )
@@ -147,6 +415,32 @@ class PictureTaker:
         best_center, box_size = ordered_result[0]
         return best_center, box_size
 
+    def select_points_for_clustering(
+        self,
+        probability_over_all_points: np.ndarray,
+        fraction: float,
+        positions: np.ndarray,
+    ) -> tuple[np.ndarray, int]:
+        """Select the top `fraction` of points for clustering, capped at the
+        scene's maximum number of clustering points.
+
+        :return: the selected point indices and the DBSCAN min_samples to use
+        """
+        max_points = self.scene_config.max_cluster_points or Settings.MAX_CLUSTER_POINTS
+        top_indices, sampling_ratio = select_top_points(
+            probability_over_all_points,
+            fraction,
+            max_points,
+            positions,
+            Settings.CLUSTER_VOXEL_SIZE,
+        )
+        if sampling_ratio < 1.0:
+            logger.info(
+                f"Kept {top_indices.shape[0]} points for clustering "
+                f"(ratio {sampling_ratio:.3f})."
+            )
+        return top_indices, scaled_min_samples(15, sampling_ratio)
+
     def construct_bbox_corners(self, center, box_size):
         sx, sy, sz = box_size
         x_corners = [sx / 2, sx / 2, -sx / 2, -sx / 2, sx / 2, sx / 2, -sx / 2, -sx / 2]
@@ -160,27 +454,31 @@ class PictureTaker:
 
         return corners_3d
 
+    def axis_aligned_points_scannet(self) -> np.ndarray:
+        """The ScanNet coordinates of the H5 points, axis aligned."""
+        points_scannet = self.h5_dict["points_scannet"]
+        pts = np.ones((points_scannet.shape[0], 4))
+        pts[:, 0:3] = points_scannet[:, 0:3]
+        pts = np.dot(pts, self.axis_align_matrix.transpose())  # Nx4
+        aligned_vertices = np.copy(points_scannet)
+        aligned_vertices[:, 0:3] = pts[:, 0:3]
+        return aligned_vertices
+
     def find_clusters(self, probability_over_all_points: np.ndarray):
         # Calculate the number of top values directly
-        top_count = int(probability_over_all_points.size * 0.01)
-        top_indices = np.argpartition(probability_over_all_points, -top_count)[
-            -top_count:
-        ]
+        top_indices, min_samples = self.select_points_for_clustering(
+            probability_over_all_points,
+            0.01,
+            self.h5_dict["points_scannet" if Settings.IS_SCANNET else "points"],
+        )
         if Settings.IS_SCANNET:
-            points_scannet = self.h5_dict["points_scannet"]
+            points_scannet = self.axis_aligned_points_scannet()
             # top_positions = points_scannet[top_indices]
             top_values = probability_over_all_points[top_indices].flatten()
-            axis_align_matrix = self.axis_align_matrix
-            pts = np.ones((points_scannet.shape[0], 4))
-            pts[:, 0:3] = points_scannet[:, 0:3]
-            pts = np.dot(pts, axis_align_matrix.transpose())  # Nx4
-            aligned_vertices = np.copy(points_scannet)
-            aligned_vertices[:, 0:3] = pts[:, 0:3]
-            points_scannet = aligned_vertices
 
             top_positions_scannet = points_scannet[top_indices]
             # Apply DBSCAN clustering
-            dbscan = DBSCAN(eps=0.05, min_samples=15)
+            dbscan = DBSCAN(eps=0.05, min_samples=min_samples)
             clusters = dbscan.fit(top_positions_scannet)
             labels = clusters.labels_
 
@@ -213,17 +511,14 @@ class PictureTaker:
             logger.info(f"Selected {top_indices.shape[0]} points for clustering.")
 
             points = self.h5_dict["points"]
-            origins = self.h5_dict["origins"]
 
             top_positions = points[top_indices]
-            top_origins = origins[top_indices]
             top_values = probability_over_all_points[top_indices].flatten()
 
             logger.info("Clustering...")
 
             # Apply DBSCAN clustering
             epsilon = 0.05  # The maximum distance between two samples for one to be considered as in the neighborhood of the other. # noqa: E501
-            min_samples = int(15)  # Minimum number of samples in a cluster
             dbscan = DBSCAN(eps=epsilon, min_samples=min_samples)
             clusters = dbscan.fit(top_positions)
 
@@ -258,15 +553,12 @@ class PictureTaker:
 
     def find_cluster(self, probability_over_all_points: np.ndarray):
         # Calculate the number of top values directly
-        top_count = int(probability_over_all_points.size * 0.005)
-        # print(top_count)
-        # print(probability_over_all_points.size)
-        # Find the indices of the top values
-        top_indices = np.argpartition(probability_over_all_points, -top_count)[
-            -top_count:
-        ]
         # Fetch related data from the HDF5 dictionary
         points = self.h5_dict["points_scannet"]
+        # Find the indices of the top values
+        top_indices, min_samples = self.select_points_for_clustering(
+            probability_over_all_points, 0.005, points
+        )
         # origins = self.h5_dict["origins"]
 
         top_positions = points[top_indices]
@@ -274,7 +566,7 @@ class PictureTaker:
         top_values = probability_over_all_points[top_indices].flatten()
 
         # Apply DBSCAN clustering
-        dbscan = DBSCAN(eps=0.05, min_samples=15)  # Directly use values where possible
+        dbscan = DBSCAN(eps=0.05, min_samples=min_samples)
         clusters = dbscan.fit(top_positions)
         labels = clusters.labels_
 
@@ -334,10 +626,17 @@ class PictureTaker:
         probability_over_all_points = (
             probability_over_all_points.detach().cpu().flatten().numpy()
         )
-        top_count = int(probability_over_all_points.size * 0.005)
-        top_indices = np.argpartition(probability_over_all_points, -top_count)[
-            -top_count:
-        ]
+        top_indices, min_samples = self.select_points_for_clustering(
+            probability_over_all_points,
+            0.005,
+            self.h5_dict[
+                (
+                    "points_scannet"
+                    if session.working_scene_name.startswith("s")
+                    else "points"
+                )
+            ],
+        )
 
         # mesh_vertices = np.asarray(mesh.vertices)
         if session.working_scene_name.startswith("s"):
@@ -351,19 +650,21 @@ class PictureTaker:
             points_scannet = aligned_vertices
             # mesh.vertices = o3d.utility.Vector3dVector(aligned_vertices)
             points_nerfstudio = self.h5_dict["points_nerfstudio"]
-            origins = self.h5_dict["origins"]
             top_positions_scannet = points_scannet[top_indices]
             top_values = probability_over_all_points[top_indices].flatten()
             top_position_nerfstudio = points_nerfstudio[top_indices]
-            top_origins = origins[top_indices]
+            top_origins = self.get_origins(top_indices)
 
-            dbscan = DBSCAN(eps=0.05, min_samples=15)
+            dbscan = DBSCAN(eps=0.05, min_samples=min_samples)
             clusters = dbscan.fit(top_positions_scannet)
             labels = clusters.labels_
             best_member_list = []
             origin_for_best_member_list = []
             centroids = []
             bboxes = []
+            scores = []
+            render_boxes = []
+            cluster_member_list = None  # no visibility check in ScanNet coordinates
 
             for cluster_id in set(labels):
                 if cluster_id == -1:  # Noise
@@ -390,6 +691,7 @@ class PictureTaker:
                 # if Settings.NO_VISUAL_FEEDBACK is False:
                 valuess_for_members = top_values[labels == cluster_id]
                 best_index = np.argmax(valuess_for_members)
+                scores.append(np.mean(valuess_for_members))
 
                 cluster_members_nerfstudio = top_position_nerfstudio[
                     labels == cluster_id
@@ -401,6 +703,12 @@ class PictureTaker:
                 ]
                 best_member_list.append(closest_member_to_centroid_nerfstudio)
                 origin_for_best_member_list.append(origin_for_members[best_index])
+                # the renderer works in nerfstudio coordinates
+                render_min = np.min(cluster_members_nerfstudio, axis=0)
+                render_max = np.max(cluster_members_nerfstudio, axis=0)
+                render_boxes.append(
+                    ((render_min + render_max) / 2, render_max - render_min)
+                )
         else:
             if np.nonzero(probability_over_all_points > 0.50)[0].shape[0] == 0:
                 logger.info("No points found for clustering.")
@@ -408,17 +716,15 @@ class PictureTaker:
             logger.info(f"Selected {top_indices.shape[0]} points for clustering.")
 
             points = self.h5_dict["points"]
-            origins = self.h5_dict["origins"]
 
             top_positions = points[top_indices]
-            top_origins = origins[top_indices]
+            top_origins = self.get_origins(top_indices)
             top_values = probability_over_all_points[top_indices].flatten()
 
             logger.info("Clustering...")
 
             # Apply DBSCAN clustering
             epsilon = 0.05  # The maximum distance between two samples for one to be considered as in the neighborhood of the other. # noqa: E501
-            min_samples = int(15)  # Minimum number of samples in a cluster
             dbscan = DBSCAN(eps=epsilon, min_samples=min_samples)
             clusters = dbscan.fit(top_positions)
 
@@ -428,8 +734,11 @@ class PictureTaker:
 
             best_member_list = []
             origin_for_best_member_list = []
+            cluster_member_list = []
             centroids = []
             bboxes = []
+            scores = []
+            render_boxes = None  # the points are in rendering coordinates
             # Iterate over each cluster ID
             for cluster_id in set(labels):
                 if cluster_id == -1:  # Noise
@@ -448,6 +757,7 @@ class PictureTaker:
 
                     valuess_for_members = top_values[labels == cluster_id]
                     orgins_for_this_cluster = top_origins[labels == cluster_id]
+                    scores.append(np.mean(valuess_for_members))
 
                     best_index = np.argmax(valuess_for_members, axis=0)
 
@@ -456,55 +766,302 @@ class PictureTaker:
 
                     origin_of_best_member = orgins_for_this_cluster[best_index]
                     origin_for_best_member_list.append(origin_of_best_member)
+                    cluster_member_list.append(members)
 
         paths2images = []
         # if Settings.NO_VISUAL_FEEDBACK is False:
-        if session.working_scene_name.startswith("s"):
-            c2w_list = [
-                self.compute_camera_to_world_matrix(
-                    member, origin, best_scale_for_phrases
-                )
-                for member, origin in zip(best_member_list, origin_for_best_member_list)
-            ]
-
-            camera_pose_instance = CameraPose()
-            camera_poses = [
-                camera_pose_instance.construct_camera_pose(c2w) for c2w in c2w_list
-            ]
+        centroids, bboxes = self.select_candidates(
+            session,
+            centroids,
+            bboxes,
+            scores,
+            best_member_list,
+            origin_for_best_member_list,
+            best_scale_for_phrases,
+            cluster_member_list,
+            render_boxes,
+        )
+        return (centroids, bboxes), paths2images
 
-            session.camera_poses = camera_poses
+    def select_candidates(
+        self,
+        session: Session,
+        centroids: list,
+        bboxes: list,
+        scores: list,
+        best_member_list: list,
+        origin_for_best_member_list: list,
+        best_scale_for_phrases: float,
+        cluster_member_list: Optional[list] = None,
+        render_boxes: Optional[list] = None,
+    ) -> tuple[list, list]:
+        """Suppress overlapping candidates, skip occluded ones and construct
+        the camera poses of the rest into `session.camera_poses`.
+
+        :param cluster_member_list: the member points of every candidate, the
+            visibility check is skipped without them
+        :param render_boxes: the (center, extent) of every candidate in
+            rendering coordinates, if these differ from `centroids`
+        :return: the centroids and bboxes of the kept candidates
+        """
+        # drop near-duplicate candidates before paying for their poses and renders
+        keep, centroids, bboxes = self.suppress_overlapping_candidates(
+            centroids, bboxes, scores
+        )
+        best_member_list = [best_member_list[i] for i in keep]
+        origin_for_best_member_list = [origin_for_best_member_list[i] for i in keep]
+        if render_boxes is not None:
+            render_boxes = [render_boxes[i] for i in keep]
         else:
-            c2w_list = [
-                self.compute_camera_to_world_matrix(
-                    member, origin, best_scale_for_phrases
-                )
-                for member, origin in zip(
+            if self.visibility_checker is not None and cluster_member_list is not None:
+                # move cameras away from walls and skip hopeless candidates
+                visible, origin_for_best_member_list = self.choose_visible_viewpoints(
                     best_member_list,
                     origin_for_best_member_list,
+                    [cluster_member_list[i] for i in keep],
+                    best_scale_for_phrases,
                 )
+                centroids = [centroids[i] for i in visible]
+                bboxes = [bboxes[i] for i in visible]
+                best_member_list = [best_member_list[i] for i in visible]
+            render_boxes = list(zip(centroids, bboxes))
+
+        session.camera_poses = self.construct_camera_poses(
+            best_member_list,
+            origin_for_best_member_list,
+            best_scale_for_phrases,
+            render_boxes if Settings.ENABLE_CROP_RENDERING else None,
+        )
+        return centroids, bboxes
+
+    def select_vocabulary_candidates(
+        self, session: Session, table: VocabularyTable, label_id: int
+    ) -> tuple[list, list]:
+        """The target candidates of a vocabulary table entry, selected the same
+        way as the clusters of the online pipeline."""
+        (
+            centroids,
+            bboxes,
+            scores,
+            best_points,
+            cluster_targets,
+            best_scale,
+        ) = table.target_result(label_id)
+        points = self.h5_dict["points"]
+        return self.select_candidates(
+            session,
+            centroids,
+            bboxes,
+            scores,
+            list(points[best_points]),
+            list(self.get_origins(best_points)),
+            best_scale,
+            [points[targets] for targets in cluster_targets],
+        )
+
+    def suppress_overlapping_candidates(
+        self, centroids: list, extents: list, scores: list
+    ) -> tuple[list[int], list, list]:
+        """Apply 3D-box non-maximum suppression to the cluster candidates.
+
+        :return: the indices of the kept candidates and their centroids and
+            extents
+        """
+        keep, centroids, extents = suppress_candidates(
+            centroids,
+            extents,
+            scores,
+            Settings.NMS_IOU_THRESHOLD,
+            Settings.NMS_SCORE_THRESHOLD,
+            Settings.NMS_MERGE,
+        )
+        logger.info(
+            f"Suppressed {len(scores) - len(keep)} of {len(scores)} candidates."
+        )
+        return keep, centroids, extents
+
+    def choose_visible_viewpoints(
+        self,
+        members: list,
+        origins: list,
+        clusters: list,
+        best_scale_for_phrases: float,
+    ) -> tuple[list[int], list]:
+        """Raycast a few viewpoints around every candidate against the scene
+        mesh and keep the least occluded one. Candidates that stay occluded
+        beyond Settings.MAX_OCCLUSION from every viewpoint are dropped, unless
+        that would drop all of them.
+
+        :return: the indices of the kept candidates and the origins to
+            construct their camera poses from
+        """
+        viewpoints = [
+            self.visibility_checker.choose_viewpoint(
+                member, origin, best_scale_for_phrases, cluster
+            )
+            for member, origin, cluster in zip(members, origins, clusters)
+        ]
+        visible = [
+            i
+            for i, (_, occlusion) in enumerate(viewpoints)
+            if occlusion <= Settings.MAX_OCCLUSION
+        ]
+        if not visible:
+            visible = list(range(len(viewpoints)))
+        logger.info(
+            f"Skipped {len(viewpoints) - len(visible)} of {len(viewpoints)} "
+            "occluded candidates."
+        )
+        return visible, [viewpoints[i][0] for i in visible]
+
+    def get_origins(self, point_indices: np.ndarray) -> np.ndarray:
+        """Reconstruct the ray origins of the given points from the per-point
+        camera index and the origin table."""
+        return lookup_origins(
+            self.h5_dict["origin_table"], self.h5_dict["camera_indices"], point_indices
+        )
+
+    def construct_camera_poses(
+        self,
+        members: list,
+        origins: list,
+        best_scale_for_phrases: float,
+        crop_boxes: Optional[list] = None,
+    ) -> list[dict]:
+        """Construct one camera pose per member, looking at the member from
+        `best_scale_for_phrases` along the ray from its origin. Given the
+        (center, extent) of every member's cluster in `crop_boxes`, the
+        renders are restricted to a margin around that box."""
+        members_array = np.asarray(members, dtype=np.float64).reshape(-1, 3)
+        directions = members_array - np.asarray(origins, dtype=np.float64).reshape(
+            -1, 3
+        )
+        directions /= np.linalg.norm(directions, axis=1, keepdims=True)
+        c2ws = look_at_camera_to_world(
+            members_array - best_scale_for_phrases * directions,
+            members_array,
+            Settings.CAMERA_UP,
+        )
+        return self.camera_poses_from_matrices(c2ws, crop_boxes)
+
+    def camera_poses_from_matrices(
+        self, c2ws: np.ndarray, crop_boxes: Optional[list] = None
+    ) -> list[dict]:
+        camera_pose_instance = CameraPose()
+        if crop_boxes is None:
+            return [
+                camera_pose_instance.construct_camera_pose(c2w.flatten())
+                for c2w in c2ws
             ]
-            camera_pose_instance = CameraPose()
-            camera_poses = [
-                camera_pose_instance.construct_camera_pose(c2w) for c2w in c2w_list
+        return [
+            camera_pose_instance.construct_camera_pose(
+                c2w.flatten(),
+                crop_center=center,
+                crop_scale=np.maximum(
+                    np.asarray(extent) * Settings.CROP_MARGIN, Settings.CROP_MIN_SIZE
+                ),
+                crop_bg_color=Settings.CROP_BACKGROUND_COLOR,
+            )
+            for c2w, (center, extent) in zip(c2ws, crop_boxes)
+        ]
+
+    def construct_orbit_camera_poses(
+        self, centroids: list, extents: list, num_views: int = Settings.ORBIT_VIEWS
+    ) -> list[dict]:
+        """Construct `num_views` camera poses orbiting every candidate, all in
+        one vectorized step. The poses are grouped by candidate.
+
+        :param centroids: candidate centers in rendering coordinates
+        :param extents: candidate box sizes, which set the orbit radii
+        """
+        extents_array = np.asarray(extents, dtype=np.float64).reshape(-1, 3)
+        radii = np.maximum(
+            Settings.ORBIT_DISTANCE_SCALE * extents_array.max(axis=1),
+            Settings.ORBIT_MIN_DISTANCE,
+        )
+        c2ws = orbit_camera_to_world(
+            centroids, radii, num_views, Settings.ORBIT_ELEVATION
+        )
+        crop_boxes = None
+        if Settings.ENABLE_CROP_RENDERING:
+            crop_boxes = [
+                box for box in zip(centroids, extents) for _ in range(num_views)
             ]
-            session.camera_poses = camera_poses
-        return (centroids, bboxes), paths2images
+        return self.camera_poses_from_matrices(c2ws.reshape(-1, 4, 4), crop_boxes)
 
-    def take_picture_for_the_ground_result(self, session: Session, choosen_id: int):
+    def take_orbit_pictures(
+        self,
+        centroids: list,
+        extents: list,
+        session_id: str,
+        num_views: int = Settings.ORBIT_VIEWS,
+    ) -> list[list[ImageRef]]:
+        """Render `num_views` views around every candidate in batched renders.
+
+        :return: the views of every candidate
+        """
+        camera_poses = self.construct_orbit_camera_poses(centroids, extents, num_views)
+        image_refs = PictureTaker.render_pictures(
+            self.lerf_pipeline, camera_poses, session_id, self.render_cache
+        )
+        return [
+            image_refs[start : start + num_views]
+            for start in range(0, len(image_refs), num_views)
+        ]
+
+    def take_orbit_pictures_for_the_ground_result(
+        self, session: Session, choosen_id: int
+    ) -> list[ImageRef]:
+        """Views around the chosen candidate, for the user to inspect it."""
+        candidate = session.candidate_visualization[choosen_id]
+        return self.take_orbit_pictures(
+            [candidate["centroid"]], [candidate["extent"]], session.session_id
+        )[0]
+
+    def take_picture_for_the_ground_result(
+        self, session: Session, choosen_id: int, resolution_scale: float = 1.0
+    ):
+        return self.submit_picture_for_the_ground_result(
+            session, choosen_id, resolution_scale
+        ).result()
+
+    def take_preview_for_the_ground_result(
+        self, session: Session, choosen_id: int, resolution_scale: float
+    ) -> list[ImageRef]:
+        """Low resolution candidate views for a first response. They are
+        splatted from the point cloud when configured to, when there is no
+        NeRF, or when the render queue of the NeRF's device is long."""
+        use_splat = (
+            Settings.PREVIEW_RENDERER == "splat"
+            or self.lerf_pipeline is None
+            or scheduler_for_device(self.lerf_pipeline.device).queued_cameras
+            >= Settings.SPLAT_PREVIEW_QUEUED_CAMERAS
+        )
+        if use_splat:
+            return self.splat_pictures(
+                session.camera_poses, session.session_id, resolution_scale
+            )
+        return self.take_picture_for_the_ground_result(
+            session, choosen_id, resolution_scale
+        )
+
+    def submit_picture_for_the_ground_result(
+        self,
+        session: Session,
+        choosen_id: int,
+        resolution_scale: float = 1.0,
+        priority: int = PRIORITY_INTERACTIVE,
+    ) -> Future:
         camera_poses = session.camera_poses
         # camera_pose = [camera_poses[choosen_id]]
-        lerf_pipelines = [self.lerf_pipeline] * len(camera_poses)
-        session_id_list = [session.session_id] * len(camera_poses)
-        paths2images: Iterator[ImageRef] = self.thread_pool_executor.map(
-            lambda tup: PictureTaker.render_picture(*tup),
-            (
-                (lerf_pipeline, camera_pose, session_id)
-                for lerf_pipeline, camera_pose, session_id in zip(
-                    lerf_pipelines, camera_poses, session_id_list
-                )
-            ),
+        return PictureTaker.submit_pictures(
+            self.lerf_pipeline,
+            camera_poses,
+            session.session_id,
+            self.render_cache,
+            resolution_scale,
+            priority,
         )
-        return list(paths2images)
 
     def visual_ground_pipeline_with_gpt(self, positive_phrase: str, session: Session):
         prob_per_scale = self.compute_probability_query_property(
@@ -522,6 +1079,7 @@ class PictureTaker:
                 best_scale_for_phrases = scale.item()
                 probability_per_scale_per_phrase = pos_prob
 
+        live_traffic.checkpoint()
         (centroids, bboxes), paths2images = self.find_clusters_with_gpt(
             probability_per_scale_per_phrase, best_scale_for_phrases, session
         )
@@ -541,6 +1099,8 @@ class PictureTaker:
         n_phrases = len(positives)
         prob_per_scale = []
         for index, _ in enumerate(scales_list):
+            # background precomputes yield to live requests between scales
+            live_traffic.checkpoint()
             clip_output = torch.from_numpy(
                 self.h5_dict["clip_embeddings_per_scale"][index]
             ).to("cuda")
@@ -601,14 +1161,12 @@ class PictureTaker:
 
         possibility_array = probability_per_scale_per_phrase[0].detach().cpu().numpy()  # type: ignore # noqa: E501
         # best_scale = best_scale_for_phrases[0].item()
-        num_points = possibility_array.shape[0]
-        percentage_points = int(num_points * 0.005)
-        flattened_values = possibility_array.flatten()
+        points = self.h5_dict["points"]
 
         # # Find the indices of the top 0.5% values
-        top_indices = np.argpartition(flattened_values, -percentage_points)[
-            -percentage_points:
-        ]
+        top_indices, min_samples = self.select_points_for_clustering(
+            possibility_array, 0.005, points
+        )
 
         # top_indices = np.nonzero(possibility_array > 0.55)[0]
         if np.nonzero(possibility_array > 0.55)[0].shape[0] == 0:
@@ -617,18 +1175,14 @@ class PictureTaker:
 
         logger.info(f"Selected {top_indices.shape[0]} points for clustering.")
 
-        points = self.h5_dict["points"]
-        origins = self.h5_dict["origins"]
-
         top_positions = points[top_indices]
-        top_origins = origins[top_indices]
+        top_origins = self.get_origins(top_indices)
         top_values = possibility_array[top_indices].flatten()
 
         logger.info("Clustering...")
 
         # Apply DBSCAN clustering
         epsilon = 0.05  # The maximum distance between two samples for one to be considered as in the neighborhood of the other. # noqa: E501
-        min_samples = int(15)  # Minimum number of samples in a cluster
         dbscan = DBSCAN(eps=epsilon, min_samples=min_samples)
         clusters = dbscan.fit(top_positions)
 
@@ -675,17 +1229,9 @@ class PictureTaker:
             camera_pose_instance.construct_camera_pose(c2w) for c2w in c2w_list
         ]
 
-        lerf_pipelines = [self.lerf_pipeline] * len(camera_poses)
-        session_id_list = [session.session_id] * len(camera_poses)
         # camera pose -> render pictures
-        picture_paths: Iterator[ImageRef] = self.thread_pool_executor.map(
-            lambda tup: PictureTaker.render_picture(*tup),
-            (
-                (lerf_pipeline, camera_pose, session.session_id)
-                for lerf_pipeline, camera_pose, session.session_id in zip(
-                    lerf_pipelines, camera_poses, session_id_list
-                )
-            ),
+        picture_paths = PictureTaker.render_pictures(
+            self.lerf_pipeline, camera_poses, session.session_id, self.render_cache
         )
 
         # Visualize the highlighted points by drawing 3D bounding boxes overlay on a mesh
@@ -693,80 +1239,31 @@ class PictureTaker:
             "Export RGB GLB files drawing 3D bounding boxes overlay on a mesh..."
         )
         mesh_file_path = self.highlight_clusters_in_mesh(
-            session_id=session.session_id, labels=labels, top_positions=top_positions
+            labels=labels, top_positions=top_positions
         )
 
-        return list(picture_paths), mesh_file_path
+        return picture_paths, mesh_file_path
 
     def highlight_clusters_in_mesh(
-        self, session_id: str, labels: np.ndarray, top_positions: np.ndarray
+        self, labels: np.ndarray, top_positions: np.ndarray
     ) -> str:
         # Visualize the highlighted points by drawing 3D bounding boxes overlay on a mesh
-        output_path = os.path.join(Settings.output_path, "mesh_vis")
-        if not os.path.exists(output_path):
-            os.makedirs(output_path)
-        mesh_file_path = os.path.join(output_path, f"{session_id}.glb")
-
-        mesh = o3d.io.read_triangle_mesh(self.scene_config.nerf_exported_mesh_path)
-
-        # Create mesh for the bounding box and set color to red
+        centroids, radii = [], []
         for cluster_id in set(labels):
             if cluster_id == -1:  # Noise
                 continue
-            else:
-                members = top_positions[
-                    labels == cluster_id
-                ]  # Get all members of the cluster
-                centroid = members.mean(axis=0)  # Compute centroid
-                furthest_distance = np.max(
-                    np.linalg.norm(members - centroid, axis=1)
-                )  # Compute furthest distance
-                sphere = self.create_mesh_sphere(
-                    centroid,
-                    furthest_distance,
-                    color=[0.0, 1.0, 0.0],  # color the sphere green
-                )
-                mesh += sphere
-
-        mesh = self.prettify_mesh_for_gradio(mesh)
-        o3d.io.write_triangle_mesh(mesh_file_path, mesh, write_vertex_colors=True)
-
-        return mesh_file_path
-
-    @staticmethod
-    def prettify_mesh_for_gradio(mesh):
-        # Define the transformation matrix
-        T = np.array([[0, -1, 0, 0], [0, 0, 1, 0], [-1, 0, 0, 0], [0, 0, 0, 1]])
-
-        # Apply the transformation
-        mesh.transform(T)
-
-        mesh.scale(10.0, center=mesh.get_center())
-
-        bright_factor = 1.5  # Adjust this factor to get the desired brightness
-        mesh.vertex_colors = o3d.utility.Vector3dVector(
-            np.clip(np.asarray(mesh.vertex_colors) * bright_factor, 0, 1)
-        )
-
-        return mesh
+            members = top_positions[labels == cluster_id]
+            centroid = members.mean(axis=0)
+            centroids.append(centroid)
+            radii.append(np.max(np.linalg.norm(members - centroid, axis=1)))
 
-    @staticmethod
-    def create_mesh_sphere(center, radius, color=[0.0, 1.0, 0.0], resolution=30):
-        # Create a unit sphere (radius 1, centered at origin)
-        mesh_sphere = o3d.geometry.TriangleMesh.create_sphere(
-            radius=1.0, resolution=resolution
+        # a green sphere per cluster, instanced from one sphere template
+        overlay = spheres(
+            np.asarray(centroids).reshape(-1, 3),
+            np.asarray(radii),
+            np.tile([0.0, 1.0, 0.0], (len(radii), 1)),
         )
-
-        # Scale to the desired radius
-        mesh_sphere.scale(radius, center=(0, 0, 0))
-
-        # Translate to the desired center
-        mesh_sphere.translate(center)
-
-        # Paint it with the desired color
-        mesh_sphere.paint_uniform_color(color)
-
-        return mesh_sphere
+        return cached_result_mesh(self.nerf_display_asset, overlay)
 
     def get_relevancy(
         self,
@@ -799,27 +1296,14 @@ class PictureTaker:
     def compute_camera_to_world_matrix(
         self, point: np.ndarray, origin: np.ndarray, k: float
     ) -> np.ndarray:
-        epsilon = 1e-6
         direction = point - origin
         direction = direction / np.linalg.norm(direction)
 
         camera_position = point - (k * direction)
 
-        up = np.array([0, 1, 0])
-
-        right = np.cross(direction, up)
-        right /= np.linalg.norm(right) + epsilon
-
-        new_up = np.cross(right, direction)
-        new_up /= np.linalg.norm(new_up) + epsilon
-
-        camera_to_world = np.eye(4)
-        camera_to_world[:3, 0] = right
-        camera_to_world[:3, 1] = new_up
-        camera_to_world[:3, 2] = -direction
-        camera_to_world[:3, 3] = camera_position
-
-        return camera_to_world.flatten()
+        return look_at_camera_to_world(
+            camera_position, point, Settings.CAMERA_UP
+        ).flatten()
 
     def find_clusters_openscene(self, vertices: np.ndarray, similarity: np.ndarray):
         # Calculate the number of top values directly
@@ -854,6 +1338,10 @@ class PictureTaker:
             extends.append((sx, sy, sz))
             similarity_mean_list.append(simiarity_mean)
 
+        keep, centroids, extends = self.suppress_overlapping_candidates(
+            centroids, extends, similarity_mean_list
+        )
+        similarity_mean_list = [similarity_mean_list[i] for i in keep]
         return centroids, extends, similarity_mean_list
 
     def find_clusters_openscene_best(
@@ -1027,7 +1515,6 @@ class PictureTakerFactory:
             scene_mesh, axis_align_matrix = PictureTakerFactory.load_mesh(
                 scene_config.load_mesh, scene_config.load_metadata
             )
-            thread_pool_executor = ThreadPoolExecutor(max_workers=Settings.MAX_WORKERS)
 
             picture_taker_dict[scene_name] = PictureTaker(
                 scene=scene_config.scene_name,
@@ -1038,7 +1525,6 @@ class PictureTakerFactory:
                 tokenizer=None,
                 neg_embeds=None,
                 negative_words_length=0,
-                thread_pool_executor=thread_pool_executor,
                 openscene_embedding=openscene_embedding,
                 clip_preprocess=preprocess,
                 mesh=scene_mesh,
@@ -1055,6 +1541,10 @@ class PictureTakerFactory:
 
     @staticmethod
     def load_mesh(load_mesh: str, load_meta_file: str):
+        key = mesh_cache_key(load_mesh, load_meta_file)
+        cached = PictureTakerFactory.load_cached_mesh(load_mesh, key)
+        if cached is not None:
+            return cached
         mesh = o3d.io.read_triangle_mesh(load_mesh)
         if not mesh.has_vertex_normals():
             mesh.compute_vertex_normals()
@@ -1072,17 +1562,55 @@ class PictureTakerFactory:
         aligned_vertices = np.copy(mesh_vertices)
         aligned_vertices[:, 0:3] = pts[:, 0:3]
         mesh.vertices = o3d.utility.Vector3dVector(aligned_vertices)
+        PictureTakerFactory.cache_mesh(load_mesh, key, mesh, axis_align_matrix)
         return mesh, axis_align_matrix
 
     @staticmethod
     def load_inthewild_mesh(load_mesh: str):
+        key = mesh_cache_key(load_mesh)
+        cached = PictureTakerFactory.load_cached_mesh(load_mesh, key)
+        if cached is not None:
+            return cached[0]
         mesh = o3d.io.read_triangle_mesh(load_mesh)
         if not mesh.has_vertex_normals():
             mesh.compute_vertex_normals()
         if not mesh.has_triangle_normals():
             mesh.compute_triangle_normals()
+        PictureTakerFactory.cache_mesh(load_mesh, key, mesh)
         return mesh
 
+    @staticmethod
+    def load_cached_mesh(
+        load_mesh: str, key: str
+    ) -> Optional[tuple[o3d.geometry.TriangleMesh, Optional[np.ndarray]]]:
+        """The preprocessed mesh and axis alignment from the binary mesh
+        cache, None if it is disabled or stale."""
+        if not Settings.ENABLE_MESH_CACHE:
+            return None
+        cached = load_mesh_arrays(load_mesh, key)
+        if cached is None:
+            return None
+        arrays, axis_align_matrix = cached
+        mesh = o3d.geometry.TriangleMesh(
+            o3d.utility.Vector3dVector(arrays["vertices"]),
+            o3d.utility.Vector3iVector(arrays["triangles"]),
+        )
+        mesh.vertex_colors = o3d.utility.Vector3dVector(arrays["vertex_colors"])
+        mesh.vertex_normals = o3d.utility.Vector3dVector(arrays["vertex_normals"])
+        mesh.triangle_normals = o3d.utility.Vector3dVector(arrays["triangle_normals"])
+        return mesh, axis_align_matrix
+
+    @staticmethod
+    def cache_mesh(
+        load_mesh: str,
+        key: str,
+        mesh: o3d.geometry.TriangleMesh,
+        axis_align_matrix: Optional[np.ndarray] = None,
+    ) -> None:
+        # the arrays do not hold textures, so textured meshes are not cached
+        if Settings.ENABLE_MESH_CACHE and not mesh.has_textures():
+            save_mesh_arrays(load_mesh, key, mesh_arrays(mesh), axis_align_matrix)
+
     @staticmethod
     def get_transformation_matrix(meta_file):
         lines = open(meta_file).readlines()
@@ -1118,7 +1646,6 @@ class PictureTakerFactory:
         neg_embeds /= neg_embeds.norm(dim=-1, keepdim=True)
         for scene_name, scene_config in scene_configs.items():
             h5_dict = PictureTakerFactory.load_h5_file(scene_config.load_h5_config)
-            thread_pool_executor = ThreadPoolExecutor(max_workers=Settings.MAX_WORKERS)
             scene_mesh, axis_align_matrix = PictureTakerFactory.load_mesh(
                 scene_config.load_mesh, scene_config.load_metadata
             )
@@ -1134,7 +1661,6 @@ class PictureTakerFactory:
                 tokenizer=tokenizer,
                 neg_embeds=neg_embeds,
                 negative_words_length=len(negatives),
-                thread_pool_executor=thread_pool_executor,
                 openscene_embedding=None,
                 clip_preprocess=None,
                 mesh=scene_mesh,
@@ -1168,7 +1694,6 @@ class PictureTakerFactory:
         for scene_name, scene_config in scene_configs.items():
             h5_dict = PictureTakerFactory.load_h5_file(scene_config.load_h5_config)
             mesh = PictureTakerFactory.load_inthewild_mesh(scene_config.load_mesh)
-            thread_pool_executor = ThreadPoolExecutor(max_workers=Settings.MAX_WORKERS)
             lerf_pipeline = PictureTakerFactory.initialize_lerf_pipeline(
                 scene_config.load_lerf_config, scene_name
             )
@@ -1181,7 +1706,6 @@ class PictureTakerFactory:
                 tokenizer=tokenizer,
                 neg_embeds=neg_embeds,
                 negative_words_length=len(negatives),
-                thread_pool_executor=thread_pool_executor,
                 openscene_embedding=None,
                 clip_preprocess=None,
                 device=None,
@@ -1218,7 +1742,6 @@ class PictureTakerFactory:
                 scene_config.load_lerf_config, scene_name
             )
             h5_dict = PictureTakerFactory.load_h5_file(scene_config.load_h5_config)
-            thread_pool_executor = ThreadPoolExecutor(max_workers=Settings.MAX_WORKERS)
             picture_taker_dict[scene_name] = PictureTaker(
                 scene=scene_config.scene_name,
                 scene_config=scene_config,
@@ -1228,7 +1751,6 @@ class PictureTakerFactory:
                 tokenizer=tokenizer,
                 neg_embeds=neg_embeds,
                 negative_words_length=len(negatives),
-                thread_pool_executor=thread_pool_executor,
             )
 
         return picture_taker_dict
@@ -1238,11 +1760,15 @@ class PictureTakerFactory:
         initial_dir = os.getcwd()
         print(str(Settings.NERF_DATA_PATH + "/" + scene_name))
         os.chdir(Settings.NERF_DATA_PATH + "/" + scene_name)
+        # None keeps the checkpoint's default
+        eval_num_rays_per_chunk = load_tuned_chunk_size(scene_name)
         _, lerf_pipeline, _, _ = eval_setup(
             Path(load_config),
-            eval_num_rays_per_chunk=None,
+            eval_num_rays_per_chunk=eval_num_rays_per_chunk,
             test_mode="test",
         )
+        if eval_num_rays_per_chunk is None and Settings.CALIBRATE_CHUNK_SIZE_ON_LOAD:
+            calibrate_chunk_size(lerf_pipeline, scene_name)
         os.chdir(initial_dir)
         return lerf_pipeline
 
@@ -1252,7 +1778,7 @@ class PictureTakerFactory:
         hdf5_file = h5py.File(load_config, "r")
         # batch_idx = 5
         points = hdf5_file["points"]["points"][:]
-        origins = hdf5_file["origins"]["origins"][:]
+        origin_table, camera_indices = read_origins(hdf5_file)
         directions = hdf5_file["directions"]["directions"][:]
 
         clip_embeddings_per_scale = []
@@ -1265,7 +1791,8 @@ class PictureTakerFactory:
         hdf5_file.close()
         h5_dict = {
             "points": points,
-            "origins": origins,
+            "origin_table": origin_table,
+            "camera_indices": camera_indices,
             "directions": directions,
             "clip_embeddings_per_scale": clip_embeddings_per_scale,
             "rgb": rgb,
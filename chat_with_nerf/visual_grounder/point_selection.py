@@ -0,0 +1,62 @@
+from typing import Optional
+
+import numpy as np
+
+
+def voxel_deduplicate(
+    indices: np.ndarray, scores: np.ndarray, positions: np.ndarray, voxel_size: float
+) -> np.ndarray:
+    """Keep only the highest scoring point of every occupied voxel.
+
+    :return: the kept subset of `indices`, highest score first
+    """
+    order = np.argsort(-scores[indices], kind="stable")
+    indices = indices[order]
+    voxels = np.floor(positions[indices] / voxel_size).astype(np.int64)
+    _, first = np.unique(voxels, axis=0, return_index=True)
+    return indices[np.sort(first)]
+
+
+def select_top_points(
+    scores: np.ndarray,
+    fraction: float,
+    max_points: Optional[int] = None,
+    positions: Optional[np.ndarray] = None,
+    voxel_size: float = 0.0,
+    seed: int = 0,
+) -> tuple[np.ndarray, float]:
+    """Select the top `fraction` of points by score for clustering, capped at
+    `max_points`.
+
+    Above the cap the candidates are first voxel-deduplicated and, if still
+    too many, sampled without replacement with probability proportional to
+    their score.
+
+    :return: the selected indices and the fraction of the top candidates
+        they keep after deduplication and sampling, to scale density
+        parameters such as DBSCAN's min_samples
+    """
+    scores = scores.reshape(-1)
+    top_count = int(scores.size * fraction)
+    top_indices = np.argpartition(scores, -top_count)[-top_count:]
+    if max_points is None or top_count <= max_points:
+        return top_indices, 1.0
+
+    if positions is not None and voxel_size > 0:
+        top_indices = voxel_deduplicate(top_indices, scores, positions, voxel_size)
+        if top_indices.shape[0] <= max_points:
+            return top_indices, top_indices.shape[0] / top_count
+
+    weights = scores[top_indices].astype(np.float64)
+    weights = weights - weights.min() + 1e-6
+    rng = np.random.default_rng(seed)
+    sampled = rng.choice(
+        top_indices.shape[0], size=max_points, replace=False, p=weights / weights.sum()
+    )
+    return top_indices[sampled], max_points / top_count
+
+
+def scaled_min_samples(min_samples: int, sampling_ratio: float, floor: int = 3) -> int:
+    """Scale DBSCAN's min_samples with the density lost to deduplication and
+    sampling."""
+    return max(floor, int(round(min_samples * sampling_ratio)))
@@ -0,0 +1,114 @@
+import numpy as np
+
+
+def project_points(
+    points: np.ndarray,
+    camera_to_world: np.ndarray,
+    fov_degrees: float,
+    height: int,
+    width: int,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Project world points into a pinhole camera looking down its -z axis
+    (the nerfstudio / OpenGL convention), with a vertical field of view.
+
+    :return: pixel columns, pixel rows (both float) and depths along the
+        viewing direction
+    """
+    camera_to_world = np.asarray(camera_to_world, dtype=np.float64).reshape(-1, 4)
+    rotation = camera_to_world[:3, :3]
+    translation = camera_to_world[:3, 3]
+    points_camera = (points - translation) @ rotation
+    depths = -points_camera[:, 2]
+    focal = 0.5 * height / np.tan(np.radians(fov_degrees) / 2)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        columns = width / 2 + focal * points_camera[:, 0] / depths
+        rows = height / 2 - focal * points_camera[:, 1] / depths
+    return columns, rows, depths
+
+
+def splat_points(
+    points: np.ndarray,
+    colors: np.ndarray,
+    camera_to_world: np.ndarray,
+    fov_degrees: float,
+    height: int,
+    width: int,
+    radius: int = 1,
+    background: tuple = (0.0, 0.0, 0.0),
+    near: float = 1e-3,
+) -> np.ndarray:
+    """Render colored points as square splats of (2 * radius + 1) pixels with a
+    z-buffer, keeping the nearest point on every pixel.
+
+    :return: a (height, width, 3) float image in [0, 1]
+    """
+    colors = np.asarray(colors)
+    if colors.dtype == np.uint8:
+        colors = colors.astype(np.float32) / 255.0
+    image = np.empty((height, width, 3), dtype=np.float32)
+    image[:] = background
+
+    columns, rows, depths = project_points(
+        points, camera_to_world, fov_degrees, height, width
+    )
+    in_front = depths > near
+    columns = np.floor(columns[in_front]).astype(np.int64)
+    rows = np.floor(rows[in_front]).astype(np.int64)
+    depths = depths[in_front]
+    point_ids = np.flatnonzero(in_front)
+
+    # every point covers a square of pixels around its projection
+    offsets = np.arange(-radius, radius + 1)
+    splat_shape = (columns.shape[0], offsets.shape[0], offsets.shape[0])
+    columns = np.broadcast_to(
+        columns[:, None, None] + offsets[None, None, :], splat_shape
+    ).reshape(-1)
+    rows = np.broadcast_to(
+        rows[:, None, None] + offsets[None, :, None], splat_shape
+    ).reshape(-1)
+    splat_size = offsets.shape[0] ** 2
+    depths = np.repeat(depths, splat_size)
+    point_ids = np.repeat(point_ids, splat_size)
+
+    inside = (columns >= 0) & (columns < width) & (rows >= 0) & (rows < height)
+    pixels = rows[inside] * width + columns[inside]
+    depths = depths[inside]
+    point_ids = point_ids[inside]
+
+    # z-buffer: the nearest splat of every pixel wins
+    order = np.lexsort((depths, pixels))
+    pixels = pixels[order]
+    first = np.ones(pixels.shape[0], dtype=bool)
+    first[1:] = pixels[1:] != pixels[:-1]
+    image.reshape(-1, 3)[pixels[first]] = colors[point_ids[order][first]]
+    return image
+
+
+def splat_camera_pose(
+    points: np.ndarray,
+    colors: np.ndarray,
+    camera_pose: dict,
+    radius: int = 1,
+    background: tuple = (0.0, 0.0, 0.0),
+) -> np.ndarray:
+    """Splat the points for the first camera of a camera path. A crop box in
+    the camera path limits the points to that box and sets the background."""
+    camera = camera_pose["camera_path"][0]
+    crop = camera_pose.get("crop")
+    if crop is not None:
+        center = np.asarray(crop["crop_center"])
+        half_scale = np.asarray(crop["crop_scale"]) / 2
+        inside = np.all(np.abs(points - center) <= half_scale, axis=1)
+        points, colors = points[inside], colors[inside]
+        bg_color = crop["crop_bg_color"]
+        background = (bg_color["r"] / 255, bg_color["g"] / 255, bg_color["b"] / 255)
+    return splat_points(
+        points,
+        colors,
+        camera["camera_to_world"],
+        camera["fov"],
+        camera_pose["render_height"],
+        camera_pose["render_width"],
+        radius,
+        background,
+    )
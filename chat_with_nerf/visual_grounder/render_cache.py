@@ -0,0 +1,244 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Optional
+
+import numpy as np
+from attrs import define, field
+
+from chat_with_nerf import logger
+from chat_with_nerf.settings import Settings
+from chat_with_nerf.util import atomic_write_path
+from chat_with_nerf.visual_grounder.image_ref import ImageRef
+
+
+@define
+class DiskLRUCache:
+    """A directory of files named by key, capped in total size by evicting the
+    least recently used files first.
+
+    The use order and sizes are kept in memory, seeded from the modification
+    times on startup. The directory is only listed again when a tracked file
+    turns out to be gone.
+    """
+
+    directory: str
+    max_bytes: int
+    suffix: str = ""
+    total_bytes: int = field(init=False, default=0)
+    sizes: OrderedDict = field(init=False, factory=OrderedDict)
+    """Size of every cached file as last accounted, by path, least recently
+    used first."""
+    lock: threading.Lock = field(init=False, factory=threading.Lock)
+
+    def __attrs_post_init__(self) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        self.recount()
+
+    def path_for(self, key: str) -> str:
+        return os.path.join(self.directory, key + self.suffix)
+
+    def entries(self) -> list[tuple[float, str, int]]:
+        """List the cached files as (last use, path, size)."""
+        entries = []
+        with os.scandir(self.directory) as dir_entries:
+            for entry in dir_entries:
+                if entry.is_file() and entry.name.endswith(self.suffix):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, entry.path, stat.st_size))
+        return entries
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the path of a cached file and mark it as recently used."""
+        path = self.path_for(key)
+        try:
+            # the modification time keeps the order across restarts
+            os.utime(path)
+        except FileNotFoundError:
+            with self.lock:
+                if path in self.sizes:
+                    # removed behind our back, the accounting is stale
+                    self.recount()
+            return None
+        with self.lock:
+            if path in self.sizes:
+                self.sizes.move_to_end(path)
+        return path
+
+    def put(self, key: str, source_path: str) -> str:
+        """Add a file to the cache, as a hard link when possible."""
+        path = self.path_for(key)
+        if os.path.exists(path) and os.path.samefile(source_path, path):
+            return self.commit(key)
+        with atomic_write_path(path) as tmp_path:
+            try:
+                os.link(source_path, tmp_path)
+            except OSError:
+                shutil.copyfile(source_path, tmp_path)
+        return self.commit(key)
+
+    def commit(self, key: str) -> str:
+        """Account for a file that was written to `path_for(key)` and evict
+        the least recently used files above the size cap. A file that
+        replaced an earlier one for the same key only adds the difference."""
+        path = self.path_for(key)
+        with self.lock:
+            size = os.path.getsize(path)
+            self.total_bytes += size - self.sizes.pop(path, 0)
+            self.sizes[path] = size
+            if self.total_bytes > self.max_bytes:
+                self.evict()
+        return path
+
+    def recount(self) -> None:
+        """Rebuild the use order and sizes from the directory."""
+        self.sizes = OrderedDict(
+            (path, size) for _, path, size in sorted(self.entries())
+        )
+        self.total_bytes = sum(self.sizes.values())
+
+    def evict(self) -> None:
+        while self.total_bytes > self.max_bytes and len(self.sizes) > 1:
+            path, size = self.sizes.popitem(last=False)
+            self.total_bytes -= size
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+
+def render_key(scene: str, camera_pose: dict, quantization: float) -> str:
+    """Content address of a render: scene, quantized camera poses,
+    resolution, field of view and crop."""
+    description = {
+        "scene": scene,
+        "camera_type": camera_pose["camera_type"],
+        "render_height": camera_pose["render_height"],
+        "render_width": camera_pose["render_width"],
+        "crop": camera_pose.get("crop"),
+        "camera_path": [
+            {
+                "camera_to_world": np.round(
+                    np.asarray(entry["camera_to_world"], dtype=np.float64)
+                    / quantization
+                )
+                .astype(np.int64)
+                .tolist(),
+                "fov": entry["fov"],
+                "aspect": entry["aspect"],
+            }
+            for entry in camera_pose["camera_path"]
+        ],
+    }
+    encoded = json.dumps(description, sort_keys=True, default=str)
+    return hashlib.sha1(encoded.encode("utf-8")).hexdigest()
+
+
+def is_available(image_ref: ImageRef) -> bool:
+    """Whether the image file of a reference exists or is still being
+    written, so its path can be shown in the chat."""
+    if image_ref.written is not None and not image_ref.written.done():
+        return True
+    return os.path.exists(image_ref.rgb_address)
+
+
+@define
+class RenderCache:
+    """Two-tier cache of rendered candidate views: an in-memory LRU of image
+    references in front of a size-capped directory of images."""
+
+    scene: str
+    disk: DiskLRUCache
+    memory_entries: int = Settings.RENDER_CACHE_MEMORY_ENTRIES
+    quantization: float = Settings.RENDER_CACHE_POSE_QUANTIZATION
+    memory: OrderedDict = field(init=False, factory=OrderedDict)
+    memory_hits: int = field(init=False, default=0)
+    disk_hits: int = field(init=False, default=0)
+    misses: int = field(init=False, default=0)
+    lock: threading.Lock = field(init=False, factory=threading.Lock)
+
+    @classmethod
+    def for_scene(cls, scene: str) -> Optional["RenderCache"]:
+        if not Settings.ENABLE_RENDER_CACHE:
+            return None
+        disk = DiskLRUCache(
+            os.path.join(Settings.RENDER_CACHE_PATH, scene),
+            Settings.RENDER_CACHE_MAX_BYTES,
+            suffix="." + Settings.RENDER_IMAGE_FORMAT,
+        )
+        return cls(scene, disk)
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0
+
+    def stats(self) -> dict:
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": self.hit_rate,
+            "disk_bytes": self.disk.total_bytes,
+        }
+
+    def get(self, camera_pose: dict) -> Optional[ImageRef]:
+        key = render_key(self.scene, camera_pose, self.quantization)
+        with self.lock:
+            image_ref = self.memory.get(key)
+            if image_ref is not None and not is_available(image_ref):
+                # evicted from the disk tier or removed with its session
+                del self.memory[key]
+            elif image_ref is not None:
+                self.memory_hits += 1
+                self.memory.move_to_end(key)
+                return image_ref
+
+        path = self.disk.get(key)
+        if path is None:
+            with self.lock:
+                self.misses += 1
+            return None
+        # disk hits are decoded only if their pixels are used
+        image_ref = ImageRef(path)
+        with self.lock:
+            self.disk_hits += 1
+        self.remember(key, image_ref)
+        return image_ref
+
+    def put(self, camera_pose: dict, image_ref: ImageRef) -> ImageRef:
+        """Store a freshly rendered image and return a reference to the
+        cached copy. Images still being written are added to the disk tier
+        once their write completes."""
+        key = render_key(self.scene, camera_pose, self.quantization)
+        self.remember(key, image_ref)
+        if image_ref.written is None:
+            return self.add_to_disk(key, image_ref)
+
+        def on_written(written: Future) -> None:
+            if written.exception() is None:
+                self.add_to_disk(key, image_ref)
+
+        image_ref.written.add_done_callback(on_written)
+        return image_ref
+
+    def add_to_disk(self, key: str, image_ref: ImageRef) -> ImageRef:
+        cached_ref = ImageRef(
+            self.disk.put(key, image_ref.rgb_address), image_ref.image_pixels
+        )
+        self.remember(key, cached_ref)
+        return cached_ref
+
+    def remember(self, key: str, image_ref: ImageRef) -> None:
+        with self.lock:
+            self.memory[key] = image_ref
+            self.memory.move_to_end(key)
+            while len(self.memory) > self.memory_entries:
+                self.memory.popitem(last=False)
+
+    def log_stats(self) -> None:
+        logger.info(f"Render cache for {self.scene}: {self.stats()}")
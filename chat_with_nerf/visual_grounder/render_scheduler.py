@@ -0,0 +1,197 @@
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Future
+from typing import Any, Callable, Hashable
+
+import numpy as np
+from attrs import define, field
+
+from chat_with_nerf import logger
+from chat_with_nerf.settings import Settings
+
+# lower values are served first
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BACKGROUND = 10
+
+
+@define
+class RenderJob:
+    session_id: str
+    batch_key: Hashable
+    """Jobs with equal keys render with the same function and can share a batch."""
+    camera_poses: list[dict]
+    render: Callable[[list[dict], list[str]], list[Any]]
+    """Renders camera poses, each with the session id it belongs to."""
+    priority: int
+    future: Future = field(factory=Future)
+    submitted_at: float = field(factory=time.monotonic)
+
+
+@define
+class RenderScheduler:
+    """Serializes the render jobs of all sessions on one device.
+
+    Jobs are served by priority, and round-robin across sessions within a
+    priority. The next job is batched with queued jobs of other sessions that
+    share its batch key, up to `max_batch_cameras` cameras.
+    """
+
+    device: str
+    max_batch_cameras: int = Settings.MAX_CAMERAS_PER_RENDER_BATCH
+    wait_window: int = 1000  # wait times kept for the metrics
+    metrics_log_interval: float = Settings.RENDER_METRICS_LOG_INTERVAL
+    queues: dict[int, OrderedDict] = field(init=False, factory=dict)
+    condition: threading.Condition = field(init=False, factory=threading.Condition)
+    worker: threading.Thread | None = field(init=False, default=None)
+    queued_cameras: int = field(init=False, default=0)
+    batches: int = field(init=False, default=0)
+    rendered_cameras: int = field(init=False, default=0)
+    wait_times: deque = field(init=False)
+    metrics_logged_at: float = field(init=False, factory=time.monotonic)
+
+    @wait_times.default
+    def _default_wait_times(self) -> deque:
+        return deque(maxlen=self.wait_window)
+
+    def submit(
+        self,
+        session_id: str,
+        batch_key: Hashable,
+        camera_poses: list[dict],
+        render: Callable[[list[dict], list[str]], list[Any]],
+        priority: int = PRIORITY_INTERACTIVE,
+    ) -> Future:
+        """Queue camera poses for rendering.
+
+        :return: a future resolving to the rendered results, one per pose
+        """
+        job = RenderJob(session_id, batch_key, camera_poses, render, priority)
+        with self.condition:
+            sessions = self.queues.setdefault(priority, OrderedDict())
+            sessions.setdefault(session_id, deque()).append(job)
+            self.queued_cameras += len(camera_poses)
+            if self.worker is None:
+                self.worker = threading.Thread(
+                    target=self.run, name=f"render_scheduler_{self.device}", daemon=True
+                )
+                self.worker.start()
+            self.condition.notify()
+        return job.future
+
+    def pop_job(self, priority: int, session_id: str) -> RenderJob:
+        """Pop a session's oldest job and move the session to the back of the
+        round robin. Must hold the condition."""
+        sessions = self.queues[priority]
+        jobs = sessions.pop(session_id)
+        job = jobs.popleft()
+        if jobs:
+            sessions[session_id] = jobs
+        if not sessions:
+            del self.queues[priority]
+        self.queued_cameras -= len(job.camera_poses)
+        return job
+
+    def next_batch(self) -> list[RenderJob]:
+        """Take the next job by priority and round robin together with the
+        jobs of the same priority it can be batched with. Must hold the
+        condition."""
+        priority = min(self.queues)
+        first = self.pop_job(priority, next(iter(self.queues[priority])))
+        batch = [first]
+        cameras = len(first.camera_poses)
+        while cameras < self.max_batch_cameras and priority in self.queues:
+            candidates = [
+                (session_id, jobs[0])
+                for session_id, jobs in self.queues[priority].items()
+                if jobs[0].batch_key == first.batch_key
+                and cameras + len(jobs[0].camera_poses) <= self.max_batch_cameras
+            ]
+            if not candidates:
+                break
+            job = self.pop_job(priority, candidates[0][0])
+            batch.append(job)
+            cameras += len(job.camera_poses)
+        return batch
+
+    def run(self) -> None:
+        while True:
+            with self.condition:
+                while not self.queues:
+                    self.condition.wait()
+                batch = self.next_batch()
+            self.run_batch(batch)
+
+    def run_batch(self, batch: list[RenderJob]) -> None:
+        # jobs cancelled by their caller are skipped, the others can no longer be
+        batch = [job for job in batch if job.future.set_running_or_notify_cancel()]
+        if not batch:
+            return
+        started_at = time.monotonic()
+        camera_poses = [pose for job in batch for pose in job.camera_poses]
+        session_ids = [job.session_id for job in batch for _ in job.camera_poses]
+        try:
+            results = batch[0].render(camera_poses, session_ids)
+        except Exception as exp:
+            for job in batch:
+                job.future.set_exception(exp)
+            logger.error(f"Render batch on {self.device} failed: {exp}")
+            return
+
+        start = 0
+        for job in batch:
+            end = start + len(job.camera_poses)
+            job.future.set_result(results[start:end])
+            start = end
+        with self.condition:
+            self.batches += 1
+            self.rendered_cameras += len(camera_poses)
+            self.wait_times.extend(started_at - job.submitted_at for job in batch)
+        logger.info(
+            f"Rendered {len(camera_poses)} cameras of {len(batch)} jobs on "
+            f"{self.device} in {time.monotonic() - started_at:.2f}s, "
+            f"{self.queued_cameras} cameras queued."
+        )
+        if time.monotonic() - self.metrics_logged_at >= self.metrics_log_interval:
+            self.log_metrics()
+
+    def metrics(self) -> dict:
+        with self.condition:
+            wait_times = np.asarray(self.wait_times)
+            return {
+                "queued_jobs": sum(
+                    len(jobs)
+                    for sessions in self.queues.values()
+                    for jobs in sessions.values()
+                ),
+                "queued_cameras": self.queued_cameras,
+                "queued_sessions": len(
+                    {s for sessions in self.queues.values() for s in sessions}
+                ),
+                "batches": self.batches,
+                "rendered_cameras": self.rendered_cameras,
+                "mean_wait_seconds": (
+                    float(wait_times.mean()) if wait_times.size else 0.0
+                ),
+                "p95_wait_seconds": (
+                    float(np.percentile(wait_times, 95)) if wait_times.size else 0.0
+                ),
+                "max_wait_seconds": float(wait_times.max()) if wait_times.size else 0.0,
+            }
+
+    def log_metrics(self) -> None:
+        self.metrics_logged_at = time.monotonic()
+        logger.info(f"Render scheduler on {self.device}: {self.metrics()}")
+
+
+_schedulers: dict[str, RenderScheduler] = {}
+_schedulers_lock = threading.Lock()
+
+
+def scheduler_for_device(device: Any) -> RenderScheduler:
+    """The render scheduler shared by every pipeline on `device`."""
+    with _schedulers_lock:
+        key = str(device)
+        if key not in _schedulers:
+            _schedulers[key] = RenderScheduler(key)
+        return _schedulers[key]
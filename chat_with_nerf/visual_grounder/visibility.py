@@ -0,0 +1,99 @@
+import numpy as np
+import open3d as o3d
+from attrs import define
+
+from chat_with_nerf.settings import Settings
+
+
+def rotate_about_axis(
+    vector: np.ndarray, axis: np.ndarray, angles_degrees: np.ndarray
+) -> np.ndarray:
+    """Rotate `vector` about `axis` by each angle (Rodrigues' formula).
+
+    :return: a (A, 3) array, one rotated vector per angle
+    """
+    axis = axis / np.linalg.norm(axis)
+    angles = np.radians(np.asarray(angles_degrees, dtype=np.float64))[:, None]
+    return (
+        vector * np.cos(angles)
+        + np.cross(axis, vector) * np.sin(angles)
+        + axis * np.dot(axis, vector) * (1 - np.cos(angles))
+    )
+
+
+def occluded_fraction(
+    hit_distances: np.ndarray, target_distances: np.ndarray, tolerance: float
+) -> np.ndarray:
+    """Fraction of the rays towards the targets that hit the mesh before
+    reaching their target, per candidate viewpoint (last axis reduced)."""
+    return np.mean(hit_distances < target_distances - tolerance, axis=-1)
+
+
+@define
+class VisibilityChecker:
+    """Raycasts candidate viewpoints against the scene mesh on the CPU to pick
+    the least occluded one before anything is rendered."""
+
+    raycasting_scene: o3d.t.geometry.RaycastingScene
+    azimuths: tuple = Settings.VISIBILITY_AZIMUTHS
+    up: tuple = Settings.CAMERA_UP
+    tolerance: float = Settings.VISIBILITY_TOLERANCE
+    max_targets: int = Settings.VISIBILITY_MAX_TARGETS
+
+    @classmethod
+    def from_mesh(cls, mesh: o3d.geometry.TriangleMesh) -> "VisibilityChecker":
+        raycasting_scene = o3d.t.geometry.RaycastingScene()
+        raycasting_scene.add_triangles(o3d.t.geometry.TriangleMesh.from_legacy(mesh))
+        return cls(raycasting_scene)
+
+    def sample_targets(self, point: np.ndarray, members: np.ndarray) -> np.ndarray:
+        """The best point and an evenly strided subset of the cluster."""
+        stride = max(1, int(np.ceil(members.shape[0] / (self.max_targets - 1))))
+        return np.concatenate([point[None], members[::stride]])
+
+    def viewpoint_occlusion(
+        self, point: np.ndarray, origin: np.ndarray, k: float, members: np.ndarray
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Occlusion of the cluster seen from distance `k` along the training
+        ray and along that ray rotated by each azimuth about the up axis.
+
+        :return: the (A, 3) viewing directions and their occluded fractions
+        """
+        direction = point - origin
+        direction = direction / np.linalg.norm(direction)
+        directions = rotate_about_axis(
+            direction, np.asarray(self.up, dtype=np.float64), np.asarray(self.azimuths)
+        )
+        camera_positions = point - k * directions
+        targets = self.sample_targets(point, members)
+
+        to_targets = targets[None, :, :] - camera_positions[:, None, :]
+        target_distances = np.linalg.norm(to_targets, axis=-1)
+        ray_directions = to_targets / np.maximum(target_distances[..., None], 1e-9)
+        rays = np.concatenate(
+            [
+                np.broadcast_to(camera_positions[:, None, :], to_targets.shape),
+                ray_directions,
+            ],
+            axis=-1,
+        )
+        hits = self.raycasting_scene.cast_rays(
+            o3d.core.Tensor(rays.reshape(-1, 6).astype(np.float32))
+        )
+        hit_distances = hits["t_hit"].numpy().reshape(target_distances.shape)
+        return directions, occluded_fraction(
+            hit_distances, target_distances, self.tolerance
+        )
+
+    def choose_viewpoint(
+        self, point: np.ndarray, origin: np.ndarray, k: float, members: np.ndarray
+    ) -> tuple[np.ndarray, float]:
+        """Pick the least occluded candidate viewpoint, preferring the
+        training ray on ties.
+
+        :return: a virtual origin to pass to compute_camera_to_world_matrix in
+            place of `origin`, and the occluded fraction from there
+        """
+        directions, occlusion = self.viewpoint_occlusion(point, origin, k, members)
+        best = int(np.argmin(occlusion))
+        return point - directions[best], float(occlusion[best])
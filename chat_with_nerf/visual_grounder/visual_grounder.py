@@ -1,6 +1,5 @@
 from __future__ import annotations
 
-import numpy as np
 import torch
 import clip
 from attrs import define
@@ -8,7 +7,10 @@ from rich.console import Console
 from chat_with_nerf.chat.session import Session
 from chat_with_nerf import logger
 from chat_with_nerf.visual_grounder.captioner import BaseCaptioner
+from chat_with_nerf.visual_grounder.grounding_cache import LANDMARK, TARGET
+from chat_with_nerf.visual_grounder.image_batch import preprocess_batch
 from chat_with_nerf.visual_grounder.picture_taker import PictureTaker
+from chat_with_nerf.visual_grounder.vocabulary import LERF_RELEVANCY_THRESHOLD
 from chat_with_nerf.settings import Settings
 
 CONSOLE = Console(width=120)
@@ -65,18 +67,52 @@ class VisualGrounder:
         )
         return center_list, box_size_list, values_list
 
+    @staticmethod
+    def lookup_vocabulary(
+        picture_taker: PictureTaker,
+        positive_phrase: str,
+        relevancy_threshold: float | None = None,
+    ):
+        """Return the vocabulary table and the entry the phrase maps to, if the
+        scene has a precomputed table containing it with relevant points."""
+        table = picture_taker.vocabulary_table
+        if table is None:
+            return None, None
+        label_id = table.lookup(positive_phrase, relevancy_threshold)
+        if label_id is not None:
+            logger.info(f"'{positive_phrase}' answered from the vocabulary table.")
+        return table, label_id
+
     @staticmethod
     def target_finder(
         session: Session,
         positive_phrase: str,
         picture_taker: PictureTaker,
     ):
+        table, label_id = VisualGrounder.lookup_vocabulary(
+            picture_taker, positive_phrase, LERF_RELEVANCY_THRESHOLD
+        )
+        if label_id is not None:
+            centroids, bboxes = picture_taker.select_vocabulary_candidates(
+                session, table, label_id
+            )
+            return (centroids, bboxes), []
+
+        cached = picture_taker.grounding_cache.get(TARGET, positive_phrase)
+        if cached is not None:
+            centroids, bboxes, camera_poses = cached
+            session.camera_poses = camera_poses
+            return (centroids, bboxes), []
+
         (
             centroids,
             bboxes,
         ), paths2images = picture_taker.visual_ground_pipeline_with_gpt(
             positive_phrase, session
         )
+        picture_taker.grounding_cache.put(
+            TARGET, positive_phrase, (centroids, bboxes, session.camera_poses)
+        )
 
         return (centroids, bboxes), paths2images
 
@@ -86,9 +122,20 @@ class VisualGrounder:
         positive_phrase: str,
         picture_taker: PictureTaker,
     ):
+        table, label_id = VisualGrounder.lookup_vocabulary(
+            picture_taker, positive_phrase, LERF_RELEVANCY_THRESHOLD
+        )
+        if label_id is not None and table.landmark_result(label_id) is not None:
+            return table.landmark_result(label_id)
+
+        cached = picture_taker.grounding_cache.get(LANDMARK, positive_phrase)
+        if cached is not None:
+            return cached
+
         centroids = picture_taker.visual_ground_pipeline_with_gpt_lerf(
             positive_phrase, session.session_id
         )
+        picture_taker.grounding_cache.put(LANDMARK, positive_phrase, centroids)
 
         return centroids
 
@@ -96,9 +143,10 @@ class VisualGrounder:
     def visual_feedback(positive_phrase, target_candidate_images_list, picture_taker):
         clip_model = picture_taker.clip_model
         clip_tokenizer = picture_taker.clip_tokenizer
-        images = [img_ref.raw_image for img_ref in target_candidate_images_list]
-
-        image_input = torch.tensor(np.stack(images)).cuda()
+        # all candidates in one batch, preprocessed once from memory
+        image_input = preprocess_batch(
+            target_candidate_images_list, picture_taker.clip_preprocess, "cuda"
+        )
         natural_sentences = [positive_phrase]
         # print(image_input.shape) torch.Size([21, 3, 224, 224])
         text_tokens = clip_tokenizer.tokenize(natural_sentences).cuda()
@@ -120,6 +168,21 @@ class VisualGrounder:
         positive_phrase: str,
         picture_taker: PictureTaker,
     ):
+        table, label_id = VisualGrounder.lookup_vocabulary(
+            picture_taker, positive_phrase
+        )
+        if label_id is not None:
+            centroids, bboxes, scores, _, _, _ = table.target_result(label_id)
+            _, centroids, bboxes = picture_taker.suppress_overlapping_candidates(
+                centroids, bboxes, scores
+            )
+            return (centroids, bboxes)
+
+        cached = picture_taker.grounding_cache.get(TARGET, positive_phrase)
+        if cached is not None:
+            centroids, bboxes, _ = cached
+            return (centroids, bboxes)
+
         (
             centroids,
             bboxes,
@@ -127,6 +190,9 @@ class VisualGrounder:
         ) = picture_taker.visual_ground_target_finder_with_gpt_openscene(
             positive_phrase, session.session_id
         )
+        picture_taker.grounding_cache.put(
+            TARGET, positive_phrase, (centroids, bboxes, None)
+        )
 
         return (centroids, bboxes)
 
@@ -136,27 +202,58 @@ class VisualGrounder:
         positive_phrase: str,
         picture_taker: PictureTaker,
     ):
+        table, label_id = VisualGrounder.lookup_vocabulary(
+            picture_taker, positive_phrase
+        )
+        if label_id is not None and table.landmark_result(label_id) is not None:
+            return table.landmark_result(label_id)
+
+        cached = picture_taker.grounding_cache.get(LANDMARK, positive_phrase)
+        if cached is not None:
+            return cached
+
         (
             centroid,
             extend,
         ) = picture_taker.visual_ground_landmark_finder_with_gpt_openscene(
             positive_phrase, session.session_id
         )
+        picture_taker.grounding_cache.put(LANDMARK, positive_phrase, (centroid, extend))
 
         return centroid, extend
 
+    @staticmethod
+    def precompute(
+        scene: str, role: str, positive_phrase: str, picture_taker: PictureTaker
+    ) -> None:
+        """Run the grounding pipeline for a phrase outside of any live session
+        so that its result lands in the grounding cache."""
+        session = Session.create_for_scene(scene)
+        if scene.startswith("s"):
+            finder = (
+                VisualGrounder.target_finder_openscene
+                if role == TARGET
+                else VisualGrounder.landmark_finder_openscene
+            )
+        else:
+            finder = (
+                VisualGrounder.target_finder
+                if role == TARGET
+                else VisualGrounder.landmark_finder
+            )
+        finder(session, positive_phrase, picture_taker)
+        torch.cuda.empty_cache()  # free up GPU memory
+
     @staticmethod
     def visual_feedback_openscene(
         positive_phrase, target_candidate_images_list, picture_taker
     ):
         ## TODO: take a look.
         clip_model = picture_taker.clip_model
-        images = [
-            picture_taker.clip_preprocess(img_ref.raw_image)
-            for img_ref in target_candidate_images_list
-        ]
-
-        image_input = torch.tensor(np.stack(images)).cuda()
+        # all candidates in one batch, preprocessed once from memory
+        image_input = preprocess_batch(
+            target_candidate_images_list, picture_taker.clip_preprocess, "cuda"
+        )
         natural_sentences = [positive_phrase]
         # print(image_input.shape) torch.Size([21, 3, 224, 224])
         text_tokens = clip.tokenize(natural_sentences).cuda()
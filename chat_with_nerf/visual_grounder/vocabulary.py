@@ -0,0 +1,184 @@
+import os
+from typing import Optional
+
+import numpy as np
+from attrs import define, fields
+
+from chat_with_nerf import logger
+from chat_with_nerf.settings import Settings
+
+# ScanNet-20 benchmark classes, used when no vocabulary file is configured
+DEFAULT_VOCABULARY = [
+    "wall",
+    "floor",
+    "cabinet",
+    "bed",
+    "chair",
+    "sofa",
+    "table",
+    "door",
+    "window",
+    "bookshelf",
+    "picture",
+    "counter",
+    "desk",
+    "curtain",
+    "refrigerator",
+    "shower curtain",
+    "toilet",
+    "sink",
+    "bathtub",
+    "other furniture",
+]
+
+# the online LERF pipelines find no target without a point above this score
+LERF_RELEVANCY_THRESHOLD = 0.5
+
+ARTICLES = {"a", "an", "the"}
+# plural endings and their singular replacements, longest first
+PLURAL_ENDINGS = (("ies", "y"), ("ves", "f"), ("es", ""), ("s", ""))
+
+
+def normalize_label(phrase: str) -> str:
+    """Lowercase a phrase and drop leading articles."""
+    words = phrase.lower().strip().split()
+    while words and words[0] in ARTICLES:
+        words = words[1:]
+    return " ".join(words)
+
+
+def singular_candidates(label: str) -> list[str]:
+    """The label followed by the singulars its plural ending may stand for,
+    e.g. "bookshelves" -> ["bookshelves", "bookshelf"]. Only candidates found
+    in a vocabulary are used, so "glasses" never turns into "glasse"."""
+    candidates = [label]
+    for ending, replacement in PLURAL_ENDINGS:
+        if label.endswith(ending) and len(label) > len(ending) + 1:
+            candidates.append(label[: -len(ending)] + replacement)
+    return candidates
+
+
+def load_vocabulary(vocabulary_path: Optional[str]) -> list[str]:
+    """Load a vocabulary file with one label per line."""
+    if vocabulary_path is None:
+        return list(DEFAULT_VOCABULARY)
+    with open(vocabulary_path, encoding="utf-8") as file:
+        return [line.strip() for line in file if line.strip()]
+
+
+@define
+class VocabularyTable:
+    """Precomputed relevancy of a fixed vocabulary in one scene.
+
+    For each label it keeps the indices and scores of the top-k points at the
+    best scale, a summary of the target clusters and the landmark cluster,
+    each clustered with the parameters of the online pipeline they replace.
+    """
+
+    labels: np.ndarray
+    """(C,) vocabulary labels."""
+    best_scales: np.ndarray
+    """(C,) best LERF scale per label, 0 for OpenScene features."""
+    top_indices: np.ndarray
+    """(C, k) int32 indices of the most relevant points, best first."""
+    top_scores: np.ndarray
+    """(C, k) float16 scores of those points."""
+    cluster_labels: np.ndarray
+    """(M,) index into `labels` of each cluster."""
+    cluster_centroids: np.ndarray
+    """(M, 3) cluster centroids."""
+    cluster_extents: np.ndarray
+    """(M, 3) cluster bounding box extents."""
+    cluster_values: np.ndarray
+    """(M,) mean score of the cluster members."""
+    cluster_best_points: np.ndarray
+    """(M,) index of the highest scoring member point of each cluster."""
+    cluster_targets: np.ndarray
+    """(M, T) indices of member points the visibility check raycasts."""
+    landmark_centroids: np.ndarray
+    """(C, 3) centroid of each label's landmark cluster, NaN if it has none."""
+    landmark_extents: np.ndarray
+    """(C, 3) bounding box extent of each label's landmark cluster."""
+
+    @staticmethod
+    def table_path(scene: str) -> str:
+        return os.path.join(Settings.VOCABULARY_TABLE_PATH, f"{scene}.npz")
+
+    @classmethod
+    def load_for_scene(cls, scene: str) -> Optional["VocabularyTable"]:
+        path = cls.table_path(scene)
+        if not os.path.exists(path):
+            return None
+        with np.load(path) as data:
+            missing = [a.name for a in fields(cls) if a.name not in data.files]
+            if missing:
+                logger.warning(
+                    f"Vocabulary table {path} lacks {', '.join(missing)}, "
+                    "rebuild it with vocabulary_builder."
+                )
+                return None
+            return cls(**{a.name: data[a.name] for a in fields(cls)})
+
+    def save(self, path: str) -> None:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        np.savez_compressed(
+            path,
+            labels=self.labels,
+            best_scales=self.best_scales,
+            top_indices=self.top_indices,
+            top_scores=self.top_scores,
+            cluster_labels=self.cluster_labels,
+            cluster_centroids=self.cluster_centroids,
+            cluster_extents=self.cluster_extents,
+            cluster_values=self.cluster_values,
+            cluster_best_points=self.cluster_best_points,
+            cluster_targets=self.cluster_targets,
+            landmark_centroids=self.landmark_centroids,
+            landmark_extents=self.landmark_extents,
+        )
+
+    def lookup(
+        self, phrase: str, relevancy_threshold: Optional[float] = None
+    ) -> Optional[int]:
+        """Return the index of the vocabulary entry the phrase maps to.
+
+        :param relevancy_threshold: entries whose best point does not score
+            above it are not returned, so the online pipeline decides them
+        """
+        for label in singular_candidates(normalize_label(phrase)):
+            matches = np.nonzero(self.labels == label)[0]
+            if matches.shape[0] > 0:
+                break
+        else:
+            return None
+        label_id = int(matches[0])
+        if (
+            relevancy_threshold is not None
+            and self.top_scores[label_id, 0] <= relevancy_threshold
+        ):
+            return None
+        return label_id
+
+    def clusters(self, label_id: int) -> np.ndarray:
+        return np.nonzero(self.cluster_labels == label_id)[0]
+
+    def target_result(self, label_id: int):
+        """Return the centroids, extents, mean scores, best member point and
+        visibility targets of every target cluster of a label, plus the
+        label's best scale."""
+        cluster_ids = self.clusters(label_id)
+        return (
+            [self.cluster_centroids[i] for i in cluster_ids],
+            [tuple(self.cluster_extents[i]) for i in cluster_ids],
+            list(self.cluster_values[cluster_ids]),
+            self.cluster_best_points[cluster_ids],
+            [self.cluster_targets[i] for i in cluster_ids],
+            float(self.best_scales[label_id]),
+        )
+
+    def landmark_result(self, label_id: int):
+        """Return the centroid and extent of a label's landmark cluster, or
+        None if the label has no cluster in this scene."""
+        if np.isnan(self.landmark_centroids[label_id]).any():
+            return None
+        return self.landmark_centroids[label_id], tuple(self.landmark_extents[label_id])
@@ -0,0 +1,251 @@
+import argparse
+from typing import Optional
+
+import numpy as np
+import torch
+from sklearn.cluster import DBSCAN
+
+from chat_with_nerf import logger
+from chat_with_nerf.settings import Settings
+from chat_with_nerf.visual_grounder.grounding_cache import LANDMARK, TARGET
+from chat_with_nerf.visual_grounder.vocabulary import (
+    VocabularyTable,
+    load_vocabulary,
+    normalize_label,
+)
+
+# the point selection of the online pipelines: top fractions of the LERF
+# relevancy and percentiles of the OpenScene similarity
+LERF_TARGET_FRACTION = 0.005
+LERF_LANDMARK_FRACTION = 0.01
+OPENSCENE_TARGET_PERCENTILE = 90
+OPENSCENE_LANDMARK_PERCENTILE = 95
+OPENSCENE_MIN_SAMPLES = 15
+
+
+def sample_members(member_indices: np.ndarray, count: int) -> np.ndarray:
+    """An evenly strided subset of `count` member indices, repeated to fill
+    `count` entries for small clusters."""
+    stride = max(1, int(np.ceil(member_indices.shape[0] / count)))
+    return np.resize(member_indices[::stride], count)
+
+
+def summarize_clusters(
+    positions: np.ndarray, values: np.ndarray, indices: np.ndarray, min_samples: int
+):
+    """Cluster the selected points with the DBSCAN parameters of the online
+    pipelines and summarize every cluster."""
+    labels = DBSCAN(eps=0.05, min_samples=min_samples).fit(positions).labels_
+    summaries = []
+    for cluster_id in set(labels):
+        if cluster_id == -1:  # Noise
+            continue
+        in_cluster = labels == cluster_id
+        members = positions[in_cluster]
+        member_values = values[in_cluster]
+        summaries.append(
+            (
+                members.mean(axis=0),
+                members.max(axis=0) - members.min(axis=0),
+                member_values.mean(),
+                indices[in_cluster][np.argmax(member_values)],
+                sample_members(
+                    indices[in_cluster], Settings.VISIBILITY_MAX_TARGETS - 1
+                ),
+            )
+        )
+    return summaries
+
+
+def best_cluster(summaries: list) -> tuple[np.ndarray, np.ndarray]:
+    """The centroid and extent of the highest scoring cluster, as the online
+    landmark finders pick it, NaN if there is no cluster."""
+    if not summaries:
+        return np.full(3, np.nan), np.full(3, np.nan)
+    best = max(summaries, key=lambda summary: summary[2])
+    return best[0], best[1]
+
+
+def score_lerf(picture_taker, labels: list[str]) -> tuple[torch.Tensor, np.ndarray]:
+    """Relevancy of every label for every point against the picture taker's
+    negatives, at the best scale of each label.
+
+    :return: a (N, C) tensor of probabilities and the (C,) best scales
+    """
+    with torch.no_grad():
+        tok_phrases = torch.cat(
+            [picture_taker.tokenizer(label) for label in labels]
+        ).to("cuda")
+        pos_embeds = picture_taker.clip_model.encode_text(tok_phrases)
+    pos_embeds /= pos_embeds.norm(dim=-1, keepdim=True)
+    neg_embeds = picture_taker.neg_embeds
+    scales_list = torch.linspace(0.0, 1.5, 30)
+
+    best_probs: Optional[torch.Tensor] = None
+    best_scales = np.zeros(len(labels), dtype=np.float32)
+    for index, scale in enumerate(scales_list):
+        embed = torch.from_numpy(
+            picture_taker.h5_dict["clip_embeddings_per_scale"][index]
+        ).to("cuda")
+        with torch.no_grad():
+            pos_vals = embed @ pos_embeds.to(embed.dtype).T  # rays x labels
+            neg_vals = embed @ neg_embeds.to(embed.dtype).T  # rays x negatives
+            # the pairwise softmax of get_relevancy, taken at the worst negative
+            probs = torch.sigmoid(
+                10 * (pos_vals[:, :, None] - neg_vals[:, None, :]).float()
+            ).amin(dim=-1)
+        if best_probs is None:
+            best_probs = probs
+            best_scales[:] = scale.item()
+            continue
+        improved = probs.max(dim=0).values > best_probs.max(dim=0).values
+        best_probs[:, improved] = probs[:, improved]
+        best_scales[improved.cpu().numpy()] = scale.item()
+
+    assert best_probs is not None
+    return best_probs, best_scales
+
+
+def score_openscene(picture_taker, labels: list[str]) -> torch.Tensor:
+    """Cosine similarity of every label with every OpenScene vertex feature.
+
+    :return: a (N, C) tensor of similarities
+    """
+    # imported here since only OpenScene scenes need the original CLIP package
+    import clip
+
+    text = clip.tokenize(labels).to(picture_taker.device)
+    with torch.no_grad():
+        text_features = picture_taker.clip_model.encode_text(text).float()
+    text_features /= text_features.norm(dim=-1, keepdim=True)
+    embedding = torch.from_numpy(picture_taker.openscene_embedding).to(
+        picture_taker.device
+    )
+    embedding /= embedding.norm(dim=-1, keepdim=True)
+    return embedding @ text_features.T
+
+
+def select_points(picture_taker, scores: np.ndarray, role: str):
+    """Select the points to cluster like the online target or landmark
+    pipeline of the scene does.
+
+    :return: the selected point indices and the DBSCAN min_samples to use
+    """
+    if picture_taker.openscene_embedding is not None:
+        percentile = (
+            OPENSCENE_TARGET_PERCENTILE
+            if role == TARGET
+            else OPENSCENE_LANDMARK_PERCENTILE
+        )
+        selected = np.nonzero(scores > np.percentile(scores, percentile))[0]
+        return selected, OPENSCENE_MIN_SAMPLES
+    if role == TARGET:
+        return picture_taker.select_points_for_clustering(
+            scores, LERF_TARGET_FRACTION, picture_taker.h5_dict["points"]
+        )
+    return picture_taker.select_points_for_clustering(
+        scores,
+        LERF_LANDMARK_FRACTION,
+        picture_taker.h5_dict["points_scannet" if Settings.IS_SCANNET else "points"],
+    )
+
+
+def cluster_positions(picture_taker, role: str) -> np.ndarray:
+    """The point positions the online target or landmark pipeline clusters."""
+    if picture_taker.openscene_embedding is not None:
+        return np.asarray(picture_taker.mesh.vertices)
+    if role == LANDMARK and Settings.IS_SCANNET:
+        return picture_taker.axis_aligned_points_scannet()
+    return picture_taker.h5_dict["points"]
+
+
+def build_vocabulary_table(
+    picture_taker, labels: list[str], top_k: int = Settings.VOCABULARY_TOP_K
+) -> VocabularyTable:
+    """Score a vocabulary against the features of one scene. Targets and
+    landmarks are clustered separately, each with the point selection of the
+    online pipeline they replace."""
+    if picture_taker.openscene_embedding is not None:
+        scores = score_openscene(picture_taker, labels)
+        best_scales = np.zeros(len(labels), dtype=np.float32)
+    else:
+        scores, best_scales = score_lerf(picture_taker, labels)
+    target_positions = cluster_positions(picture_taker, TARGET)
+    landmark_positions = cluster_positions(picture_taker, LANDMARK)
+
+    top_k = min(top_k, scores.shape[0])
+    top_indices = np.zeros((len(labels), top_k), dtype=np.int32)
+    top_scores = np.zeros((len(labels), top_k), dtype=np.float16)
+    landmark_centroids = np.zeros((len(labels), 3), dtype=np.float32)
+    landmark_extents = np.zeros((len(labels), 3), dtype=np.float32)
+    clusters = []
+    for label_id, label in enumerate(labels):
+        values, indices = torch.topk(scores[:, label_id], top_k)
+        top_indices[label_id] = indices.cpu().numpy()
+        top_scores[label_id] = values.cpu().numpy()
+        label_scores = scores[:, label_id].cpu().numpy()
+
+        indices, min_samples = select_points(picture_taker, label_scores, TARGET)
+        summaries = summarize_clusters(
+            target_positions[indices], label_scores[indices], indices, min_samples
+        )
+        clusters.extend((label_id, *summary) for summary in summaries)
+
+        indices, min_samples = select_points(picture_taker, label_scores, LANDMARK)
+        landmark_centroids[label_id], landmark_extents[label_id] = best_cluster(
+            summarize_clusters(
+                landmark_positions[indices],
+                label_scores[indices],
+                indices,
+                min_samples,
+            )
+        )
+        logger.info(f"Vocabulary label '{label}': {len(summaries)} clusters.")
+
+    return VocabularyTable(
+        labels=np.array([normalize_label(label) for label in labels]),
+        best_scales=best_scales,
+        top_indices=top_indices,
+        top_scores=top_scores,
+        cluster_labels=np.array([c[0] for c in clusters], dtype=np.int32),
+        cluster_centroids=np.array([c[1] for c in clusters], dtype=np.float32).reshape(
+            -1, 3
+        ),
+        cluster_extents=np.array([c[2] for c in clusters], dtype=np.float32).reshape(
+            -1, 3
+        ),
+        cluster_values=np.array([c[3] for c in clusters], dtype=np.float32),
+        cluster_best_points=np.array([c[4] for c in clusters], dtype=np.int64),
+        cluster_targets=np.array([c[5] for c in clusters], dtype=np.int64).reshape(
+            -1, Settings.VISIBILITY_MAX_TARGETS - 1
+        ),
+        landmark_centroids=landmark_centroids,
+        landmark_extents=landmark_extents,
+    )
+
+
+def build_vocabulary_tables(
+    picture_takers: dict, labels: list[str], top_k: int = Settings.VOCABULARY_TOP_K
+) -> None:
+    """Offline job: build and store the vocabulary table of every scene."""
+    for scene_name, picture_taker in picture_takers.items():
+        logger.info(f"Building vocabulary table for {scene_name}...")
+        table = build_vocabulary_table(picture_taker, labels, top_k)
+        table.save(VocabularyTable.table_path(scene_name))
+        picture_taker.vocabulary_table = table
+        torch.cuda.empty_cache()  # free up GPU memory
+
+
+if __name__ == "__main__":
+    # imported here to keep the model loading out of the online import path
+    from chat_with_nerf.model.model_context import ModelContextManager
+
+    parser = argparse.ArgumentParser(description="Build vocabulary relevancy tables.")
+    parser.add_argument("--vocabulary", default=Settings.VOCABULARY_PATH)
+    parser.add_argument("--top-k", type=int, default=Settings.VOCABULARY_TOP_K)
+    args = parser.parse_args()
+
+    model_context = ModelContextManager.get_model_context_with_gpt()
+    build_vocabulary_tables(
+        model_context.picture_takers, load_vocabulary(args.vocabulary), args.top_k
+    )
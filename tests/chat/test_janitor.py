@@ -0,0 +1,89 @@
+import os
+import time
+import uuid
+
+from chat_with_nerf.chat.janitor import (
+    Artifact,
+    LiveSessionRegistry,
+    OutputJanitor,
+    scan_artifacts,
+    select_removals,
+)
+from chat_with_nerf.chat.session import Session
+
+NOW = 1_000_000.0
+
+
+def write(path, size, mtime):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(b"\0" * size)
+    os.utime(path, (mtime, mtime))
+    return str(path)
+
+
+def test_select_removals_applies_ttl_then_quotas_oldest_first():
+    artifacts = [
+        Artifact("expired", 10, NOW - 100, "a"),
+        Artifact("a1", 10, NOW - 50, "a"),
+        Artifact("a2", 10, NOW - 40, "a"),
+        Artifact("a3", 10, NOW - 30, "a"),
+        Artifact("shared", 10, NOW - 45, None),
+        Artifact("b1", 10, NOW - 20, "b"),
+    ]
+
+    removals = select_removals(
+        artifacts, set(), NOW, ttl=60, session_quota=20, total_quota=30
+    )
+
+    assert [artifact.path for artifact in removals] == ["expired", "a1", "shared"]
+
+
+def test_select_removals_never_selects_protected_paths():
+    artifacts = [
+        Artifact("old", 10, NOW - 100, "a"),
+        Artifact("new", 10, NOW - 10, "a"),
+    ]
+
+    removals = select_removals(
+        artifacts, {"old"}, NOW, ttl=60, session_quota=0, total_quota=0
+    )
+
+    assert [artifact.path for artifact in removals] == ["new"]
+
+
+def test_janitor_keeps_live_references_and_persistent_files(tmp_path):
+    live = Session.create_for_scene("scene")
+    idle_id = str(uuid.uuid4())
+    live_image = write(tmp_path / live.session_id / "images" / "rgb" / "0.png", 10, 0)
+    idle_image = write(tmp_path / idle_id / "images" / "rgb" / "0.png", 10, 0)
+    session_log = write(tmp_path / "scene" / f"{idle_id}.json", 10, 0)
+    result_mesh = write(tmp_path / "mesh_vis" / "results" / "abc.glb", 10, 0)
+    display_bin = write(tmp_path / "mesh_vis" / "scene_display.bin", 10, 0)
+    grounding_cache = write(tmp_path / "grounding_cache" / "scene.pkl", 10, 0)
+    live.chat_history_for_display.append((None, f" ![caption](file={live_image}) "))
+    registry = LiveSessionRegistry(idle_timeout=float("inf"))
+    registry.touch(live)
+
+    assert {artifact.path for artifact in scan_artifacts(str(tmp_path))} == {
+        live_image,
+        idle_image,
+        result_mesh,
+    }
+
+    janitor = OutputJanitor(str(tmp_path), ttl=60, registry=registry)
+    assert janitor.run_once(now=NOW) == 20
+
+    assert os.path.exists(live_image) and os.path.exists(session_log)
+    assert os.path.exists(display_bin) and os.path.exists(grounding_cache)
+    assert not os.path.exists(idle_image) and not os.path.exists(result_mesh)
+    assert not os.path.exists(tmp_path / idle_id)
+
+
+def test_registry_forgets_idle_sessions():
+    registry = LiveSessionRegistry(idle_timeout=10)
+    session = Session.create_for_scene("scene")
+    registry.touch(session)
+
+    assert registry.live_sessions() == [session]
+    assert registry.live_sessions(now=time.time() + 60) == []
@@ -0,0 +1,65 @@
+import os
+
+import numpy as np
+import pytest
+
+from chat_with_nerf.util import (
+    atomic_write_path,
+    look_at_camera_to_world,
+    orbit_camera_to_world,
+)
+from chat_with_nerf.visual_grounder.camera_pose import CameraPose
+
+
+def test_look_at_camera_to_world_is_a_rigid_transform():
+    c2w = look_at_camera_to_world(np.array([1.0, 2.0, 3.0]), np.zeros(3))
+
+    rotation = c2w[:3, :3]
+    assert np.allclose(rotation.T @ rotation, np.eye(3), atol=1e-5)
+    assert np.allclose(c2w[:3, 3], [1, 2, 3])
+    # cameras look down their -z axis
+    assert np.allclose(-c2w[:3, 2], -np.array([1, 2, 3]) / np.sqrt(14))
+    assert np.allclose(c2w[3], [0, 0, 0, 1])
+
+
+def test_orbit_camera_to_world_surrounds_each_center():
+    centers = np.array([[0.0, 0, 0], [5.0, 1, -2]])
+    radii = np.array([1.0, 2.0])
+
+    c2ws = orbit_camera_to_world(centers, radii, num_views=6, elevation_degrees=30)
+
+    assert c2ws.shape == (2, 6, 4, 4)
+    positions = c2ws[..., :3, 3]
+    offsets = positions - centers[:, None, :]
+    assert np.allclose(np.linalg.norm(offsets, axis=-1), radii[:, None])
+    assert np.allclose(offsets[..., 1], radii[:, None] * np.sin(np.radians(30)))
+    forward = -c2ws[..., :3, 2]
+    assert np.allclose(forward, -offsets / radii[:, None, None])
+    assert np.allclose(offsets[:, :, [0, 2]].sum(axis=1), 0, atol=1e-9)
+
+
+def test_construct_camera_path_holds_every_camera():
+    c2ws = orbit_camera_to_world(np.zeros((1, 3)), 1.0, num_views=3)
+
+    camera_path = CameraPose().construct_camera_path(c2ws)
+
+    assert len(camera_path["camera_path"]) == 3
+    assert camera_path["camera_path"][1]["camera_to_world"] == list(
+        c2ws[0, 1].flatten()
+    )
+    assert camera_path["render_height"] == 512
+
+
+def test_atomic_write_path_is_unique_and_cleans_up(tmp_path):
+    path = str(tmp_path / "mesh.glb")
+
+    with atomic_write_path(path) as first, atomic_write_path(path) as second:
+        assert first != second
+        open(first, "w").close()
+        open(second, "w").close()
+    with pytest.raises(RuntimeError):
+        with atomic_write_path(path) as failed:
+            open(failed, "w").close()
+            raise RuntimeError
+
+    assert os.listdir(tmp_path) == ["mesh.glb"]
@@ -0,0 +1,29 @@
+import numpy as np
+
+from chat_with_nerf.visual_grounder.camera_pose import CameraPose, rescale_camera_pose
+
+
+def test_rescale_camera_pose_keeps_view():
+    camera_pose = CameraPose().construct_camera_pose(np.eye(4))
+
+    preview = rescale_camera_pose(camera_pose, 0.25)
+
+    assert (preview["render_height"], preview["render_width"]) == (128, 128)
+    assert preview["camera_path"] == camera_pose["camera_path"]
+    assert camera_pose["render_height"] == 512
+
+
+def test_construct_camera_pose_with_crop():
+    camera_pose = CameraPose().construct_camera_pose(
+        np.eye(4),
+        crop_center=np.array([1.0, 2.0, 3.0]),
+        crop_scale=np.array([0.5, 0.5, 1.0]),
+        crop_bg_color=(255, 255, 255),
+    )
+
+    assert camera_pose["crop"] == {
+        "crop_bg_color": {"r": 255, "g": 255, "b": 255},
+        "crop_center": [1.0, 2.0, 3.0],
+        "crop_scale": [0.5, 0.5, 1.0],
+    }
+    assert CameraPose().construct_camera_pose(np.eye(4))["crop"] is None
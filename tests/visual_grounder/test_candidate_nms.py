@@ -0,0 +1,42 @@
+import numpy as np
+
+from chat_with_nerf.visual_grounder.candidate_nms import box_iou_3d, suppress_candidates
+
+
+def test_box_iou_3d():
+    centroids = np.array([[0.0, 0, 0], [0.5, 0, 0], [5.0, 0, 0]])
+    extents = np.ones((3, 3))
+
+    ious = box_iou_3d(centroids, extents)
+
+    assert np.allclose(np.diag(ious), 1.0)
+    assert np.isclose(ious[0, 1], 0.5 / 1.5)
+    assert ious[0, 2] == 0.0
+
+
+def test_suppress_candidates_keeps_best_of_overlapping_boxes():
+    centroids = [np.array([0.0, 0, 0]), np.array([0.1, 0, 0]), np.array([3.0, 0, 0])]
+    extents = [(1.0, 1.0, 1.0)] * 3
+    scores = [0.6, 0.9, 0.7]
+
+    keep, kept_centroids, kept_extents = suppress_candidates(
+        centroids, extents, scores, iou_threshold=0.5
+    )
+
+    assert keep == [1, 2]
+    assert kept_centroids[0] is centroids[1]
+    assert kept_extents == [(1.0, 1.0, 1.0)] * 2
+
+
+def test_suppress_candidates_score_threshold_and_merge():
+    centroids = [np.array([0.0, 0, 0]), np.array([0.2, 0, 0]), np.array([3.0, 0, 0])]
+    extents = [(1.0, 1.0, 1.0)] * 3
+    scores = [0.9, 0.8, 0.1]
+
+    keep, kept_centroids, kept_extents = suppress_candidates(
+        centroids, extents, scores, iou_threshold=0.5, score_threshold=0.5, merge=True
+    )
+
+    assert keep == [0]
+    assert np.allclose(kept_centroids[0], [0.1, 0, 0])
+    assert np.allclose(kept_extents[0], [1.2, 1.0, 1.0])
@@ -0,0 +1,34 @@
+import pytest
+
+pytest.importorskip("nerfstudio")
+
+from chat_with_nerf.visual_grounder.chunk_tuning import best_chunk_size  # noqa: E402
+
+
+def test_best_chunk_size_respects_memory_limit():
+    results = [
+        {
+            "eval_num_rays_per_chunk": 4096,
+            "rays_per_second": 1e5,
+            "peak_memory_bytes": 1,
+        },
+        {
+            "eval_num_rays_per_chunk": 8192,
+            "rays_per_second": 3e5,
+            "peak_memory_bytes": 2,
+        },
+        {
+            "eval_num_rays_per_chunk": 16384,
+            "rays_per_second": 4e5,
+            "peak_memory_bytes": 9,
+        },
+        {
+            "eval_num_rays_per_chunk": 32768,
+            "rays_per_second": None,
+            "peak_memory_bytes": 9,
+        },
+    ]
+
+    assert best_chunk_size(results, memory_limit_bytes=8) == 8192
+    assert best_chunk_size(results, memory_limit_bytes=10) == 16384
+    assert best_chunk_size(results, memory_limit_bytes=0) is None
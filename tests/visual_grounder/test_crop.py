@@ -0,0 +1,55 @@
+import pytest
+
+torch = pytest.importorskip("torch")
+pytest.importorskip("torchtyping")
+
+from chat_with_nerf.visual_grounder.crop import crop_ray_bounds  # noqa: E402
+
+BOX_MIN = torch.tensor([-1.0, -1.0, -1.0])
+BOX_MAX = torch.tensor([1.0, 1.0, 1.0])
+
+
+def test_crop_ray_bounds_hit_spans_the_box():
+    origins = torch.tensor([[-5.0, 0.0, 0.0], [0.0, -5.0, 0.5]])
+    directions = torch.tensor([[1.0, 0.0, 0.0], [0.0, 1.0, 0.0]])
+
+    nears, fars = crop_ray_bounds(origins, directions, BOX_MIN, BOX_MAX)
+
+    assert nears.shape == fars.shape == (2, 1)
+    assert torch.allclose(nears[:, 0], torch.tensor([4.0, 4.0]))
+    assert torch.allclose(fars[:, 0], torch.tensor([6.0, 6.0]))
+
+
+def test_crop_ray_bounds_miss_is_empty():
+    origins = torch.tensor([[-5.0, 3.0, 0.0], [5.0, 0.0, 0.0]])
+    # parallel to the box outside of it, and pointing away from it
+    directions = torch.tensor([[1.0, 0.0, 0.0], [1.0, 0.0, 0.0]])
+
+    nears, fars = crop_ray_bounds(origins, directions, BOX_MIN, BOX_MAX)
+
+    assert torch.equal(nears, fars)
+
+
+def test_crop_ray_bounds_camera_inside_starts_at_near_plane():
+    origins = torch.tensor([[0.0, 0.0, 0.0]])
+    directions = torch.tensor([[0.0, 0.0, 1.0]])
+
+    nears, fars = crop_ray_bounds(
+        origins, directions, BOX_MIN, BOX_MAX, near_plane=0.05
+    )
+
+    assert torch.allclose(nears, torch.tensor([[0.05]]))
+    assert torch.allclose(fars, torch.tensor([[1.0]]))
+
+
+def test_crop_ray_bounds_broadcasts_one_box_per_camera():
+    origins = torch.full((2, 3, 3), -5.0)
+    directions = torch.ones(2, 3, 3) / 3**0.5
+    # the diagonal rays pass the first box and miss the second one
+    box_min = torch.tensor([[[-1.0, -1.0, -1.0]], [[10.0, -1.0, -1.0]]])
+
+    nears, fars = crop_ray_bounds(origins, directions, box_min, box_min + 2)
+
+    assert nears.shape == (2, 3, 1)
+    assert (fars[0] > nears[0]).all()
+    assert torch.equal(nears[1], fars[1])
@@ -0,0 +1,153 @@
+import json
+import os
+import shutil
+import struct
+
+import numpy as np
+import pytest
+
+from chat_with_nerf.settings import Settings
+from chat_with_nerf.visual_grounder.display_mesh import (
+    DISPLAY_AXIS_SWAP,
+    DisplayAsset,
+    MeshArrays,
+    cached_result_mesh,
+    display_transform,
+    export_result_mesh,
+    transform_points,
+    write_overlay_glb,
+)
+
+
+def triangle(offset=0.0, color=(1.0, 0.0, 0.0)):
+    vertices = np.array([[0, 0, 0], [1, 0, 0], [0, 1, 0]], dtype=np.float32) + offset
+    return MeshArrays(
+        vertices,
+        np.array([[0, 1, 2]], dtype=np.uint32),
+        np.tile(np.asarray(color, dtype=np.float32), (3, 1)),
+    )
+
+
+def read_glb(path):
+    with open(path, "rb") as f:
+        data = f.read()
+    magic, version, length = struct.unpack_from("<4sII", data, 0)
+    assert (magic, version, length) == (b"glTF", 2, len(data))
+    chunks, offset = {}, 12
+    while offset < len(data):
+        chunk_length, chunk_type = struct.unpack_from("<I4s", data, offset)
+        chunks[chunk_type] = data[offset + 8 : offset + 8 + chunk_length]
+        offset += 8 + chunk_length
+    return json.loads(chunks[b"JSON"]), chunks.get(b"BIN\0")
+
+
+def test_display_transform_matches_swap_and_scale_about_center():
+    vertices = np.array([[0.0, 0, 0], [2.0, 4.0, 6.0]])
+
+    transform = display_transform(vertices, scale=10.0)
+
+    swapped = vertices @ DISPLAY_AXIS_SWAP[:3, :3].T
+    center = swapped.mean(axis=0)
+    expected = center + 10.0 * (swapped - center)
+    assert np.allclose(transform_points(vertices, transform), expected)
+
+
+def test_concatenate_offsets_triangle_indices():
+    mesh = MeshArrays.concatenate([triangle(), triangle(offset=2.0)])
+
+    assert mesh.vertices.shape == (6, 3)
+    assert mesh.triangles.tolist() == [[0, 1, 2], [3, 4, 5]]
+
+
+def test_write_overlay_glb_embeds_base_buffer(tmp_path):
+    base = DisplayAsset.write(
+        str(tmp_path / "scene_display.bin"),
+        MeshArrays.concatenate([triangle(), triangle(offset=2.0)]),
+        np.eye(4),
+    )
+    glb_path = str(tmp_path / "results" / "session.glb")
+    os.makedirs(os.path.dirname(glb_path))
+
+    write_overlay_glb(glb_path, triangle(color=(0.0, 1.0, 0.0)), base)
+
+    gltf, binary = read_glb(glb_path)
+    overlay_bytes = 3 * 4 + 2 * 9 * 4
+    assert gltf["buffers"] == [{"byteLength": len(binary)}]
+    assert len(binary) == overlay_bytes + os.path.getsize(base.bin_path)
+    with open(base.bin_path, "rb") as f:
+        assert binary[overlay_bytes:] == f.read()
+    assert len(gltf["meshes"]) == len(gltf["scenes"][0]["nodes"]) == 2
+    positions = gltf["accessors"][
+        gltf["meshes"][1]["primitives"][0]["attributes"]["POSITION"]
+    ]
+    assert positions["count"] == 6
+    assert positions["max"] == [3.0, 3.0, 2.0]
+    assert gltf["bufferViews"][3]["byteOffset"] == overlay_bytes
+
+
+def test_write_overlay_glb_loads_from_another_directory(tmp_path):
+    trimesh = pytest.importorskip("trimesh")
+    base = DisplayAsset.write(
+        str(tmp_path / "mesh_vis" / "scene_display.bin"),
+        MeshArrays.concatenate([triangle(), triangle(offset=2.0)]),
+        np.eye(4),
+    )
+    glb_path = write_overlay_glb(str(tmp_path / "session.glb"), triangle(), base)
+    # gradio serves a copy of the result from its own cache directory
+    copied = tmp_path / "gradio_cache" / "session.glb"
+    os.makedirs(copied.parent)
+    shutil.copy(glb_path, copied)
+
+    loaded = trimesh.load(str(copied), force="mesh")
+
+    assert len(loaded.vertices) == 9
+    assert len(loaded.faces) == 3
+
+
+def test_write_overlay_glb_without_overlay_holds_only_base(tmp_path):
+    base = DisplayAsset.write(str(tmp_path / "scene.bin"), triangle(), np.eye(4))
+    empty = MeshArrays(
+        np.zeros((0, 3), np.float32),
+        np.zeros((0, 3), np.uint32),
+        np.zeros((0, 3), np.float32),
+    )
+
+    gltf, binary = read_glb(write_overlay_glb(str(tmp_path / "s.glb"), empty, base))
+
+    assert len(binary) == os.path.getsize(base.bin_path)
+    assert gltf["buffers"] == [{"byteLength": len(binary)}]
+    assert gltf["meshes"][0]["primitives"][0]["indices"] == 0
+
+
+def test_export_result_mesh_obj_combines_base_and_overlay(tmp_path):
+    transform = np.eye(4)
+    transform[:3, 3] = [1.0, 0, 0]
+    base = DisplayAsset.write(str(tmp_path / "scene.bin"), triangle(), transform)
+
+    path = export_result_mesh(str(tmp_path / "s.obj"), base, triangle(offset=2.0))
+
+    with open(path) as f:
+        lines = f.read().splitlines()
+    vertices = np.array([line.split()[1:] for line in lines if line[0] == "v"], float)
+    assert vertices.shape == (6, 6)
+    assert np.allclose(vertices[3, :3], [3.0, 2.0, 2.0])
+    assert [line for line in lines if line[0] == "f"] == ["f 1 2 3", "f 4 5 6"]
+
+
+def test_cached_result_mesh_shares_identical_results(tmp_path, monkeypatch):
+    monkeypatch.setattr(Settings, "output_path", str(tmp_path))
+    monkeypatch.setattr(Settings, "MESH_EXPORT_MODE", "copy_base")
+    base = DisplayAsset.write(
+        str(tmp_path / "mesh_vis" / "scene_display.bin"), triangle(), np.eye(4)
+    )
+
+    first = cached_result_mesh(base, triangle(offset=1.0))
+    second = cached_result_mesh(base, triangle(offset=1.0))
+    other = cached_result_mesh(base, triangle(offset=2.0))
+
+    assert first == second != other
+    assert sorted(os.listdir(tmp_path / "mesh_vis" / "results")) == sorted(
+        [os.path.basename(first), os.path.basename(other)]
+    )
+    gltf, _ = read_glb(first)
+    assert all("uri" not in buffer for buffer in gltf["buffers"])
@@ -0,0 +1,95 @@
+import json
+import threading
+
+from chat_with_nerf.settings import Settings
+from chat_with_nerf.visual_grounder.grounding_cache import (
+    LANDMARK,
+    TARGET,
+    GroundingCache,
+    LiveTrafficMonitor,
+    read_query_log,
+    settings_fingerprint,
+)
+
+
+def write_session(path, scene, session_id, target, landmarks):
+    scene_dir = path / scene
+    scene_dir.mkdir(exist_ok=True)
+    with open(scene_dir / f"{session_id}.json", "w", encoding="utf-8") as file:
+        json.dump(
+            {
+                "working_scene_name": scene,
+                "grounding_query": target,
+                "landmark_queries": landmarks,
+            },
+            file,
+        )
+
+
+def test_read_query_log_counts_phrases_per_scene(tmp_path):
+    write_session(tmp_path, "home_1", "a", "The Chair", ["table"])
+    write_session(tmp_path, "home_1", "b", "the  chair", [])
+    write_session(tmp_path, "office", "c", "lamp", None)
+
+    counters = read_query_log(str(tmp_path))
+
+    assert counters["home_1"][(TARGET, "the chair")] == 2
+    assert counters["home_1"][(LANDMARK, "table")] == 1
+    assert counters["office"][(TARGET, "lamp")] == 1
+
+
+def test_grounding_cache_is_lru_and_persists(tmp_path):
+    cache = GroundingCache(cache_path=str(tmp_path / "scene.pkl"), max_entries=2)
+    cache.put(TARGET, "chair", ([1.0], [2.0], None))
+    cache.put(TARGET, "table", ([3.0], [4.0], None))
+    assert cache.get(TARGET, " Chair ") == ([1.0], [2.0], None)
+    cache.put(LANDMARK, "lamp", ([5.0], [6.0]))
+
+    assert (TARGET, "table") not in cache
+    assert cache.hits == 1
+
+    cache.save()
+    reloaded = GroundingCache(cache_path=str(tmp_path / "scene.pkl"))
+    reloaded.load()
+    assert reloaded.get(LANDMARK, "lamp") == ([5.0], [6.0])
+    assert reloaded.get(TARGET, "table") is None
+
+
+def test_grounding_cache_ignores_results_of_other_settings(tmp_path, monkeypatch):
+    path = str(tmp_path / "scene.pkl")
+    cache = GroundingCache(cache_path=path)
+    cache.put(TARGET, "chair", ([1.0], [2.0], None))
+    cache.save()
+
+    monkeypatch.setattr(Settings, "NMS_IOU_THRESHOLD", 0.3)
+    changed = GroundingCache(cache_path=path)
+    changed.load()
+    overridden = GroundingCache(cache_path=path, fingerprint=settings_fingerprint(10))
+    overridden.load()
+    monkeypatch.undo()
+    unchanged = GroundingCache(cache_path=path)
+    unchanged.load()
+
+    assert (TARGET, "chair") not in changed
+    assert (TARGET, "chair") not in overridden
+    assert (TARGET, "chair") in unchanged
+
+
+def test_checkpoint_pauses_only_background_work():
+    monitor = LiveTrafficMonitor()
+    resumed = threading.Event()
+
+    def background():
+        with monitor.background_work(idle_seconds=0):
+            monitor.checkpoint()
+        resumed.set()
+
+    with monitor.live_request():
+        # request threads pass their own checkpoints
+        monitor.checkpoint()
+        thread = threading.Thread(target=background)
+        thread.start()
+        assert not resumed.wait(0.1)
+    thread.join(timeout=5)
+
+    assert resumed.is_set()
@@ -0,0 +1,63 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+torch = pytest.importorskip("torch")
+
+from chat_with_nerf.visual_grounder.captioner import BaseCaptioner  # noqa: E402
+from chat_with_nerf.visual_grounder.image_batch import preprocess_batch  # noqa: E402
+from chat_with_nerf.visual_grounder.image_ref import ImageRef  # noqa: E402
+
+
+def test_preprocess_batch_uses_in_memory_pixels():
+    image_refs = [
+        ImageRef("not_written.png", np.full((2, 2, 3), value, dtype=np.uint8))
+        for value in (0, 255)
+    ]
+    seen = []
+
+    def preprocess(image):
+        seen.append(image.size)
+        return torch.from_numpy(np.asarray(image)).permute(2, 0, 1).float()
+
+    batch = preprocess_batch(image_refs, preprocess, "cpu")
+
+    assert seen == [(2, 2), (2, 2)]
+    assert batch.shape == (2, 3, 2, 2)
+    assert batch[0].max() == 0 and batch[1].min() == 255
+
+
+def test_preprocess_batch_without_preprocess_stacks_float_pixels():
+    image_refs = [ImageRef("unused.png", np.full((2, 2, 3), 255, dtype=np.uint8))]
+
+    batch = preprocess_batch(image_refs, None, "cpu")
+
+    assert batch.shape == (1, 2, 2, 3)
+    assert torch.allclose(batch, torch.ones_like(batch))
+
+
+def test_captioner_captions_all_candidates_in_one_batch():
+    batches = []
+
+    class CountingCaptioner(BaseCaptioner):
+        def caption_batch(self, positive_words, images):
+            batches.append(images.shape[0])
+            return [f"{positive_words} {i}" for i in range(images.shape[0])]
+
+    captioner = CountingCaptioner(
+        SimpleNamespace(device="cpu"),
+        {"eval": lambda image: torch.from_numpy(np.asarray(image)).float()},
+    )
+    image_refs = [
+        ImageRef(f"rgb{i}.png", np.zeros((2, 2, 3), dtype=np.uint8)) for i in range(3)
+    ]
+
+    captions = captioner.caption("chair", image_refs)
+
+    assert batches == [3]
+    assert captions == {
+        "rgb0.png": "chair 0",
+        "rgb1.png": "chair 1",
+        "rgb2.png": "chair 2",
+    }
@@ -0,0 +1,26 @@
+import numpy as np
+from PIL import Image
+
+from chat_with_nerf.visual_grounder.image_ref import ImageRef
+
+
+def test_image_ref_stores_uint8_pixels_once():
+    image = np.full((4, 4, 3), 0.5, dtype=np.float32)
+
+    image_ref = ImageRef("unused.png", image)
+
+    assert image_ref.image_pixels.dtype == np.uint8
+    assert image_ref.pixels is image_ref.image_pixels
+    assert np.all(image_ref.pixels == 128)
+    assert np.allclose(image_ref.raw_image, 128 / 255)
+
+
+def test_image_ref_decodes_path_lazily(tmp_path):
+    path = str(tmp_path / "rgb.png")
+    Image.fromarray(np.full((2, 3, 3), 7, dtype=np.uint8)).save(path)
+
+    image_ref = ImageRef(path)
+
+    assert image_ref.image_pixels is None
+    assert image_ref.pixels.shape == (2, 3, 3)
+    assert np.all(image_ref.image_pixels == 7)
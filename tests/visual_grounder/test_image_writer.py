@@ -0,0 +1,32 @@
+import numpy as np
+from PIL import Image
+
+from chat_with_nerf.visual_grounder.image_writer import AsyncImageWriter, to_uint8
+
+
+def test_to_uint8_rounds_and_clips():
+    image = np.array([[[-0.5, 0.0, 0.5], [1.0, 1.5, 0.999]]], dtype=np.float32)
+
+    pixels = to_uint8(image)
+
+    assert pixels.tolist() == [[[0, 0, 128], [255, 255, 255]]]
+    assert to_uint8(pixels) is pixels
+
+
+def test_async_writer_writes_complete_files(tmp_path):
+    writer = AsyncImageWriter(max_workers=2, max_pending=2, compress_level=1)
+    image = np.random.default_rng(0).random((8, 8, 3))
+    paths = [
+        str(tmp_path / f"rgb{i}.{ext}") for i, ext in enumerate(["png", "webp"] * 3)
+    ]
+
+    futures = [writer.submit(path, image) for path in paths]
+    writer.shutdown()
+
+    assert [future.result() for future in futures] == paths
+    assert sorted(p.name for p in tmp_path.iterdir()) == sorted(
+        path.rsplit("/", 1)[1] for path in paths
+    )
+    for path in paths:
+        with Image.open(path) as written:
+            assert np.array_equal(np.asarray(written), to_uint8(image))
@@ -0,0 +1,52 @@
+import os
+from types import SimpleNamespace
+
+import numpy as np
+
+from chat_with_nerf.visual_grounder.mesh_cache import (
+    load_mesh_arrays,
+    mesh_arrays,
+    mesh_cache_key,
+    mesh_cache_path,
+    save_mesh_arrays,
+)
+
+
+def fake_mesh():
+    return SimpleNamespace(
+        vertices=np.random.rand(4, 3),
+        triangles=np.array([[0, 1, 2], [0, 2, 3]], dtype=np.int32),
+        vertex_colors=np.random.rand(4, 3),
+        vertex_normals=np.random.rand(4, 3),
+        triangle_normals=np.random.rand(2, 3),
+    )
+
+
+def test_mesh_arrays_round_trip(tmp_path):
+    source = tmp_path / "scene.ply"
+    meta = tmp_path / "scene.txt"
+    source.write_bytes(b"mesh")
+    meta.write_text("axisAlignment = 1 0 0 0 0 1 0 0 0 0 1 0 0 0 0 1")
+    key = mesh_cache_key(str(source), str(meta))
+    mesh = fake_mesh()
+
+    save_mesh_arrays(str(source), key, mesh_arrays(mesh), np.eye(4))
+    arrays, axis_align_matrix = load_mesh_arrays(str(source), key)
+
+    assert os.path.exists(mesh_cache_path(str(source)))
+    for name, values in arrays.items():
+        assert np.array_equal(values, getattr(mesh, name))
+    assert np.array_equal(axis_align_matrix, np.eye(4))
+
+
+def test_changed_source_invalidates_the_cache(tmp_path):
+    source = tmp_path / "scene.ply"
+    source.write_bytes(b"mesh")
+    key = mesh_cache_key(str(source))
+    save_mesh_arrays(str(source), key, mesh_arrays(fake_mesh()))
+
+    assert load_mesh_arrays(str(source), key)[1] is None
+
+    source.write_bytes(b"another mesh")
+    assert load_mesh_arrays(str(source), mesh_cache_key(str(source))) is None
+    assert load_mesh_arrays(str(tmp_path / "missing.ply"), key) is None
@@ -0,0 +1,87 @@
+import json
+import os
+import struct
+
+import numpy as np
+
+from chat_with_nerf.settings import Settings
+from chat_with_nerf.visual_grounder.display_mesh import MeshArrays
+from chat_with_nerf.visual_grounder.mesh_lod import (
+    choose_level,
+    quantized_glb_bytes,
+    served_mesh_path,
+    texture_vertex_colors,
+)
+
+LEVELS = [
+    {"file": "lod/lod0.glb", "triangles": 1_000_000},
+    {"file": "lod/lod1.glb", "triangles": 300_000},
+    {"file": "lod/lod2.glb", "triangles": 30_000},
+]
+
+
+def test_quantized_glb_dequantizes_to_the_mesh():
+    vertices = np.array([[0, 0, 0], [2, 0, 0], [0, 1, 0], [0, 0, 4]], np.float32)
+    mesh = MeshArrays(
+        vertices,
+        np.array([[0, 1, 2], [0, 2, 3]], np.uint32),
+        np.tile(np.array([1.0, 0.5, 0.0], np.float32), (4, 1)),
+    )
+
+    data = quantized_glb_bytes(mesh)
+
+    assert struct.unpack_from("<4sII", data) == (b"glTF", 2, len(data))
+    json_length = struct.unpack_from("<I", data, 12)[0]
+    gltf = json.loads(data[20 : 20 + json_length])
+    binary = data[28 + json_length :]
+    assert gltf["extensionsRequired"] == ["KHR_mesh_quantization"]
+    views = gltf["bufferViews"]
+    indices = np.frombuffer(binary, "<u2", 6, views[0]["byteOffset"])
+    positions = np.frombuffer(binary, "<u2", 16, views[1]["byteOffset"])
+    colors = np.frombuffer(binary, np.uint8, 16, views[2]["byteOffset"])
+    node = gltf["nodes"][0]
+    dequantized = positions.reshape(4, 4)[:, :3] * node["scale"] + node["translation"]
+    assert indices.tolist() == [0, 1, 2, 0, 2, 3]
+    assert np.allclose(dequantized, vertices, atol=1e-4)
+    assert colors.reshape(4, 4)[0].tolist() == [255, 128, 0, 255]
+
+
+def test_choose_level_within_budget():
+    assert choose_level(LEVELS, 500_000)["file"] == "lod/lod1.glb"
+    assert choose_level(LEVELS, 2_000_000)["file"] == "lod/lod0.glb"
+    assert choose_level(LEVELS, 1_000)["file"] == "lod/lod2.glb"
+
+
+def test_served_mesh_path_falls_back_without_fresh_manifest(tmp_path, monkeypatch):
+    monkeypatch.setattr(Settings, "data_path", str(tmp_path))
+    scene_dir = tmp_path / "home_1"
+    (scene_dir / "lod").mkdir(parents=True)
+    (scene_dir / "poly.glb").write_bytes(b"")
+
+    assert served_mesh_path("home_1") == str(scene_dir / "poly.glb")
+
+    manifest = {
+        "source": "poly.glb",
+        "source_mtime": os.path.getmtime(scene_dir / "poly.glb"),
+        "levels": LEVELS,
+    }
+    (scene_dir / "lod" / "manifest.json").write_text(json.dumps(manifest))
+    assert served_mesh_path("home_1", 500_000) == str(scene_dir / "lod/lod1.glb")
+
+    manifest["source_mtime"] -= 10
+    (scene_dir / "lod" / "manifest.json").write_text(json.dumps(manifest))
+    assert served_mesh_path("home_1") == str(scene_dir / "poly.glb")
+
+
+def test_texture_vertex_colors_average_corner_samples():
+    texture = np.zeros((2, 2, 3), np.uint8)
+    texture[0, 0] = [255, 0, 0]
+    texture[1, 1] = [0, 0, 255]
+    triangles = np.array([[0, 1, 2], [0, 2, 3]])
+    uvs = np.array([[0, 0], [0, 0], [1, 1], [1, 1], [1, 1], [1, 1]], float)
+
+    colors = texture_vertex_colors(texture, uvs, triangles)
+
+    assert np.allclose(colors[0], [0.5, 0, 0.5])
+    assert np.allclose(colors[1], [1, 0, 0])
+    assert np.allclose(colors[3], [0, 0, 1])
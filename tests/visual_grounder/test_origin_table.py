@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+
+h5py = pytest.importorskip("h5py")
+
+from chat_with_nerf.visual_grounder.origin_table import (  # noqa: E402
+    compact_h5_origins,
+    compact_origins,
+    lookup_origins,
+    read_origins,
+)
+
+
+def synthetic_origins():
+    cameras = np.array([[0.0, 0.0, 1.0], [1.0, 2.0, 3.0], [-1.0, 0.5, 0.0]])
+    rng = np.random.default_rng(0)
+    return cameras[rng.integers(0, len(cameras), size=100)]
+
+
+def test_compact_origins_round_trips():
+    origins = synthetic_origins()
+
+    origin_table, camera_indices = compact_origins(origins)
+
+    assert origin_table.shape == (3, 3)
+    assert camera_indices.dtype == np.uint8
+    assert np.array_equal(origin_table[camera_indices], origins)
+    point_indices = np.array([5, 0, 99])
+    assert np.array_equal(
+        lookup_origins(origin_table, camera_indices, point_indices),
+        origins[point_indices],
+    )
+
+
+def test_read_origins_of_compacted_and_plain_files(tmp_path):
+    origins = synthetic_origins()
+    path = str(tmp_path / "features.h5")
+    with h5py.File(path, "w") as hdf5_file:
+        hdf5_file.create_group("origins").create_dataset("origins", data=origins)
+    with h5py.File(path, "r") as hdf5_file:
+        plain = read_origins(hdf5_file)
+
+    compact_h5_origins(path, remove_origins=True)
+
+    with h5py.File(path, "r") as hdf5_file:
+        assert "origins" not in hdf5_file
+        origin_table, camera_indices = read_origins(hdf5_file)
+    assert np.array_equal(origin_table, plain[0])
+    assert np.array_equal(camera_indices, plain[1])
+    assert np.array_equal(origin_table[camera_indices], origins)
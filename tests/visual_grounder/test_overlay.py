@@ -0,0 +1,56 @@
+import numpy as np
+
+from chat_with_nerf.visual_grounder.overlay import (
+    box_corners,
+    boxes,
+    cylinder_template,
+    cylinders,
+    sphere_template,
+    spheres,
+)
+
+
+def outward_fraction(vertices, triangles):
+    a, b, c = (vertices[triangles[:, i]] for i in range(3))
+    normals = np.cross(b - a, c - a)
+    return np.mean(np.einsum("ij,ij->i", normals, (a + b + c) / 3) > 0)
+
+
+def test_templates_are_closed_and_face_outward():
+    for vertices, triangles in (cylinder_template(20), sphere_template(30)):
+        edges = np.sort(triangles[:, [0, 1, 1, 2, 2, 0]].reshape(-1, 2), axis=1)
+        _, counts = np.unique(edges, axis=0, return_counts=True)
+
+        assert np.all(counts == 2)
+        assert outward_fraction(vertices, triangles) == 1.0
+
+
+def test_cylinders_span_their_end_points():
+    mesh = cylinders([[0, 0, 0], [1, 1, 1]], [[0, 2, 0], [1, 1, 4]], [[1, 0, 0]] * 2)
+
+    first, second = np.split(mesh.vertices, 2)
+    assert np.allclose(first[:, 1].min(), 0) and np.allclose(first[:, 1].max(), 2)
+    assert np.allclose(np.linalg.norm(first[:, [0, 2]], axis=1).max(), 0.02)
+    assert np.allclose(second[:, 2].min(), 1) and np.allclose(second[:, 2].max(), 4)
+    assert mesh.triangles.max() == mesh.vertices.shape[0] - 1
+
+
+def test_boxes_cover_their_extents_with_their_colors():
+    mesh = boxes(
+        [[0, 0, 0], [5, 5, 5]], [[2, 4, 6], [1, 1, 1]], [[1, 0, 0], [0, 0, 1]], radius=0
+    )
+
+    first, second = np.split(mesh.vertices, 2)
+    assert np.allclose(first.min(axis=0), [-1, -2, -3])
+    assert np.allclose(first.max(axis=0), [1, 2, 3])
+    assert np.allclose(second.min(axis=0), [4.5, 4.5, 4.5])
+    assert np.allclose(np.split(mesh.colors, 2)[1], [0, 0, 1])
+    assert box_corners([0, 0, 0], [2, 2, 2]).shape == (1, 8, 3)
+
+
+def test_spheres_and_empty_overlays():
+    mesh = spheres([[1, 2, 3]], [0.5], [[0, 1, 0]])
+
+    assert np.allclose(np.linalg.norm(mesh.vertices - [1, 2, 3], axis=1), 0.5)
+    empty = spheres(np.zeros((0, 3)), [], np.zeros((0, 3)))
+    assert empty.vertices.shape == empty.triangles.shape == (0, 3)
@@ -0,0 +1,84 @@
+import numpy as np
+from sklearn.cluster import DBSCAN
+
+from chat_with_nerf.visual_grounder.point_selection import (
+    scaled_min_samples,
+    select_top_points,
+    voxel_deduplicate,
+)
+
+
+def make_scene(num_clusters=4, points_per_cluster=5000, num_background=200000):
+    rng = np.random.default_rng(1)
+    centers = rng.uniform(-3, 3, size=(num_clusters, 3))
+    clusters = [
+        c + rng.normal(scale=0.05, size=(points_per_cluster, 3)) for c in centers
+    ]
+    background = rng.uniform(-4, 4, size=(num_background, 3))
+    positions = np.concatenate(clusters + [background])
+    scores = np.concatenate(
+        [
+            rng.uniform(0.8, 1.0, size=num_clusters * points_per_cluster),
+            rng.uniform(0.0, 0.5, size=num_background),
+        ]
+    )
+    return positions, scores
+
+
+def cluster_centroids(positions, min_samples):
+    labels = DBSCAN(eps=0.05, min_samples=min_samples).fit(positions).labels_
+    return [positions[labels == i].mean(axis=0) for i in set(labels) if i != -1]
+
+
+def cluster_recall(reference_centroids, centroids, tolerance=0.1):
+    """Fraction of the reference clusters with a centroid within `tolerance`
+    in the other result."""
+    if len(centroids) == 0:
+        return 0.0
+    reference = np.asarray(reference_centroids)[:, None, :]
+    distances = np.linalg.norm(reference - np.asarray(centroids)[None, :, :], axis=-1)
+    return float(np.mean(distances.min(axis=1) <= tolerance))
+
+
+def test_select_top_points_without_cap_matches_argpartition():
+    scores = np.random.default_rng(0).random(1000)
+    indices, ratio = select_top_points(scores, 0.01)
+
+    assert ratio == 1.0
+    assert set(indices) == set(np.argsort(scores)[-10:])
+
+
+def test_voxel_deduplicate_keeps_best_point_per_voxel():
+    positions = np.array([[0.0, 0, 0], [0.001, 0, 0], [1.0, 0, 0]])
+    scores = np.array([0.2, 0.9, 0.5])
+
+    kept = voxel_deduplicate(np.arange(3), scores, positions, voxel_size=0.01)
+
+    assert list(kept) == [1, 2]
+
+
+def test_capped_selection_keeps_clusters():
+    positions, scores = make_scene()
+    reference_indices, _ = select_top_points(scores, 0.1)
+    reference = cluster_centroids(positions[reference_indices], 15)
+
+    indices, ratio = select_top_points(
+        scores, 0.1, max_points=5000, positions=positions, voxel_size=0.01
+    )
+    capped = cluster_centroids(positions[indices], scaled_min_samples(15, ratio))
+
+    assert indices.shape[0] <= 5000
+    assert len(reference) == 4
+    assert cluster_recall(reference, capped, tolerance=0.05) == 1.0
+
+
+def test_deduplicated_ratio_counts_the_removed_points():
+    positions = np.repeat(np.arange(10.0)[:, None], 3, axis=1).repeat(4, axis=0)
+    scores = np.linspace(1.0, 2.0, 40)
+
+    indices, ratio = select_top_points(
+        scores, 1.0, max_points=20, positions=positions, voxel_size=0.5
+    )
+
+    assert indices.shape[0] == 10
+    assert ratio == 0.25
@@ -0,0 +1,50 @@
+import numpy as np
+
+from chat_with_nerf.visual_grounder.camera_pose import CameraPose
+from chat_with_nerf.visual_grounder.point_splat import (
+    project_points,
+    splat_camera_pose,
+    splat_points,
+)
+
+# camera at z=2 looking down -z at the origin
+C2W = np.array(
+    [[1.0, 0, 0, 0], [0, 1.0, 0, 0], [0, 0, 1.0, 2.0], [0, 0, 0, 1.0]]
+).flatten()
+
+
+def test_project_points_center_and_up():
+    columns, rows, depths = project_points(
+        np.array([[0.0, 0, 0], [0.0, 0.5, 0]]), C2W, 90, 64, 64
+    )
+
+    assert np.allclose(columns, [32, 32])
+    assert np.allclose(rows, [32, 24])
+    assert np.allclose(depths, [2, 2])
+
+
+def test_splat_points_keeps_nearest_point():
+    points = np.array([[0.0, 0, 0], [0.0, 0, 1.0], [0.0, 0, 3.0]])
+    colors = np.array([[255, 0, 0], [0, 255, 0], [0, 0, 255]], dtype=np.uint8)
+
+    image = splat_points(points, colors, C2W, 60, 32, 32, radius=1)
+
+    assert np.allclose(image[16, 16], [0, 1, 0])
+    assert np.allclose(image[16, 17], [0, 1, 0])
+    assert np.allclose(image[0, 0], [0, 0, 0])
+
+
+def test_splat_camera_pose_applies_crop():
+    points = np.array([[0.0, 0, 0], [0.0, 0, 1.0]])
+    colors = np.array([[1.0, 0, 0], [0, 1.0, 0]])
+    camera_pose = CameraPose(render_height=32, render_width=32).construct_camera_pose(
+        C2W,
+        crop_center=np.zeros(3),
+        crop_scale=np.full(3, 0.5),
+        crop_bg_color=(255, 255, 255),
+    )
+
+    image = splat_camera_pose(points, colors, camera_pose, radius=0)
+
+    assert np.allclose(image[16, 16], [1, 0, 0])
+    assert np.allclose(image[0, 0], [1, 1, 1])
@@ -0,0 +1,168 @@
+import os
+from concurrent.futures import Future
+
+import numpy as np
+from PIL import Image
+
+from chat_with_nerf.visual_grounder.image_ref import ImageRef
+from chat_with_nerf.visual_grounder.render_cache import (
+    DiskLRUCache,
+    RenderCache,
+    render_key,
+)
+
+
+def make_pose(c2w, height=512, fov=60):
+    return {
+        "camera_type": "perspective",
+        "render_height": height,
+        "render_width": 512,
+        "camera_path": [
+            {"camera_to_world": list(np.ravel(c2w)), "fov": fov, "aspect": 1}
+        ],
+        "crop": None,
+    }
+
+
+def write_image(path, value):
+    Image.fromarray(np.full((4, 4, 3), value, dtype=np.uint8)).save(path)
+    return path
+
+
+def test_render_key_quantizes_pose():
+    c2w = np.eye(4)
+    key = render_key("scene", make_pose(c2w), quantization=1e-3)
+
+    assert render_key("scene", make_pose(c2w + 1e-5), 1e-3) == key
+    assert render_key("scene", make_pose(c2w + 1e-2), 1e-3) != key
+    assert render_key("scene", make_pose(c2w, height=256), 1e-3) != key
+    assert render_key("scene", make_pose(c2w, fov=45), 1e-3) != key
+    assert render_key("other", make_pose(c2w), 1e-3) != key
+
+
+def test_disk_lru_cache_evicts_least_recently_used(tmp_path):
+    cache = DiskLRUCache(str(tmp_path / "cache"), max_bytes=250, suffix=".bin")
+    for key in "abc":
+        source = tmp_path / key
+        source.write_bytes(b"x" * 100)
+        cache.put(key, str(source))
+        os.utime(cache.path_for(key), (ord(key), ord(key)))
+        if key == "b":
+            assert cache.get("a") is not None
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.get("c") is not None
+    assert cache.total_bytes <= 250
+
+
+def test_render_cache_tiers_and_stats(tmp_path):
+    disk = DiskLRUCache(str(tmp_path / "cache"), max_bytes=10**6, suffix=".png")
+    cache = RenderCache("scene", disk, memory_entries=1)
+    first, second = make_pose(np.eye(4)), make_pose(2 * np.eye(4))
+
+    assert cache.get(first) is None
+    rendered = write_image(str(tmp_path / "rgb0.png"), 255)
+    cached = cache.put(first, ImageRef(rendered, np.ones((4, 4, 3))))
+    assert cached.rgb_address == disk.path_for(render_key("scene", first, 1e-3))
+    assert cache.get(first) is cached
+
+    cache.put(second, ImageRef(write_image(str(tmp_path / "rgb1.png"), 0), None))
+    from_disk = cache.get(first)
+    assert from_disk.rgb_address == cached.rgb_address
+    assert np.allclose(from_disk.raw_image, 1.0)
+
+    assert cache.stats()["misses"] == 1
+    assert cache.stats()["memory_hits"] == 1
+    assert cache.stats()["disk_hits"] == 1
+    assert np.isclose(cache.hit_rate, 2 / 3)
+
+
+def test_render_cache_adds_pending_writes_once_written(tmp_path):
+    disk = DiskLRUCache(str(tmp_path / "cache"), max_bytes=10**6, suffix=".png")
+    cache = RenderCache("scene", disk)
+    pose = make_pose(np.eye(4))
+    path = str(tmp_path / "rgb0.png")
+    written = Future()
+
+    pending = cache.put(pose, ImageRef(path, np.ones((4, 4, 3)), written))
+    assert pending.rgb_address == path
+    assert disk.get(render_key("scene", pose, 1e-3)) is None
+
+    written.set_result(write_image(path, 255))
+    assert cache.get(pose).rgb_address == disk.path_for(render_key("scene", pose, 1e-3))
+
+
+def test_disk_lru_cache_counts_replaced_files_once(tmp_path):
+    cache = DiskLRUCache(str(tmp_path / "cache"), max_bytes=250, suffix=".bin")
+    for i, size in enumerate([100, 120, 120, 120]):
+        source = tmp_path / f"source{i}"
+        source.write_bytes(b"x" * size)
+        cache.put("a", str(source))
+    cache.put("a", str(source))
+
+    assert cache.total_bytes == 120
+    assert cache.get("a") is not None
+
+
+def test_render_cache_drops_memory_entries_of_removed_files(tmp_path):
+    disk = DiskLRUCache(str(tmp_path / "cache"), max_bytes=10**6, suffix=".png")
+    cache = RenderCache("scene", disk)
+    pose = make_pose(np.eye(4))
+    cached = cache.put(pose, ImageRef(write_image(str(tmp_path / "rgb0.png"), 255)))
+
+    os.remove(cached.rgb_address)
+
+    assert cache.get(pose) is None
+    assert cache.stats()["memory_hits"] == 0
+    assert cache.stats()["misses"] == 1
+
+
+def test_render_cache_drops_session_images_removed_before_caching(tmp_path):
+    disk = DiskLRUCache(str(tmp_path / "cache"), max_bytes=10**6, suffix=".png")
+    cache = RenderCache("scene", disk)
+    pose = make_pose(np.eye(4))
+    session_image = write_image(str(tmp_path / "rgb0.png"), 255)
+    written = Future()
+    cache.put(pose, ImageRef(session_image, np.ones((4, 4, 3)), written))
+    written.set_exception(OSError("disk full"))
+
+    # the output janitor removed the image of an idle session
+    os.remove(session_image)
+
+    assert cache.get(pose) is None
+
+
+def test_disk_lru_cache_lists_the_directory_only_on_startup(tmp_path, monkeypatch):
+    directory = tmp_path / "cache"
+    directory.mkdir()
+    for key, used in (("old", 1), ("new", 2)):
+        (directory / f"{key}.bin").write_bytes(b"x" * 100)
+        os.utime(directory / f"{key}.bin", (used, used))
+    cache = DiskLRUCache(str(directory), max_bytes=250, suffix=".bin")
+
+    def listed():
+        raise AssertionError("the directory was listed again")
+
+    monkeypatch.setattr(DiskLRUCache, "entries", lambda self: listed())
+    source = tmp_path / "source"
+    source.write_bytes(b"x" * 100)
+    cache.put("c", str(source))
+
+    assert cache.get("old") is None
+    assert list(cache.sizes) == [cache.path_for("new"), cache.path_for("c")]
+    assert cache.total_bytes == 200
+
+
+def test_disk_lru_cache_recounts_when_a_tracked_file_is_gone(tmp_path):
+    cache = DiskLRUCache(str(tmp_path / "cache"), max_bytes=10**6, suffix=".bin")
+    for key in "ab":
+        source = tmp_path / key
+        source.write_bytes(b"x" * 100)
+        cache.put(key, str(source))
+
+    os.remove(cache.path_for("a"))
+
+    assert cache.get("a") is None
+    assert list(cache.sizes) == [cache.path_for("b")]
+    assert cache.total_bytes == 100
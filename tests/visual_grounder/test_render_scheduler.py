@@ -0,0 +1,103 @@
+import threading
+
+from chat_with_nerf.visual_grounder.render_scheduler import (
+    PRIORITY_BACKGROUND,
+    PRIORITY_INTERACTIVE,
+    RenderScheduler,
+)
+
+
+def make_render(calls):
+    def render(camera_poses, session_ids):
+        calls.append(list(zip(camera_poses, session_ids)))
+        return [
+            f"{session_id}:{pose}"
+            for pose, session_id in zip(camera_poses, session_ids)
+        ]
+
+    return render
+
+
+def test_next_batch_priority_round_robin_and_batching():
+    scheduler = RenderScheduler("cpu", max_batch_cameras=3)
+    render = make_render([])
+    # keep the worker from starting so the queue can be inspected
+    scheduler.worker = threading.Thread()
+    scheduler.submit("a", "lerf", [1, 2], render)
+    scheduler.submit("a", "lerf", [3], render)
+    scheduler.submit("b", "other", [4], render)
+    scheduler.submit("c", "lerf", [5], render)
+    scheduler.submit("d", "lerf", [6], render, priority=PRIORITY_BACKGROUND)
+
+    assert scheduler.metrics()["queued_cameras"] == 6
+    with scheduler.condition:
+        batches = [
+            [(job.session_id, job.camera_poses) for job in scheduler.next_batch()]
+            for _ in range(4)
+        ]
+
+    assert batches == [
+        [("a", [1, 2]), ("c", [5])],
+        [("b", [4])],
+        [("a", [3])],
+        [("d", [6])],
+    ]
+    assert scheduler.metrics()["queued_jobs"] == 0
+
+
+def test_submit_renders_and_splits_results():
+    scheduler = RenderScheduler("cpu", max_batch_cameras=8)
+    calls = []
+
+    first = scheduler.submit("a", "lerf", ["p0", "p1"], make_render(calls))
+    second = scheduler.submit(
+        "b", "lerf", ["p2"], make_render(calls), PRIORITY_INTERACTIVE
+    )
+
+    assert first.result(timeout=5) == ["a:p0", "a:p1"]
+    assert second.result(timeout=5) == ["b:p2"]
+    metrics = scheduler.metrics()
+    assert metrics["rendered_cameras"] == 3
+    assert metrics["queued_cameras"] == 0
+    assert metrics["max_wait_seconds"] >= 0.0
+
+
+def test_failed_render_fails_its_jobs():
+    scheduler = RenderScheduler("cpu")
+
+    def render(camera_poses, session_ids):
+        raise RuntimeError("out of memory")
+
+    future = scheduler.submit("a", "lerf", ["p0"], render)
+
+    assert isinstance(future.exception(timeout=5), RuntimeError)
+
+
+def test_cancelled_jobs_are_skipped_and_the_worker_survives():
+    scheduler = RenderScheduler("cpu", max_batch_cameras=8)
+    calls = []
+    scheduler.worker = threading.Thread()
+    cancelled = scheduler.submit("a", "lerf", ["p0"], make_render(calls))
+    kept = scheduler.submit("b", "lerf", ["p1"], make_render(calls))
+    assert cancelled.cancel()
+
+    with scheduler.condition:
+        batch = scheduler.next_batch()
+    scheduler.run_batch(batch)
+
+    assert calls == [[("p1", "b")]]
+    assert kept.result(timeout=0) == ["b:p1"]
+    assert cancelled.cancelled()
+
+
+def test_metrics_are_logged_periodically():
+    scheduler = RenderScheduler("cpu", metrics_log_interval=0)
+    scheduler.worker = threading.Thread()
+    scheduler.submit("a", "lerf", ["p0"], make_render([]))
+    logged_at = scheduler.metrics_logged_at
+
+    with scheduler.condition:
+        batch = scheduler.next_batch()
+    scheduler.run_batch(batch)
+
+    assert scheduler.metrics_logged_at > logged_at
@@ -0,0 +1,41 @@
+import numpy as np
+import pytest
+
+o3d = pytest.importorskip("open3d")
+
+from chat_with_nerf.visual_grounder.visibility import (  # noqa: E402
+    VisibilityChecker,
+    occluded_fraction,
+    rotate_about_axis,
+)
+
+
+def test_rotate_about_axis():
+    rotated = rotate_about_axis(
+        np.array([1.0, 0, 0]), np.array([0, 1.0, 0]), np.array([0, 90, 180])
+    )
+
+    assert np.allclose(rotated, [[1, 0, 0], [0, 0, -1], [-1, 0, 0]], atol=1e-9)
+
+
+def test_occluded_fraction():
+    hits = np.array([[1.0, 5.0], [np.inf, np.inf]])
+    distances = np.array([[2.0, 2.0], [2.0, 2.0]])
+
+    assert occluded_fraction(hits, distances, tolerance=0.05).tolist() == [0.5, 0.0]
+
+
+def test_choose_viewpoint_avoids_wall():
+    # a wall between the training camera and the object
+    wall = o3d.geometry.TriangleMesh.create_box(0.1, 4.0, 4.0)
+    wall.translate([-1.05, -2.0, -2.0])
+    checker = VisibilityChecker.from_mesh(wall)
+    point = np.zeros(3)
+    members = np.random.default_rng(0).normal(scale=0.05, size=(50, 3))
+
+    origin, occlusion = checker.choose_viewpoint(
+        point, np.array([-3.0, 0, 0]), 2.0, members
+    )
+
+    assert occlusion == 0.0
+    assert not np.allclose(origin, point - np.array([1.0, 0, 0]))
@@ -0,0 +1,107 @@
+import numpy as np
+import pytest
+
+from chat_with_nerf.settings import Settings
+from chat_with_nerf.visual_grounder.vocabulary import (
+    DEFAULT_VOCABULARY,
+    VocabularyTable,
+    normalize_label,
+)
+
+
+def make_table(top_scores=(0.9, 0.3)):
+    labels = ["chair", "bookshelf", "glass"][: len(top_scores)]
+    count = len(labels)
+    return VocabularyTable(
+        labels=np.array(labels),
+        best_scales=np.linspace(0.0, 1.0, count).astype(np.float32),
+        top_indices=np.arange(count * 4, dtype=np.int32).reshape(count, 4),
+        top_scores=np.repeat(np.asarray(top_scores, np.float16)[:, None], 4, axis=1),
+        cluster_labels=np.array([0, 0, 1], dtype=np.int32),
+        cluster_centroids=np.arange(9, dtype=np.float32).reshape(3, 3),
+        cluster_extents=np.ones((3, 3), dtype=np.float32),
+        cluster_values=np.array([0.6, 0.8, 0.4], dtype=np.float32),
+        cluster_best_points=np.array([3, 7, 11], dtype=np.int64),
+        cluster_targets=np.arange(9, dtype=np.int64).reshape(3, 3),
+        landmark_centroids=np.array(
+            [[1, 2, 3], [4, 5, 6], [np.nan] * 3][:count], dtype=np.float32
+        ),
+        landmark_extents=np.ones((count, 3), dtype=np.float32),
+    )
+
+
+def test_default_vocabulary_has_the_twenty_scannet_classes():
+    assert len(set(DEFAULT_VOCABULARY)) == 20
+
+
+def test_normalize_label_drops_articles_only():
+    assert normalize_label("  The Chair ") == "chair"
+    assert normalize_label("a glasses case") == "glasses case"
+    assert normalize_label("bus") == "bus"
+
+
+def test_lookup_matches_plurals_of_vocabulary_labels():
+    table = make_table((0.9, 0.9, 0.9))
+
+    assert table.lookup("the chairs") == 0
+    assert table.lookup("Bookshelves") == 1
+    assert table.lookup("glasses") == 2
+    assert table.lookup("bus") is None
+
+
+def test_lookup_leaves_labels_without_relevant_points_to_the_pipeline():
+    table = make_table()
+
+    assert table.lookup("bookshelf") == 1
+    assert table.lookup("bookshelf", relevancy_threshold=0.5) is None
+    assert table.lookup("chair", relevancy_threshold=0.5) == 0
+
+
+def test_table_save_load_round_trip(tmp_path, monkeypatch):
+    monkeypatch.setattr(Settings, "VOCABULARY_TABLE_PATH", str(tmp_path))
+    table = make_table()
+    table.save(VocabularyTable.table_path("scene"))
+
+    loaded = VocabularyTable.load_for_scene("scene")
+
+    assert VocabularyTable.load_for_scene("other") is None
+    for name in ("labels", "top_indices", "top_scores", "cluster_best_points"):
+        assert np.array_equal(getattr(loaded, name), getattr(table, name))
+    centroids, extents, scores, best_points, targets, _ = loaded.target_result(0)
+    assert np.array_equal(np.array(centroids), table.cluster_centroids[:2])
+    assert scores == [np.float32(0.6), np.float32(0.8)]
+    assert best_points.tolist() == [3, 7]
+    assert np.array_equal(np.array(targets), table.cluster_targets[:2])
+    centroid, extent = loaded.landmark_result(1)
+    assert centroid.tolist() == [4, 5, 6]
+
+
+def test_landmark_result_is_none_without_a_landmark_cluster():
+    table = make_table((0.9, 0.9, 0.9))
+
+    assert table.landmark_result(0)[0].tolist() == [1, 2, 3]
+    assert table.landmark_result(2) is None
+
+
+def test_tables_without_the_current_fields_are_not_loaded(tmp_path, monkeypatch):
+    monkeypatch.setattr(Settings, "VOCABULARY_TABLE_PATH", str(tmp_path))
+    table = make_table()
+    np.savez(VocabularyTable.table_path("scene"), labels=table.labels)
+
+    assert VocabularyTable.load_for_scene("scene") is None
+
+
+def test_builder_summarizes_clusters_with_visibility_targets():
+    builder = pytest.importorskip("chat_with_nerf.visual_grounder.vocabulary_builder")
+    positions = np.concatenate([np.zeros((20, 3)), np.full((5, 3), 10.0)])
+    values = np.linspace(0.0, 1.0, 25)
+    indices = np.arange(100, 125)
+
+    summaries = builder.summarize_clusters(positions, values, indices, min_samples=15)
+
+    assert len(summaries) == 1
+    centroid, extent, mean_value, best_point, targets = summaries[0]
+    assert best_point == 119
+    assert targets.shape == (Settings.VISIBILITY_MAX_TARGETS - 1,)
+    assert set(targets.tolist()) <= set(range(100, 120))
+    assert np.isnan(builder.best_cluster([])[0]).all()